@@ -34,6 +34,7 @@ const BookAppointmentScreen = ({ navigation }) => {
   const [notes, setNotes] = useState('');
   const [availableSlots, setAvailableSlots] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [fullyBookedDays, setFullyBookedDays] = useState([]);
   
   const minDate = moment().format('YYYY-MM-DD');
 
@@ -41,12 +42,31 @@ const BookAppointmentScreen = ({ navigation }) => {
     if (selectedDate) {
       fetchAvailableTimes(selectedDate);
     }
-  }, [selectedDate]);
+  }, [selectedDate, selectedService]);
+
+  useEffect(() => {
+    fetchMonthAvailability(moment());
+  }, [selectedService]);
+
+  // Los huecos libres dependen de la duración del servicio elegido
+  const selectedServiceName = () => SERVICES.find(s => s.id === selectedService)?.name;
+
+  // Cargar en una sola petición qué días del mes visible están completos
+  const fetchMonthAvailability = async (month) => {
+    const from = moment.max(moment(month).startOf('month'), moment()).format('YYYY-MM-DD');
+    const to = moment(month).endOf('month').format('YYYY-MM-DD');
+    if (from > to) return;
+    
+    const result = await appointmentsAPI.getAvailabilityRange(from, to, selectedServiceName());
+    if (result.success) {
+      setFullyBookedDays(result.data.days.filter(day => day.fully_booked).map(day => day.date));
+    }
+  };
 
   const fetchAvailableTimes = async (date) => {
     setLoading(true);
     try {
-      const result = await appointmentsAPI.getAvailability(date);
+      const result = await appointmentsAPI.getAvailability(date, selectedServiceName());
       
       if (result.success) {
         setAvailableSlots(result.data.available_slots || []);
@@ -163,8 +183,11 @@ const BookAppointmentScreen = ({ navigation }) => {
 
   // Renderizar el paso 2: Seleccionar fecha
   const renderDateSelection = () => {
-    // Marcar la fecha seleccionada en el calendario
+    // Marcar la fecha seleccionada en el calendario y deshabilitar los días completos
     const markedDates = {};
+    fullyBookedDays.forEach(day => {
+      markedDates[day] = { disabled: true, disableTouchEvent: true };
+    });
     if (selectedDate) {
       markedDates[selectedDate] = {
         selected: true,
@@ -180,6 +203,7 @@ const BookAppointmentScreen = ({ navigation }) => {
           minDate={minDate}
           markedDates={markedDates}
           onDayPress={(day) => setSelectedDate(day.dateString)}
+          onMonthChange={(month) => fetchMonthAvailability(moment(month.dateString))}
           theme={{
             todayTextColor: '#E63946',
             arrowColor: '#E63946',
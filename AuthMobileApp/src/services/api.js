@@ -33,19 +33,81 @@ apiClient.interceptors.request.use(
   }
 );
 
+// Última respuesta de las consultas condicionales (ETag) por URL y parámetros
+const etagCache = new Map();
+
+// GET con If-None-Match: si el servidor responde 304 se reutilizan los datos guardados
+const conditionalGet = (url, params) => {
+  const key = `${url}?${JSON.stringify(params || {})}`;
+  const cached = etagCache.get(key);
+  return apiClient.get(url, {
+    params,
+    etagKey: key,
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+};
+
 // Interceptor para manejar respuestas y errores
 apiClient.interceptors.response.use(
-  (response) => response.data,
+  (response) => {
+    const key = response.config.etagKey;
+    if (key) {
+      if (response.status === 304) {
+        return etagCache.get(key).data;
+      }
+      if (response.headers.etag) {
+        etagCache.set(key, { etag: response.headers.etag, data: response.data });
+      }
+    }
+    return response.data;
+  },
   async (error) => {
+    const original = error.config;
+    if (error.response?.status === 401 && original && !original.retriedWithRefresh) {
+      // Token de acceso caducado: renovarlo con el refresh token (sin volver a pedir la
+      // contraseña) y repetir la petición una sola vez
+      original.retriedWithRefresh = true;
+      try {
+        const token = await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return apiClient(original);
+      } catch (refreshError) {
+        // Sesión caducada o revocada: se sigue con el 401 original
+      }
+    }
     if (error.response?.status === 401) {
       // Token expirado, remover del storage
-      await AsyncStorage.removeItem('access_token');
-      await AsyncStorage.removeItem('user_data');
+      await AsyncStorage.multiRemove(['access_token', 'refresh_token', 'user_data']);
     }
     return Promise.reject(error);
   }
 );
 
+// Renovación en curso: las peticiones que reciben un 401 a la vez esperan a la misma,
+// porque cada refresh token solo se puede usar una vez
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    refreshPromise = (async () => {
+      const refreshToken = await AsyncStorage.getItem('refresh_token');
+      if (!refreshToken) {
+        throw new Error('No hay refresh token');
+      }
+      const { data } = await api.post('/token/refresh', { refresh_token: refreshToken });
+      await AsyncStorage.multiSet([
+        ['access_token', data.access_token],
+        ['refresh_token', data.refresh_token],
+      ]);
+      return data.access_token;
+    })().finally(() => {
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
+
 // Servicios de autenticación
 export const authAPI = {
   // Registro de usuario
@@ -81,6 +143,7 @@ export const authAPI = {
 
       if (response.ok && data.access_token) {
         await AsyncStorage.setItem('access_token', data.access_token);
+        await AsyncStorage.setItem('refresh_token', data.refresh_token);
         return { success: true, data };
       } else {
         return {
@@ -114,8 +177,10 @@ export const authAPI = {
   // Logout
   logout: async () => {
     try {
-      await AsyncStorage.removeItem('access_token');
-      await AsyncStorage.removeItem('user_data');
+      // Revocar la sesión en el servidor; si no hay conexión, se cierra igualmente en local
+      await apiClient.post('/logout').catch(() => {});
+      await AsyncStorage.multiRemove(['access_token', 'refresh_token', 'user_data']);
+      etagCache.clear();
       return { success: true };
     } catch (error) {
       return { success: false, error: 'Error cerrando sesión' };
@@ -167,10 +232,22 @@ export const protectedAPI = {
 
 // Servicios para las citas
 export const appointmentsAPI = {
-  createAppointment: async (appointmentData) => {
+  // Los reintentos por fallos de red llevan la misma Idempotency-Key: si la primera
+  // petición llegó al servidor, este devuelve la cita ya creada en vez de duplicarla
+  createAppointment: async (appointmentData, retries = 2) => {
+    const idempotencyKey = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
     try {
-      const response = await apiClient.post('/appointments/', appointmentData);
-      return { success: true, data: response };
+      for (let attempt = 0; ; attempt++) {
+        try {
+          const response = await apiClient.post('/appointments/', appointmentData, {
+            headers: { 'Idempotency-Key': idempotencyKey },
+          });
+          return { success: true, data: response };
+        } catch (error) {
+          if (error.response || attempt >= retries) throw error;
+          await new Promise((resolve) => setTimeout(resolve, 1000 * (attempt + 1)));
+        }
+      }
     } catch (error) {
       return {
         success: false,
@@ -179,10 +256,11 @@ export const appointmentsAPI = {
     }
   },
 
-  // Obtener las citas del usuario actual
-  getMyAppointments: async () => {
+  // Obtener las citas del usuario actual: 'upcoming' (próximas, la más cercana primero)
+  // o 'past' (pasadas, la más reciente primero)
+  getMyAppointments: async (scope = 'upcoming') => {
     try {
-      const response = await apiClient.get('/appointments/my-appointments');
+      const response = await conditionalGet('/appointments/my-appointments', { scope });
       return { success: true, data: response };
     } catch (error) {
       return {
@@ -192,10 +270,27 @@ export const appointmentsAPI = {
     }
   },
 
-  // Obtener disponibilidad de horarios para una fecha
-  getAvailability: async (date) => {
+  // Obtener disponibilidad de horarios para una fecha (según la duración del servicio)
+  getAvailability: async (date, serviceType) => {
+    try {
+      const response = await conditionalGet(`/appointments/availability/${date}`, {
+        service_type: serviceType,
+      });
+      return { success: true, data: response };
+    } catch (error) {
+      return {
+        success: false,
+        error: error.response?.data?.detail || 'Error al obtener disponibilidad'
+      };
+    }
+  },
+
+  // Obtener la disponibilidad de un rango de días en una sola petición
+  getAvailabilityRange: async (from, to, serviceType) => {
     try {
-      const response = await apiClient.get(`/appointments/availability/${date}`);
+      const response = await conditionalGet('/appointments/availability', {
+        from, to, service_type: serviceType,
+      });
       return { success: true, data: response };
     } catch (error) {
       return {
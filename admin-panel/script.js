@@ -3,6 +3,12 @@ const API_BASE_URL = 'http://localhost:8000/api/v1';
 let authToken = null;
 let currentDate = new Date();
 let selectedDate = null;
+let eventSource = null;
+
+// Citas del día que se está mostrando; los eventos en vivo las actualizan sin volver a pedirlas
+let shownDate = null;
+let shownAppointments = [];
+let shownUsers = {};
 
 // Elementos del DOM
 const loginScreen = document.getElementById('loginScreen');
@@ -66,11 +72,18 @@ function showDashboard() {
     loginScreen.classList.remove('active');
     dashboardScreen.classList.add('active');
     loadDashboardData();
+    connectEvents();
 }
 
 logoutBtn.addEventListener('click', () => {
+    // Revocar el token en el servidor (si falla, la sesión se cierra igualmente aquí)
+    fetch(`${API_BASE_URL}/logout`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${authToken}` }
+    }).catch(() => {});
     authToken = null;
     localStorage.removeItem('adminToken');
+    disconnectEvents();
     dashboardScreen.classList.remove('active');
     loginScreen.classList.add('active');
     loginForm.reset();
@@ -99,8 +112,13 @@ navItems.forEach(item => {
         
         // Cargar datos según la tab
         if (tabName === 'appointments') {
+            // Si el día no ha cambiado, la lista ya está al día gracias a los eventos
             const date = document.getElementById('appointmentDate').value;
-            loadAppointments(date);
+            if (date === shownDate) {
+                renderAppointments();
+            } else {
+                loadAppointments(date);
+            }
         } else if (tabName === 'users') {
             loadUsers();
         } else if (tabName === 'calendar') {
@@ -132,6 +150,42 @@ async function fetchAPI(endpoint, options = {}) {
     return response.json();
 }
 
+// Recorre todas las páginas de un listado paginado por cursor (cabecera X-Next-Cursor)
+async function fetchAllPages(endpoint) {
+    const results = [];
+    let cursor = null;
+    
+    do {
+        const separator = endpoint.includes('?') ? '&' : '?';
+        const url = cursor ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}` : endpoint;
+        const response = await fetch(`${API_BASE_URL}${url}`, {
+            headers: { 'Authorization': `Bearer ${authToken}` }
+        });
+        
+        if (!response.ok) {
+            throw new Error(`API Error: ${response.status}`);
+        }
+        
+        results.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    
+    return results;
+}
+
+// Obtiene solo los usuarios que aparecen en una lista de citas
+async function fetchUsersFor(appointments, fields = 'id,username') {
+    const ids = [...new Set(appointments.map(apt => apt.user_id))];
+    if (ids.length === 0) return {};
+    
+    const users = await fetchAllPages(`/admin/users?ids=${ids.join(',')}&fields=${fields}`);
+    const userMap = {};
+    users.forEach(user => {
+        userMap[user.id] = user;
+    });
+    return userMap;
+}
+
 async function loadDashboardData() {
     try {
         // Obtener información del usuario
@@ -152,69 +206,20 @@ async function loadAppointments(date = null) {
     appointmentsList.innerHTML = '<div class="loading">Cargando reservas...</div>';
     
     try {
-        // Usar el endpoint de admin para obtener TODAS las citas
-        const appointments = await fetchAPI('/appointments/admin/all-appointments');
-        const users = await fetchAPI('/admin/users');
+        // Pedir solo las citas del día seleccionado (o todas si no hay fecha)
+        const query = date ? `?date_from=${date}&date_to=${date}` : '';
+        const appointments = await fetchAllPages(`/appointments/admin/all-appointments${query}`);
         
         // Crear un mapa de usuarios para obtener sus nombres
-        const userMap = {};
-        users.forEach(user => {
-            userMap[user.id] = user;
-        });
-        
-        if (appointments.length === 0) {
-            appointmentsList.innerHTML = `
-                <div class="empty-state">
-                    <div class="empty-state-icon">📅</div>
-                    <div class="empty-state-text">No hay reservas</div>
-                </div>
-            `;
-            return;
-        }
-        
-        // Filtrar por fecha si se especifica
-        let filteredAppointments = appointments;
-        if (date) {
-            filteredAppointments = appointments.filter(apt => apt.date === date);
-        }
-        
-        // Si no hay citas para el día seleccionado
-        if (filteredAppointments.length === 0) {
-            appointmentsList.innerHTML = `
-                <div class="empty-state">
-                    <div class="empty-state-icon">📅</div>
-                    <div class="empty-state-text">${date ? `No hay reservas para el ${formatDate(date)}` : 'No hay reservas'}</div>
-                </div>
-            `;
-            return;
-        }
-        
-        // Ordenar por fecha y hora
-        filteredAppointments.sort((a, b) => {
-            const dateCompare = new Date(a.date) - new Date(b.date);
-            if (dateCompare !== 0) return dateCompare;
-            return a.time.localeCompare(b.time);
-        });
-        
-        appointmentsList.innerHTML = filteredAppointments.map(apt => {
-            const user = userMap[apt.user_id];
-            return `
-                <div class="appointment-item">
-                    <div class="appointment-time">${apt.time}</div>
-                    <div class="appointment-details">
-                        <div class="appointment-client">${user ? user.username : 'Usuario #' + apt.user_id}</div>
-                        <div class="appointment-service">${apt.service_type}</div>
-                        <div class="appointment-date">${formatDate(apt.date)}</div>
-                        ${apt.notes ? `<div class="appointment-service">📝 ${apt.notes}</div>` : ''}
-                    </div>
-                    <div class="appointment-status status-confirmed">Confirmada</div>
-                </div>
-            `;
-        }).join('');
+        shownUsers = await fetchUsersFor(appointments);
+        shownAppointments = appointments;
+        shownDate = date;
         
+        renderAppointments();
         updateStats();
     } catch (error) {
         console.error('Error loading appointments:', error);
+        shownDate = null;
         appointmentsList.innerHTML = `
             <div class="empty-state">
                 <div class="empty-state-icon">⚠️</div>
@@ -224,14 +229,113 @@ async function loadAppointments(date = null) {
     }
 }
 
+function renderAppointments() {
+    const appointmentsList = document.getElementById('appointmentsList');
+    
+    // Si no hay citas para el día seleccionado
+    if (shownAppointments.length === 0) {
+        appointmentsList.innerHTML = `
+            <div class="empty-state">
+                <div class="empty-state-icon">📅</div>
+                <div class="empty-state-text">${shownDate ? `No hay reservas para el ${formatDate(shownDate)}` : 'No hay reservas'}</div>
+            </div>
+        `;
+        return;
+    }
+    
+    // El servidor ya las devuelve ordenadas por fecha y hora (los eventos mantienen el orden)
+    appointmentsList.innerHTML = shownAppointments.map(apt => {
+        const user = shownUsers[apt.user_id];
+        return `
+            <div class="appointment-item">
+                <div class="appointment-time">${apt.time}</div>
+                <div class="appointment-details">
+                    <div class="appointment-client">${user ? user.username : 'Usuario #' + apt.user_id}</div>
+                    <div class="appointment-service">${apt.service_type}</div>
+                    <div class="appointment-date">${formatDate(apt.date)}</div>
+                    ${apt.notes ? `<div class="appointment-service">📝 ${apt.notes}</div>` : ''}
+                </div>
+                <div class="appointment-status status-confirmed">Confirmada</div>
+            </div>
+        `;
+    }).join('');
+}
+
+// Eventos en vivo (server-sent events): citas creadas y canceladas en el servidor
+async function connectEvents() {
+    disconnectEvents();
+    // EventSource no permite cabeceras: en la URL va un ticket de un minuto que solo sirve
+    // para el stream, nunca el token de acceso
+    let ticket;
+    try {
+        ({ ticket } = await fetchAPI('/appointments/admin/events/ticket', { method: 'POST' }));
+    } catch (error) {
+        console.error('Error opening events:', error);
+        return;
+    }
+    if (!authToken) return;
+    
+    eventSource = new EventSource(`${API_BASE_URL}/appointments/admin/events?ticket=${encodeURIComponent(ticket)}`);
+    eventSource.addEventListener('appointment_created', (e) => applyAppointmentEvent(JSON.parse(e.data), 1));
+    eventSource.addEventListener('appointment_cancelled', (e) => applyAppointmentEvent(JSON.parse(e.data), -1));
+    // El servidor pide recargar si se han perdido eventos (cola llena o reconexión)
+    eventSource.addEventListener('resync', () => {
+        loadAppointments(document.getElementById('appointmentDate').value);
+    });
+    // EventSource reconecta solo con la misma URL; si ya no puede (ticket caducado), se pide
+    // otro ticket y se recargan los datos por los eventos perdidos
+    const source = eventSource;
+    source.addEventListener('error', () => {
+        if (source.readyState !== EventSource.CLOSED || source !== eventSource) return;
+        eventSource = null;
+        setTimeout(() => {
+            if (!authToken || eventSource) return;
+            connectEvents();
+            loadAppointments(document.getElementById('appointmentDate').value);
+        }, 5000);
+    });
+}
+
+function disconnectEvents() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+}
+
+function addToCounter(id, delta) {
+    const element = document.getElementById(id);
+    element.textContent = Math.max(0, Number(element.textContent) + delta);
+}
+
+function applyAppointmentEvent(apt, delta) {
+    addToCounter('totalAppointments', delta);
+    if (apt.date === new Date().toISOString().split('T')[0]) {
+        addToCounter('todayAppointments', delta);
+    }
+    
+    if (shownDate && apt.date !== shownDate) return;
+    
+    if (delta > 0) {
+        shownUsers[apt.user_id] = { id: apt.user_id, username: apt.username };
+        shownAppointments.push(apt);
+        shownAppointments.sort((a, b) => (a.date + a.time).localeCompare(b.date + b.time) || a.id - b.id);
+    } else {
+        shownAppointments = shownAppointments.filter(item => item.id !== apt.id);
+    }
+    
+    if (document.getElementById('appointmentsTab').classList.contains('active')) {
+        renderAppointments();
+    }
+}
+
 async function loadUsers() {
     const usersList = document.getElementById('usersList');
     usersList.innerHTML = '<div class="loading">Cargando usuarios...</div>';
     
     try {
-        // Usar el endpoint de admin para obtener TODOS los usuarios
-        const users = await fetchAPI('/admin/users');
-        const appointments = await fetchAPI('/appointments/admin/all-appointments');
+        // Usar el endpoint de admin para obtener TODOS los usuarios, con sus citas ya contadas
+        const users = await fetchAllPages('/admin/users?fields=id,username,email,created_at,appointment_count');
         
         if (users.length === 0) {
             usersList.innerHTML = `
@@ -243,12 +347,6 @@ async function loadUsers() {
             return;
         }
         
-        // Contar citas por usuario
-        const appointmentsByUser = {};
-        appointments.forEach(apt => {
-            appointmentsByUser[apt.user_id] = (appointmentsByUser[apt.user_id] || 0) + 1;
-        });
-        
         usersList.innerHTML = users.map(user => `
             <div class="user-item">
                 <div class="user-avatar">${user.username.charAt(0).toUpperCase()}</div>
@@ -256,7 +354,7 @@ async function loadUsers() {
                     <div class="user-name">${user.username}</div>
                     <div class="user-email">${user.email}</div>
                 </div>
-                <div class="user-appointments">${appointmentsByUser[user.id] || 0} citas</div>
+                <div class="user-appointments">${user.appointment_count} citas</div>
                 <div class="user-joined">Registrado: ${formatDate(user.created_at)}</div>
             </div>
         `).join('');
@@ -337,7 +435,7 @@ function renderCalendar() {
         
         dayElement.innerHTML = `
             <div class="day-number">${day}</div>
-            <div class="day-appointments-count">0 citas</div>
+            <div class="day-appointments-count">Libre</div>
         `;
         
         dayElement.addEventListener('click', () => {
@@ -365,29 +463,27 @@ function renderCalendar() {
 
 async function loadMonthAppointments(year, month) {
     try {
-        const appointments = await fetchAPI('/appointments/admin/all-appointments');
+        // Ocupación precalculada de cada día del mes visible (una sola consulta)
+        const monthStr = `${year}-${String(month + 1).padStart(2, '0')}`;
+        const occupancy = await fetchAPI(`/appointments/occupancy?month=${monthStr}`);
         
-        // Contar citas por día
-        const appointmentsByDay = {};
-        appointments.forEach(apt => {
-            // Comparar directamente el string de fecha YYYY-MM-DD
-            const [aptYear, aptMonth, aptDay] = apt.date.split('-').map(Number);
-            if (aptYear === year && aptMonth - 1 === month) {
-                appointmentsByDay[aptDay] = (appointmentsByDay[aptDay] || 0) + 1;
-            }
-        });
-        
-        // Actualizar el calendario
+        // Actualizar el calendario como mapa de calor
         const calendarDays = document.querySelectorAll('.calendar-day:not(.other-month)');
-        calendarDays.forEach((dayElement, index) => {
-            const day = index + 1;
-            const count = appointmentsByDay[day] || 0;
-            
-            if (count > 0) {
-                dayElement.classList.add('has-appointments');
-                const countElement = dayElement.querySelector('.day-appointments-count');
-                countElement.textContent = `${count} ${count === 1 ? 'cita' : 'citas'}`;
+        occupancy.days.forEach((item, index) => {
+            const dayElement = calendarDays[index];
+            if (!dayElement) return;
+            const countElement = dayElement.querySelector('.day-appointments-count');
+            if (item.capacity === 0 && item.booked_slots === 0) {
+                countElement.textContent = 'Cerrado';
+                return;
             }
+            if (item.booked_slots === 0) return;
+            
+            const ratio = item.capacity ? Math.min(item.booked_slots / item.capacity, 1) : 1;
+            dayElement.classList.add('has-appointments');
+            dayElement.style.setProperty('--occupancy', ratio.toFixed(2));
+            countElement.textContent = `${Math.round(ratio * 100)}% ocupado`;
+            countElement.title = `${item.booked_slots} de ${item.capacity} huecos`;
         });
     } catch (error) {
         console.error('Error loading month appointments:', error);
@@ -400,16 +496,10 @@ async function loadDayAppointments(date) {
     dayAppointments.innerHTML = '<div class="loading">Cargando citas del día...</div>';
     
     try {
-        const appointments = await fetchAPI('/appointments/admin/all-appointments');
-        const users = await fetchAPI('/admin/users');
+        const dayAppts = await fetchAllPages(`/appointments/admin/all-appointments?date_from=${date}&date_to=${date}`);
         
         // Crear un mapa de usuarios para obtener sus nombres
-        const userMap = {};
-        users.forEach(user => {
-            userMap[user.id] = user;
-        });
-        
-        const dayAppts = appointments.filter(apt => apt.date === date);
+        const userMap = await fetchUsersFor(dayAppts, 'id,username,email');
         
         if (dayAppts.length === 0) {
             dayAppointments.innerHTML = `
@@ -421,8 +511,6 @@ async function loadDayAppointments(date) {
             return;
         }
         
-        dayAppts.sort((a, b) => a.time.localeCompare(b.time));
-        
         dayAppointments.innerHTML = `
             <h4>Citas para ${formatDate(date)} (${dayAppts.length})</h4>
             ${dayAppts.map(apt => {
@@ -460,40 +548,30 @@ document.getElementById('nextMonth').addEventListener('click', () => {
 
 async function loadStats() {
     try {
-        const appointments = await fetchAPI('/appointments/admin/all-appointments');
+        // Las estadísticas se calculan en el servidor con GROUP BY
+        const stats = await fetchAPI('/appointments/admin/stats');
+        const total = stats.total_appointments || 1;
         
         // Servicios más solicitados
-        const serviceCount = {};
-        appointments.forEach(apt => {
-            serviceCount[apt.service_type] = (serviceCount[apt.service_type] || 0) + 1;
-        });
-        
         const servicesChart = document.getElementById('servicesChart');
-        servicesChart.innerHTML = Object.entries(serviceCount)
-            .sort((a, b) => b[1] - a[1])
-            .map(([service, count]) => `
+        servicesChart.innerHTML = stats.by_service
+            .sort((a, b) => b.count - a.count)
+            .map(({ key: service, count }) => `
                 <div class="chart-bar">
                     <div class="chart-label">${service}</div>
-                    <div class="chart-bar-fill" style="width: ${(count / appointments.length) * 100}%">
+                    <div class="chart-bar-fill" style="width: ${(count / total) * 100}%">
                         ${count}
                     </div>
                 </div>
             `).join('');
         
         // Reservas por hora
-        const hourCount = {};
-        appointments.forEach(apt => {
-            const hour = apt.time.split(':')[0];
-            hourCount[hour] = (hourCount[hour] || 0) + 1;
-        });
-        
         const hoursChart = document.getElementById('hoursChart');
-        hoursChart.innerHTML = Object.entries(hourCount)
-            .sort((a, b) => a[0] - b[0])
-            .map(([hour, count]) => `
+        hoursChart.innerHTML = stats.by_hour
+            .map(({ key: hour, count }) => `
                 <div class="chart-bar">
-                    <div class="chart-label">${hour}:00</div>
-                    <div class="chart-bar-fill" style="width: ${(count / appointments.length) * 100}%">
+                    <div class="chart-label">${String(hour).padStart(2, '0')}:00</div>
+                    <div class="chart-bar-fill" style="width: ${(count / total) * 100}%">
                         ${count}
                     </div>
                 </div>
@@ -505,19 +583,16 @@ async function loadStats() {
 
 async function updateStats() {
     try {
-        const appointments = await fetchAPI('/appointments/admin/all-appointments');
-        const users = await fetchAPI('/admin/users');
+        const stats = await fetchAPI('/appointments/admin/stats');
         
         // Total de citas
-        document.getElementById('totalAppointments').textContent = appointments.length;
+        document.getElementById('totalAppointments').textContent = stats.total_appointments;
         
         // Citas de hoy
-        const today = new Date().toISOString().split('T')[0];
-        const todayAppts = appointments.filter(apt => apt.date === today);
-        document.getElementById('todayAppointments').textContent = todayAppts.length;
+        document.getElementById('todayAppointments').textContent = stats.today_appointments;
         
         // Total usuarios
-        document.getElementById('totalUsers').textContent = users.length;
+        document.getElementById('totalUsers').textContent = stats.total_users;
     } catch (error) {
         console.error('Error updating stats:', error);
     }
@@ -534,6 +609,30 @@ document.getElementById('refreshBtn').addEventListener('click', () => {
     loadAppointments(date);
 });
 
+// Descarga el histórico completo de citas en CSV (el servidor lo genera en streaming)
+async function exportAppointments() {
+    try {
+        const response = await fetch(`${API_BASE_URL}/appointments/admin/export?format=csv`, {
+            headers: { 'Authorization': `Bearer ${authToken}` }
+        });
+        
+        if (!response.ok) {
+            throw new Error(`API Error: ${response.status}`);
+        }
+        
+        const url = URL.createObjectURL(await response.blob());
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = 'citas.csv';
+        link.click();
+        URL.revokeObjectURL(url);
+    } catch (error) {
+        console.error('Error exporting appointments:', error);
+    }
+}
+
+document.getElementById('exportBtn').addEventListener('click', exportAppointments);
+
 function formatDate(dateStr) {
     const date = new Date(dateStr);
     return date.toLocaleDateString('es-ES', {
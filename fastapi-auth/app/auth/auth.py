@@ -1,43 +1,189 @@
+import asyncio
+import multiprocessing
+import time
+import uuid
+import weakref
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.auth.revocation import TokenDenylist
+from app.services.metrics import track_password_hash
 
 # Configuración de seguridad
-SECRET_KEY = "tu_clave_secreta_muy_segura_aqui_cambiar_en_produccion"
+SECRET_KEY = settings.secret_key
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
+
+# Tokens revocados antes de caducar (logout, refresh tokens rotados, usuarios desactivados)
+token_denylist = TokenDenylist(settings.token_denylist_path)
 
-# Configuración para el hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Configuración para el hashing de contraseñas.
+# Si cambia BCRYPT_ROUNDS, los hashes antiguos se marcan como obsoletos y se rehacen en el login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# Pool de procesos para bcrypt (se crea al primer uso) y límite de operaciones pendientes
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_slots = weakref.WeakKeyDictionary()  # un semáforo por event loop
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar contraseña plana contra hash"""
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verificar contraseña y devolver un hash nuevo si los parámetros de bcrypt han cambiado"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """Generar hash de contraseña"""
     return pwd_context.hash(password)
 
+def _get_hash_pool() -> Optional[ProcessPoolExecutor]:
+    global _hash_pool
+    if _hash_pool is None and settings.password_hash_workers > 0:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=settings.password_hash_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _hash_pool
+
+async def _run_hash(operation: str, func, *args):
+    """Ejecutar una operación de bcrypt fuera del event loop y del threadpool de FastAPI"""
+    loop = asyncio.get_running_loop()
+    slots = _hash_slots.get(loop)
+    if slots is None:
+        slots = _hash_slots.setdefault(loop, asyncio.Semaphore(settings.password_hash_queue))
+    
+    with track_password_hash(operation):
+        async with slots:
+            pool = _get_hash_pool()
+            if pool is None:
+                return await run_in_threadpool(func, *args)
+            return await loop.run_in_executor(pool, func, *args)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Versión asíncrona de verify_and_update_password ejecutada en el pool de bcrypt"""
+    return await _run_hash("verify", verify_and_update_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Versión asíncrona de get_password_hash ejecutada en el pool de bcrypt"""
+    return await _run_hash("hash", get_password_hash, password)
+
+def shutdown_hash_pool():
+    """Cerrar los procesos de bcrypt al apagar el servidor"""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+def new_token_id() -> str:
+    """Identificador único de token (`jti`) o de sesión (`fam`)"""
+    return uuid.uuid4().hex
+
+def _issued_at(subject: str) -> datetime:
+    """Hora de emisión de un token nuevo, en segundos enteros como el `iat` del JWT"""
+    return datetime.utcfromtimestamp(token_denylist.issued_at(subject))
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crear token JWT"""
     to_encode = data.copy()
+    now = _issued_at(data.get("sub"))
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(minutes=15)
+    to_encode.update({"exp": expire, "iat": now, "jti": new_token_id(), "type": "access"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, credentials_exception):
-    """Verificar token JWT"""
+def create_refresh_token(subject: str, family: str) -> str:
+    """Crear refresh token de una sesión; cada uso lo sustituye por otro de la misma familia"""
+    now = _issued_at(subject)
+    return jwt.encode({
+        "sub": subject,
+        "exp": now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        "iat": now,
+        "jti": new_token_id(),
+        "fam": family,
+        "type": "refresh",
+    }, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_stream_ticket(principal) -> str:
+    """Ticket de corta duración que solo sirve para abrir el stream de eventos.
+
+    EventSource no puede enviar cabeceras, así que lo que va en la URL es este ticket
+    (tipo "stream", caduca en EVENTS_TICKET_TTL segundos) y no el token de acceso.
+    """
+    now = _issued_at(principal.username)
+    return jwt.encode({
+        "sub": principal.username,
+        "uid": principal.id,
+        "active": bool(principal.is_active),
+        "exp": now + timedelta(seconds=settings.events_ticket_ttl),
+        "iat": now,
+        "jti": new_token_id(),
+        "type": "stream",
+    }, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_token_pair(user, family: Optional[str] = None) -> dict:
+    """Token de acceso y refresh token de un usuario (respuesta de /token y /token/refresh)"""
+    family = family or new_token_id()
+    claims = {**user_token_claims(user), "fam": family}
+    return {
+        "access_token": create_access_token(claims, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)),
+        "refresh_token": create_refresh_token(user.username, family),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+def decode_token(token: str, credentials_exception, token_type: str = "access",
+                 check_revoked: bool = True) -> dict:
+    """Verificar token JWT y devolver todos sus claims.
+
+    Rechaza los tokens de otro tipo (un refresh token no sirve como token de acceso)
+    y, salvo con `check_revoked=False`, los revocados, sin consultar la base de datos.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return username
     except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+    if payload.get("sub") is None:
+        raise credentials_exception
+    # Los tokens de acceso anteriores a los refresh tokens no llevan `type`
+    if payload.get("type", "access") != token_type:
+        raise credentials_exception
+    if check_revoked and token_denylist.is_revoked(payload):
+        raise credentials_exception
+    return payload
+
+def revoke_token(payload: dict):
+    """Revocar un token ya decodificado hasta su caducidad"""
+    if payload.get("jti"):
+        token_denylist.revoke(payload["jti"], payload["exp"])
+
+def revoke_session(payload: dict):
+    """Revocar todos los tokens de la sesión del token (logout o refresh token reutilizado)"""
+    revoke_token(payload)
+    if payload.get("fam"):
+        token_denylist.revoke_family(payload["fam"], time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+
+def revoke_user_tokens(username: str):
+    """Revocar todos los tokens emitidos hasta ahora a un usuario (desactivado o borrado)"""
+    token_denylist.revoke_user(username, REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+
+def verify_token(token: str, credentials_exception):
+    """Verificar token JWT"""
+    return decode_token(token, credentials_exception)["sub"]
+
+def user_token_claims(user) -> dict:
+    """Claims del token de un usuario (con uid/active si está activado jwt_user_claims)"""
+    claims = {"sub": user.username}
+    if settings.jwt_user_claims:
+        claims.update({"uid": user.id, "active": bool(user.is_active)})
+    return claims
@@ -1,28 +1,174 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database.database import get_db
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from app.config import settings
+from app.database.database import AsyncSessionLocal, get_db
 from app.models.user import User
-from app.auth.auth import verify_token
+from app.auth.auth import decode_token, revoke_user_tokens
+from app.services.cache import Cache, MemoryLRUBackend
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Igual, pero sin error si falta la cabecera (EventSource no puede enviar Authorization)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Obtener usuario actual desde el token"""
-    credentials_exception = HTTPException(
+# Caché de usuarios autenticados, por username (el `sub` del token)
+user_cache = Cache(MemoryLRUBackend(
+    maxsize=settings.user_cache_size,
+    ttl=settings.user_cache_ttl
+))
+
+@dataclass(frozen=True)
+class Principal:
+    """Identidad mínima del usuario autenticado, obtenida de los claims del token"""
+    id: int
+    username: str
+    is_active: bool
+
+def invalidate_user(username: str):
+    """Descartar un usuario de la caché (al desactivarlo o modificarlo)"""
+    user_cache.invalidate(username)
+
+# Usuarios pendientes de la transacción en curso (en `session.info`): entradas de la
+# caché que descartar y tokens que revocar cuando se confirme
+PENDING_INVALIDATIONS = "invalidate_cached_users"
+PENDING_REVOCATIONS = "revoke_user_tokens"
+
+AFTER_COMMIT = {
+    PENDING_INVALIDATIONS: invalidate_user,
+    PENDING_REVOCATIONS: revoke_user_tokens,
+}
+
+def _after_commit(target, pending: str, usernames):
+    session = object_session(target)
+    if session is None:
+        for username in usernames:
+            AFTER_COMMIT[pending](username)
+    else:
+        session.info.setdefault(pending, set()).update(usernames)
+
+def _revoke_after_commit(target):
+    _after_commit(target, PENDING_REVOCATIONS, [target.username])
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    """Invalidar la caché cuando cambia un usuario, incluido su username anterior.
+
+    Se hace al confirmar la transacción: si se hiciera en el flush, otra petición
+    podría volver a guardar la fila antigua, que aún es la confirmada.
+    """
+    history = inspect(target).attrs.username.history
+    _after_commit(target, PENDING_INVALIDATIONS, {target.username, *history.deleted})
+
+@event.listens_for(User, "after_update")
+def _revoke_deactivated_user_tokens(mapper, connection, target):
+    """Invalidar los tokens ya emitidos de un usuario al desactivarlo.
+
+    Sin esto seguirían valiendo hasta caducar, también los que autentican sin
+    consultar la base de datos (claims uid/active). La revocación espera al commit:
+    si la transacción se deshace, los tokens siguen valiendo.
+    """
+    history = inspect(target).attrs.is_active.history
+    if history.deleted and not target.is_active:
+        _revoke_after_commit(target)
+
+@event.listens_for(User, "after_delete")
+def _revoke_deleted_user_tokens(mapper, connection, target):
+    _revoke_after_commit(target)
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    for pending, apply in AFTER_COMMIT.items():
+        for username in session.info.pop(pending, ()):
+            apply(username)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    for pending in AFTER_COMMIT:
+        session.info.pop(pending, None)
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def _load_user(username: str, db: AsyncSession, credentials_exception) -> User:
+    """Obtener el usuario desde la caché o, si no está, desde la base de datos"""
+    user = user_cache.get(username)
+    if user is not None:
+        return user
     
-    username = verify_token(token, credentials_exception)
-    user = db.query(User).filter(User.username == username).first()
+    version = user_cache.version
+    user = await db.scalar(select(User).where(User.username == username))
     if user is None:
         raise credentials_exception
+    
+    # Se separa de la sesión para que un commit posterior no lo expire
+    db.expunge(user)
+    user_cache.set(username, user, version=version)
     return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """Obtener usuario actual desde el token"""
+    credentials_exception = _credentials_exception()
+    payload = decode_token(token, credentials_exception)
+    return await _load_user(payload["sub"], db, credentials_exception)
+
+async def _principal_from_token(token: str, db: AsyncSession) -> Principal:
+    credentials_exception = _credentials_exception()
+    payload = decode_token(token, credentials_exception)
+    
+    if "uid" in payload and "active" in payload:
+        principal = Principal(id=payload["uid"], username=payload["sub"], is_active=payload["active"])
+    else:
+        user = await _load_user(payload["sub"], db, credentials_exception)
+        principal = Principal(id=user.id, username=user.username, is_active=user.is_active)
+    
+    # Un usuario desactivado no se autentica aunque su token aún no haya caducado
+    if not principal.is_active:
+        raise credentials_exception
+    return principal
+
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """Obtener la identidad del usuario sin consultar la base de datos si el token la incluye.
+
+    Rechaza con 401 a los usuarios desactivados. Sin claims uid/active se comprueba
+    `is_active` en la caché de usuarios, así que un cambio hecho por otro proceso
+    tarda como mucho USER_CACHE_TTL; con claims vale lo que dice el token, y la
+    desactivación inmediata es la revocación de sus tokens al confirmar el cambio.
+    """
+    return await _principal_from_token(token, db)
+
+async def get_stream_principal(
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    ticket: Optional[str] = Query(None)
+):
+    """Identidad para conexiones largas (server-sent events).
+
+    Acepta el token de acceso en la cabecera o un ticket del stream en `?ticket=`
+    (POST /appointments/admin/events/ticket); el token de acceso nunca va en la URL.
+    Con la cabecera usa una sesión propia que se cierra enseguida para no retener una
+    conexión del pool mientras dura el stream.
+    """
+    if header_token:
+        async with AsyncSessionLocal() as db:
+            return await _principal_from_token(header_token, db)
+    if not ticket:
+        raise _credentials_exception()
+    
+    payload = decode_token(ticket, _credentials_exception(), token_type="stream")
+    if not payload["active"]:
+        raise _credentials_exception()
+    return Principal(id=payload["uid"], username=payload["sub"], is_active=payload["active"])
+
+async def get_current_active_user(current_user: User = Depends(get_current_user)):
     """Obtener usuario actual activo"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
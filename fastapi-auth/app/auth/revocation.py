@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class TokenDenylist:
+    """Tokens revocados antes de caducar, consultados en cada petición sin ir a la base de datos.
+
+    Guarda tres diccionarios con la hora de caducidad de cada entrada, así que las
+    comprobaciones son búsquedas O(1) y las entradas se descartan solas cuando el token
+    ya no sería válido de todas formas:
+
+    - `jti` de tokens concretos (logout, refresh token ya rotado)
+    - familias de refresh tokens (`fam`): todos los tokens de una sesión
+    - usuarios: los tokens emitidos hasta un segundo (usuario desactivado o borrado)
+
+    Los `jti` y `fam` son hexadecimales y se guardan como bytes (16 en vez de 32
+    caracteres). Es memoria de este proceso: con varios workers cada uno tiene la suya.
+    Con `path` se guarda en un fichero JSON a cada cambio y se carga al crearla, para
+    que un reinicio no vuelva a dar por buenos los tokens revocados.
+    """
+
+    def __init__(self, path: Optional[str] = None, prune_interval: float = 60.0):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._tokens: Dict[bytes, float] = {}
+        self._families: Dict[bytes, float] = {}
+        self._users: Dict[str, tuple] = {}  # sub -> (segundo hasta el que se revoca, caducidad de la entrada)
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+        if path:
+            self._load()
+
+    @staticmethod
+    def _key(value: str) -> bytes:
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            return value.encode("utf-8")
+
+    def revoke(self, jti: str, expires_at: float):
+        """Revocar un token concreto hasta su caducidad (segundos desde epoch)"""
+        self._add(self._tokens, self._key(jti), expires_at)
+
+    def revoke_family(self, family: str, expires_at: float):
+        """Revocar todos los tokens de una sesión (familia de refresh tokens)"""
+        self._add(self._families, self._key(family), expires_at)
+
+    def revoke_user(self, subject: str, lifetime: float):
+        """Revocar los tokens ya emitidos de un usuario; `lifetime` es lo que dura el más largo.
+
+        El `iat` de los tokens va en segundos enteros, así que se revoca hasta el segundo
+        actual incluido; los tokens nuevos de ese usuario salen con un `iat` posterior
+        (ver `issued_at`).
+        """
+        now = int(time.time())
+        with self._lock:
+            self._users[subject] = (now, now + lifetime)
+        self._changed()
+
+    def issued_at(self, subject: str) -> int:
+        """`iat` (segundos enteros) para un token nuevo del usuario.
+
+        Es el segundo actual, salvo que el usuario se haya revocado en este mismo segundo:
+        entonces el siguiente, para que el token nuevo no quede revocado.
+        """
+        now = int(time.time())
+        revoked = self._users.get(subject)
+        if revoked is not None and now <= revoked[0]:
+            return revoked[0] + 1
+        return now
+
+    def is_revoked(self, claims: dict) -> bool:
+        """True si el token (por sus claims) está revocado"""
+        jti = claims.get("jti")
+        if jti is not None and self._key(jti) in self._tokens:
+            return True
+        family = claims.get("fam")
+        if family is not None and self._key(family) in self._families:
+            return True
+        revoked = self._users.get(claims.get("sub"))
+        return revoked is not None and int(claims.get("iat", 0)) <= revoked[0]
+
+    def _add(self, entries: Dict[bytes, float], key: bytes, expires_at: float):
+        with self._lock:
+            entries[key] = expires_at
+        self._changed()
+
+    def _changed(self):
+        now = time.time()
+        if now >= self._next_prune:
+            self.prune(now)
+        if self.path:
+            self._save()
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Descartar las entradas de tokens que ya han caducado; devuelve cuántas"""
+        now = time.time() if now is None else now
+        before = len(self)
+        with self._lock:
+            self._next_prune = now + self.prune_interval
+            for entries in (self._tokens, self._families):
+                for key in [key for key, expires_at in entries.items() if expires_at <= now]:
+                    del entries[key]
+            for subject in [subject for subject, (_, expires_at) in self._users.items() if expires_at <= now]:
+                del self._users[subject]
+        return before - len(self)
+
+    def save(self):
+        """Guardar la lista en el fichero (si tiene `path`)"""
+        if self.path:
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._tokens) + len(self._families) + len(self._users)
+
+    def _save(self):
+        with self._lock:
+            data = {
+                "tokens": {key.hex(): expires_at for key, expires_at in self._tokens.items()},
+                "families": {key.hex(): expires_at for key, expires_at in self._families.items()},
+                "users": self._users,
+            }
+        # Se escribe a un fichero temporal y se renombra para no dejarlo a medias
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporary, self.path)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            logger.exception("No se ha podido leer la lista de tokens revocados de %s", self.path)
+            return
+        self._tokens = {bytes.fromhex(key): value for key, value in data.get("tokens", {}).items()}
+        self._families = {bytes.fromhex(key): value for key, value in data.get("families", {}).items()}
+        self._users = {subject: (int(until), expires_at) for subject, (until, expires_at) in data.get("users", {}).items()}
+        self.prune()
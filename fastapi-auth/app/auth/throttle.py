@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+class LoginThrottle:
+    """Límite de intentos de login fallidos por cuenta en una ventana deslizante.
+
+    Se comprueba antes de ejecutar bcrypt, así que un ataque de credential stuffing
+    contra una cuenta no puede consumir CPU indefinidamente. El número de cuentas
+    vigiladas está acotado (se descartan las menos recientes).
+    """
+
+    def __init__(self, max_failures: int, window: float, max_keys: int = 10000):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_keys = max_keys
+        self._failures: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, attempts: deque, now: float):
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+
+    def retry_after(self, key: str) -> int:
+        """Segundos que faltan para poder volver a intentarlo (0 si está permitido)"""
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._failures.get(key)
+            if not attempts:
+                return 0
+            self._prune(attempts, now)
+            if len(attempts) < self.max_failures:
+                return 0
+            return int(attempts[0] + self.window - now) + 1
+
+    def record_failure(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._failures.setdefault(key, deque())
+            self._failures.move_to_end(key)
+            self._prune(attempts, now)
+            attempts.append(now)
+            while len(attempts) > self.max_failures:
+                attempts.popleft()
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._failures.pop(key, None)
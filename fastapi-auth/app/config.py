@@ -0,0 +1,139 @@
+import os
+from typing import Dict, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Directorio del paquete `app` (ubicación por defecto de la base de datos SQLite)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class Settings(BaseSettings):
+    """Configuración de la aplicación.
+
+    Cada valor se puede sobrescribir con una variable de entorno del mismo nombre
+    (sin distinguir mayúsculas) o desde un fichero .env.
+    """
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Base de datos: la URL síncrona la usan los scripts; las peticiones usan la versión
+    # asíncrona (sqlite+aiosqlite, postgresql+asyncpg, ...) derivada de ella o indicada aparte
+    database_url: str = f"sqlite:///{os.path.join(BASE_DIR, 'app.db')}"
+    async_database_url: Optional[str] = None
+
+    # Pool de conexiones
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30  # segundos esperando una conexión libre
+    db_pool_pre_ping: bool = True
+
+    # Tiempo máximo de la consulta de /health antes de responder 503
+    health_check_timeout: float = 2.0  # segundos
+
+    # PRAGMAs de SQLite aplicados a cada conexión nueva
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout: int = 5000  # milisegundos
+    sqlite_mmap_size: int = 268435456  # 256 MiB
+    sqlite_cache_size: int = -65536  # negativo = KiB (64 MiB)
+
+    # Agenda: duración de cada hueco y segundos que se guarda en memoria la configuración
+    # de barberos, horarios, servicios y festivos
+    slot_minutes: int = 30
+    schedule_cache_ttl: int = 60
+
+    # Caché de disponibilidad por fecha
+    availability_cache_size: int = 512
+    availability_cache_ttl: int = 300  # segundos
+
+    # Caché de usuarios autenticados (evita la consulta por petición en get_current_user)
+    user_cache_size: int = 1024
+    user_cache_ttl: int = 60  # segundos
+
+    # Tokens JWT: clave de firma (cambiar en producción con SECRET_KEY), duración del token
+    # de acceso y del refresh token, y fichero opcional donde guardar los tokens revocados
+    secret_key: str = "tu_clave_secreta_muy_segura_aqui_cambiar_en_produccion"
+    access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 30
+    token_denylist_path: Optional[str] = None
+
+    # Incluir user_id e is_active en el JWT para autenticar sin consultar la base de datos
+    jwt_user_claims: bool = False
+
+    # Hashing de contraseñas: coste de bcrypt y procesos dedicados (0 = hilo del servidor)
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_queue: int = 32  # operaciones de hash pendientes como máximo
+
+    # Segundos que vale como mucho un ETag sin cambios en este proceso (los cambios
+    # hechos desde otro worker no suben los contadores de versión de este)
+    etag_ttl: int = 60
+
+    # Listados grandes codificados directamente a JSON (orjson si está instalado), sin un
+    # modelo Pydantic por fila; también fija la clase de respuesta por defecto de la API
+    fast_json: bool = True
+
+    # Filas leídas por bloque en las exportaciones CSV/NDJSON (memoria constante)
+    export_batch_size: int = 500
+
+    # Eventos en vivo del panel (server-sent events)
+    events_queue_size: int = 256  # eventos pendientes por suscriptor antes de pedir un resync
+    events_max_subscribers: int = 100
+    events_heartbeat: float = 15.0  # segundos entre comentarios de keep-alive
+    events_ticket_ttl: int = 60  # segundos que vale un ticket para abrir el stream
+
+    # Idempotency-Key al crear citas: tiempo que se guarda cada respuesta y cada cuánto
+    # borra la tarea programada las caducadas (segundos)
+    idempotency_ttl: int = 86400
+    idempotency_gc_interval: int = 3600
+
+    # Límite de intentos fallidos de login por cuenta
+    login_max_failures: int = 5
+    login_failure_window: int = 300  # segundos
+
+    # Límite de peticiones por usuario (con token) o por IP. Las claves son "MÉTODO /ruta"
+    # (como en las rutas de FastAPI, con {parámetros}) o "*" para el resto; los valores,
+    # N/second, N/minute, N/hour o N/day. Desde el entorno, RATE_LIMITS en JSON.
+    rate_limit_enabled: bool = True
+    rate_limits: Dict[str, str] = {
+        "POST /api/v1/token": "20/minute",
+        "POST /api/v1/token/refresh": "30/minute",
+        "POST /api/v1/signup": "10/hour",
+        "GET /api/v1/appointments/availability/{date}": "120/minute",
+        "GET /api/v1/appointments/availability": "120/minute",
+        "*": "600/minute",
+    }
+    rate_limit_max_keys: int = 100000  # clientes vigilados a la vez como máximo
+
+    # Tareas programadas (app/services/jobs.py). Cada programación es un número de
+    # segundos o una expresión cron de 5 campos ("minuto hora día mes día-semana", hora local)
+    scheduler_enabled: bool = True
+    appointment_archive_schedule: str = "30 3 * * *"
+    appointment_archive_after_days: int = 90  # las citas más antiguas pasan a appointments_history
+    appointment_archive_batch_size: int = 500
+    token_prune_interval: int = 3600  # segundos
+    availability_prewarm_schedule: str = "55 8 * * *"
+    availability_prewarm_days: int = 14
+
+    # Notificaciones: se guardan en la tabla outbox en la misma transacción que la cita y
+    # las envía en segundo plano el dispatcher de cada worker. Transporte: log (solo las
+    # escribe en el log), file (una línea JSON por mensaje en NOTIFICATION_FILE_PATH) o smtp
+    outbox_enabled: bool = True
+    notification_transport: str = "log"
+    notification_file_path: str = os.path.join(BASE_DIR, "notifications.jsonl")
+    notification_reminder_hours: int = 24  # antelación del recordatorio
+    smtp_host: str = "localhost"
+    smtp_port: int = 25
+    smtp_username: Optional[str] = None
+    smtp_password: Optional[str] = None
+    smtp_starttls: bool = False
+    smtp_sender: str = "citas@barberia.com"
+    outbox_batch_size: int = 100  # mensajes reclamados por ronda
+    outbox_concurrency: int = 20  # envíos simultáneos por worker
+    outbox_poll_interval: float = 5.0  # segundos entre rondas si no hay nada pendiente
+    outbox_send_timeout: float = 30.0  # segundos
+    outbox_max_attempts: int = 5
+    outbox_retry_base: float = 30.0  # segundos hasta el primer reintento; se duplica en cada uno
+    outbox_retry_max: float = 3600.0
+    outbox_retention_days: int = 7  # días que se guardan los mensajes enviados o fallidos
+    outbox_prune_schedule: str = "0 4 * * *"
+
+settings = Settings()
@@ -1,23 +1,130 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-# Obtener el directorio actual del proyecto
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'app.db')}"
+from app.config import Settings, settings
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Drivers asíncronos por defecto para cada base de datos
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+def to_async_url(url: str) -> str:
+    """Convertir una URL síncrona en su equivalente con driver asíncrono"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS or parsed.get_driver_name() in ASYNC_DRIVERS.values():
+        return url
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+# Dialectos que soportan INSERT ... ON CONFLICT
+CONFLICT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+def insert_ignoring_conflicts(dialect_name: str, model, index_elements: list):
+    """INSERT que no hace nada si la fila choca con un índice único.
+
+    Así una colisión esperada (dos reservas del mismo horario) no pasa por una excepción.
+    En dialectos sin ON CONFLICT se devuelve un INSERT normal y la colisión llega como IntegrityError.
+    """
+    conflict_insert = CONFLICT_INSERTS.get(dialect_name)
+    if conflict_insert is None:
+        return insert(model)
+    return conflict_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+def insert_adding_on_conflict(dialect_name: str, model, index_elements: list, column: str):
+    """INSERT que, si la fila ya existe, suma a `column` el valor insertado (contadores).
+
+    Devuelve None en dialectos sin ON CONFLICT.
+    """
+    conflict_insert = CONFLICT_INSERTS.get(dialect_name)
+    if conflict_insert is None:
+        return None
+    statement = conflict_insert(model)
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: getattr(model, column) + statement.excluded[column]}
+    )
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def sqlite_pragmas(config: Settings) -> dict:
+    """PRAGMAs que se ejecutan al abrir cada conexión SQLite"""
+    return {
+        "journal_mode": config.sqlite_journal_mode,
+        "synchronous": config.sqlite_synchronous,
+        "busy_timeout": config.sqlite_busy_timeout,
+        "mmap_size": config.sqlite_mmap_size,
+        "cache_size": config.sqlite_cache_size,
+        "foreign_keys": "ON",
+    }
+
+def _install_sqlite_pragmas(sync_engine: Engine, pragmas: dict):
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_db_engine(url: str, config: Settings = settings, is_async: bool = False, tuned: bool = True):
+    """Crear el motor de base de datos con pool dimensionado y, en SQLite, los PRAGMAs de producción.
+
+    Con `tuned=False` se devuelve el motor con la configuración por defecto de SQLAlchemy
+    (lo usa el benchmark para comparar).
+    """
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    kwargs = {}
+
+    if is_sqlite and not is_async:
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    if tuned and not _is_memory_sqlite(parsed):
+        kwargs.update(
+            poolclass=AsyncAdaptedQueuePool if is_async else QueuePool,
+            pool_size=config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_timeout=config.db_pool_timeout,
+            pool_pre_ping=config.db_pool_pre_ping,
+        )
+
+    if is_async:
+        db_engine = create_async_engine(url, **kwargs)
+        sync_engine = db_engine.sync_engine
+    else:
+        db_engine = create_engine(url, **kwargs)
+        sync_engine = db_engine
+
+    if tuned and is_sqlite:
+        _install_sqlite_pragmas(sync_engine, sqlite_pragmas(config))
+    return db_engine
+
+DATABASE_URL = settings.database_url
+ASYNC_DATABASE_URL = settings.async_database_url or to_async_url(DATABASE_URL)
+
+# Motor síncrono: scripts de mantenimiento y migraciones
+engine: Engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono: todas las peticiones de la API
+async_engine: AsyncEngine = create_db_engine(ASYNC_DATABASE_URL, is_async=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     """
-    Función de dependencia para obtener la sesión de la base de datos
+    Función de dependencia para obtener la sesión asíncrona de la base de datos
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
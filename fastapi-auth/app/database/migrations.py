@@ -0,0 +1,250 @@
+"""Migraciones de esquema versionadas.
+
+Cada migración tiene un número; la tabla schema_version guarda el de la última
+aplicada. `python manage.py migrate` aplica las pendientes en orden, cada una en su
+propia transacción junto con el cambio de versión, y la aplicación solo comprueba
+al arrancar que la base de datos está en la última (check_schema).
+
+Las tablas se crean con las definiciones congeladas de app/database/snapshots.py,
+no con los modelos, así que lo que hace cada migración no cambia al editar un modelo.
+La migración 1 crea las tablas que falten del esquema que había al introducir las
+migraciones; en una base de datos nueva algunas de las siguientes se encuentran el
+cambio ya hecho, así que todas deben comprobar antes si hay algo que hacer. Las bases
+de datos anteriores a este sistema no tienen schema_version y se migran desde la
+versión 0 de la misma forma.
+"""
+import logging
+from datetime import time
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import Column, Integer, MetaData, Table, func, insert, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.database.database import insert_ignoring_conflicts
+from app.database.snapshots import INITIAL_TABLES, OUTBOX_TABLES, SCHEDULER_TABLES, snapshot_metadata
+from app.models import (
+    Appointment, AppointmentHistory, AppointmentSlot, AppointmentStat, Barber, DayOccupancy, Service,
+    WorkingHours
+)
+from app.services.occupancy import rebuild_occupancy
+from app.services.stats import rebuild_stats
+from app.services.scheduling import SLOT_MINUTES, slot_index, slot_rows
+
+logger = logging.getLogger(__name__)
+
+# Barbero y duraciones que se crean si la agenda está vacía: el horario que tenía la
+# barbería (todos los días de 9:00 a 18:00) y los servicios que ofrece la app móvil
+DEFAULT_BARBER = "Gallego"
+DEFAULT_HOURS = (time(9, 0), time(18, 0))
+DEFAULT_SERVICES = {
+    "Corte de pelo": 30,
+    "Afeitado": 30,
+    "Corte y afeitado": 60,
+    "Peinado": 30,
+    "Tinte": 90,
+}
+
+# Versión del esquema: una sola fila con el número de la última migración aplicada
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version", version_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False)
+)
+
+def _create_tables(conn):
+    """Crear las tablas que falten (users, appointments, agenda, estadísticas...)"""
+    snapshot_metadata.create_all(bind=conn, tables=INITIAL_TABLES)
+
+def _add_appointment_schedule_columns(conn):
+    """Añadir barber_id y duration_minutes a appointments si faltan"""
+    columns = {column["name"] for column in inspect(conn).get_columns("appointments")}
+    if "barber_id" in columns:
+        return
+
+    conn.execute(text("ALTER TABLE appointments ADD COLUMN barber_id INTEGER REFERENCES barbers (id)"))
+    if "duration_minutes" not in columns:
+        conn.execute(text("ALTER TABLE appointments ADD COLUMN duration_minutes INTEGER NOT NULL DEFAULT 30"))
+    logger.info("Columnas barber_id y duration_minutes añadidas a appointments")
+
+def _replace_appointments_date_time_index(conn):
+    """Sustituir el índice único (date, time) por uno normal: con varios barberos
+    puede haber varias citas a la misma hora (los solapes los controla appointment_slots)"""
+    indexes = {index["name"] for index in inspect(conn).get_indexes("appointments")}
+    if "ix_appointments_date_time" in indexes:
+        conn.execute(text("DROP INDEX ix_appointments_date_time"))
+        logger.info("Índice único ix_appointments_date_time eliminado")
+    if "ix_appointments_day" not in indexes:
+        conn.execute(text("CREATE INDEX ix_appointments_day ON appointments (date, time)"))
+
+def _ensure_default_schedule(conn):
+    """Crear el barbero por defecto y las duraciones de los servicios si no hay agenda"""
+    if conn.execute(select(func.count()).select_from(Barber.__table__)).scalar():
+        return
+
+    barber_id = conn.execute(
+        insert(Barber.__table__).values(name=DEFAULT_BARBER, is_active=True).returning(Barber.__table__.c.id)
+    ).scalar()
+    conn.execute(insert(WorkingHours.__table__), [
+        {"barber_id": barber_id, "weekday": weekday, "start_time": DEFAULT_HOURS[0], "end_time": DEFAULT_HOURS[1]}
+        for weekday in range(7)
+    ])
+
+    existing = set(conn.execute(select(Service.__table__.c.name)).scalars())
+    services = [
+        {"name": name, "duration_minutes": minutes}
+        for name, minutes in DEFAULT_SERVICES.items() if name not in existing
+    ]
+    if services:
+        conn.execute(insert(Service.__table__), services)
+    logger.info("Agenda por defecto creada (barbero %s)", DEFAULT_BARBER)
+
+def _backfill_appointment_slots(conn):
+    """Asignar las citas anteriores a la agenda al barbero por defecto y ocupar sus huecos"""
+    pending = conn.execute(select(Appointment.id).where(Appointment.barber_id.is_(None))).scalars().all()
+    if not pending:
+        return
+
+    barber_id = conn.execute(select(func.min(Barber.__table__.c.id))).scalar()
+    conn.execute(text("UPDATE appointments SET barber_id = :barber WHERE barber_id IS NULL"), {"barber": barber_id})
+
+    rows = []
+    for appointment_id, day, start_time, minutes in conn.execute(
+        select(Appointment.id, Appointment.date, Appointment.time, Appointment.duration_minutes)
+        .where(Appointment.id.in_(pending))
+    ).all():
+        start = slot_index(start_time)
+        if start is not None:
+            rows.extend(slot_rows(barber_id, day, start, max(1, -(-minutes // SLOT_MINUTES)), appointment_id))
+    if not rows:
+        return
+
+    inserted = conn.execute(
+        insert_ignoring_conflicts(conn.dialect.name, AppointmentSlot, ["barber_id", "date", "slot"])
+        .returning(AppointmentSlot.slot),
+        rows
+    ).all()
+    if len(inserted) < len(rows):
+        logger.warning(
+            "%d huecos de citas anteriores se solapan con otras citas y no se han ocupado",
+            len(rows) - len(inserted)
+        )
+
+def _add_appointment_slots_day_index(conn):
+    """Índice por fecha de appointment_slots (create_all no lo añade a una tabla ya creada)"""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_appointment_slots_day ON appointment_slots (date)"))
+
+def _backfill_day_occupancy(conn):
+    """Calcular day_occupancy la primera vez, si ya había citas antes de existir la tabla"""
+    if conn.execute(select(func.count()).select_from(DayOccupancy.__table__)).scalar():
+        return
+    if not conn.execute(select(func.count()).select_from(AppointmentSlot.__table__)).scalar():
+        return
+
+    rebuild_occupancy(Session(bind=conn))
+    logger.info("Tabla day_occupancy calculada a partir de las citas existentes")
+
+def _add_appointments_user_index(conn):
+    """Índice por usuario de appointments (my-appointments filtra por user_id)"""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_appointments_user ON appointments (user_id)"))
+
+def _replace_appointments_user_index(conn):
+    """Sustituir el índice por usuario por (user_id, date, time): my-appointments pagina por
+    fecha y hora, y así cada página es un rango del índice en el mismo orden"""
+    conn.execute(text("DROP INDEX IF EXISTS ix_appointments_user"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_appointments_user_day ON appointments (user_id, date, time)"
+    ))
+
+def _create_scheduler_tables(conn):
+    """Tablas de las tareas programadas: bloqueos entre workers e histórico de citas"""
+    snapshot_metadata.create_all(bind=conn, tables=SCHEDULER_TABLES)
+
+def _create_outbox_table(conn):
+    """Tabla outbox de las notificaciones pendientes de enviar"""
+    snapshot_metadata.create_all(bind=conn, tables=OUTBOX_TABLES)
+
+def _backfill_appointment_stats(conn):
+    """Calcular appointment_stats si está vacía y ya hay citas (antes lo hacía init_database.py)"""
+    if conn.execute(select(func.count()).select_from(AppointmentStat.__table__)).scalar():
+        return
+    appointments = conn.execute(select(func.count()).select_from(Appointment.__table__)).scalar()
+    archived = conn.execute(select(func.count()).select_from(AppointmentHistory.__table__)).scalar()
+    if not appointments and not archived:
+        return
+
+    rebuild_stats(Session(bind=conn))
+    logger.info("Tabla appointment_stats calculada a partir de las citas existentes")
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+# Nunca se renumeran ni se editan las ya publicadas: los cambios nuevos van al final
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Tablas iniciales", _create_tables),
+    Migration(2, "Columnas de agenda en appointments", _add_appointment_schedule_columns),
+    Migration(3, "Índice no único (date, time) de appointments", _replace_appointments_date_time_index),
+    Migration(4, "Barbero y servicios por defecto", _ensure_default_schedule),
+    Migration(5, "Huecos ocupados de las citas anteriores a la agenda", _backfill_appointment_slots),
+    Migration(6, "Índice por fecha de appointment_slots", _add_appointment_slots_day_index),
+    Migration(7, "Ocupación por día de las citas existentes", _backfill_day_occupancy),
+    Migration(8, "Índice por usuario de appointments", _add_appointments_user_index),
+    Migration(9, "Índice (user_id, date, time) de appointments", _replace_appointments_user_index),
+    Migration(10, "Tablas job_locks y appointments_history", _create_scheduler_tables),
+    Migration(11, "Tabla outbox de notificaciones", _create_outbox_table),
+    Migration(12, "Estadísticas agregadas de las citas existentes", _backfill_appointment_stats),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+def current_version(conn) -> int:
+    """Versión del esquema de la base de datos (0 si nunca se ha migrado)"""
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(schema_version.c.version)).scalar() or 0
+
+def migrate(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """Aplicar en orden las migraciones pendientes hasta `target` (por defecto, la última).
+
+    Devuelve las migraciones aplicadas. Cada una se ejecuta en su propia transacción,
+    que empieza bloqueando la fila de schema_version: si dos procesos migran a la vez,
+    el segundo espera y se salta lo que ya ha aplicado el primero.
+    """
+    target = LATEST_VERSION if target is None else target
+    with engine.begin() as conn:
+        version_metadata.create_all(bind=conn)
+        conn.execute(
+            insert_ignoring_conflicts(conn.dialect.name, schema_version, ["id"]).values(id=1, version=0)
+        )
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version > target:
+            break
+        with engine.begin() as conn:
+            conn.execute(update(schema_version).values(version=schema_version.c.version))
+            if conn.execute(select(schema_version.c.version)).scalar() >= migration.version:
+                continue
+            migration.upgrade(conn)
+            conn.execute(update(schema_version).values(version=migration.version))
+        logger.info("Migración %d aplicada: %s", migration.version, migration.description)
+        applied.append(migration)
+    return applied
+
+def check_schema(engine: Engine):
+    """Comprobar al arrancar que la base de datos está en la última versión (una consulta, sin DDL)"""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version < LATEST_VERSION:
+        raise RuntimeError(
+            f"La base de datos está en la versión {version} del esquema y la aplicación necesita la "
+            f"{LATEST_VERSION}. Ejecute: python manage.py migrate"
+        )
+    if version > LATEST_VERSION:
+        raise RuntimeError(
+            f"La base de datos está en la versión {version} del esquema, más nueva que la de esta "
+            f"versión de la aplicación ({LATEST_VERSION})"
+        )
@@ -0,0 +1,169 @@
+"""Tablas tal y como las crean las migraciones, congeladas.
+
+Las migraciones que crean tablas usan estas definiciones y no los modelos de
+app/models: si un modelo cambia después, lo que crea una migración ya publicada no
+cambia con él, y el cambio va en una migración nueva (columnas con ALTER TABLE,
+índices, tablas nuevas). Estas tablas no se editan nunca; las de una migración nueva
+se añaden al final.
+"""
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text, Time,
+    UniqueConstraint
+)
+from sqlalchemy.sql import func
+
+snapshot_metadata = MetaData()
+
+# --- Migración 1: el esquema que había al introducir las migraciones ---
+
+users = Table(
+    "users", snapshot_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String, unique=True, index=True, nullable=False),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+barbers = Table(
+    "barbers", snapshot_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, unique=True, nullable=False),
+    Column("is_active", Boolean, nullable=False),
+)
+
+appointments = Table(
+    "appointments", snapshot_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("barber_id", Integer, ForeignKey("barbers.id"), nullable=True),
+    Column("date", Date, nullable=False),
+    Column("time", Time, nullable=False),
+    Column("service_type", String, nullable=False),
+    Column("duration_minutes", Integer, nullable=False),
+    Column("notes", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_appointments_day", "date", "time"),
+    Index("ix_appointments_user", "user_id"),
+)
+
+appointment_stats = Table(
+    "appointment_stats", snapshot_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("date", Date, nullable=False, index=True),
+    Column("weekday", Integer, nullable=False),
+    Column("hour", Integer, nullable=False),
+    Column("service_type", String, nullable=False),
+    Column("count", Integer, nullable=False),
+    UniqueConstraint("date", "hour", "service_type", name="uq_appointment_stats_bucket"),
+)
+
+working_hours = Table(
+    "working_hours", snapshot_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("barber_id", Integer, ForeignKey("barbers.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("weekday", Integer, nullable=False),
+    Column("start_time", Time, nullable=False),
+    Column("end_time", Time, nullable=False),
+)
+
+time_off = Table(
+    "time_off", snapshot_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("barber_id", Integer, ForeignKey("barbers.id", ondelete="CASCADE"), nullable=True),
+    Column("date", Date, nullable=False, index=True),
+    Column("start_time", Time, nullable=True),
+    Column("end_time", Time, nullable=True),
+    Column("reason", String, nullable=True),
+)
+
+services = Table(
+    "services", snapshot_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, unique=True, nullable=False),
+    Column("duration_minutes", Integer, nullable=False),
+)
+
+appointment_slots = Table(
+    "appointment_slots", snapshot_metadata,
+    Column("barber_id", Integer, ForeignKey("barbers.id"), primary_key=True),
+    Column("date", Date, primary_key=True),
+    Column("slot", Integer, primary_key=True),
+    Column("appointment_id", Integer, ForeignKey("appointments.id", ondelete="CASCADE"), nullable=False),
+    Index("ix_appointment_slots_appointment", "appointment_id"),
+    Index("ix_appointment_slots_day", "date"),
+)
+
+day_occupancy = Table(
+    "day_occupancy", snapshot_metadata,
+    Column("date", Date, primary_key=True),
+    Column("booked_slots", Integer, nullable=False),
+    Column("capacity", Integer, nullable=False),
+    Column("bitmap", String, nullable=False),
+)
+
+idempotency_keys = Table(
+    "idempotency_keys", snapshot_metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("key", String, primary_key=True),
+    Column("request_hash", String(64), nullable=False),
+    Column("status_code", Integer, nullable=False),
+    Column("response_body", Text, nullable=False),
+    Column("expires_at", DateTime, nullable=False, index=True),
+)
+
+INITIAL_TABLES = [
+    users, barbers, appointments, appointment_stats, working_hours, time_off, services,
+    appointment_slots, day_occupancy, idempotency_keys
+]
+
+# --- Migración 10: tareas programadas ---
+
+job_locks = Table(
+    "job_locks", snapshot_metadata,
+    Column("name", String, primary_key=True),
+    Column("locked_by", String, nullable=True),
+    Column("locked_until", DateTime, nullable=True),
+    Column("scheduled_for", DateTime, nullable=True),
+    Column("finished_at", DateTime, nullable=True),
+    Column("status", String, nullable=True),
+)
+
+appointments_history = Table(
+    "appointments_history", snapshot_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=True),
+    Column("barber_id", Integer, nullable=True),
+    Column("date", Date, nullable=False, index=True),
+    Column("time", Time, nullable=False),
+    Column("service_type", String, nullable=False),
+    Column("duration_minutes", Integer, nullable=False),
+    Column("notes", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), nullable=True),
+    Column("archived_at", DateTime(timezone=True), nullable=False),
+    Index("ix_appointments_history_user_day", "user_id", "date", "time"),
+)
+
+SCHEDULER_TABLES = [job_locks, appointments_history]
+
+# --- Migración 11: outbox de notificaciones ---
+
+outbox = Table(
+    "outbox", snapshot_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("kind", String, nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("appointment_id", Integer, nullable=True, index=True),
+    Column("payload", Text, nullable=False),
+    Column("status", String, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("available_at", DateTime, nullable=False),
+    Column("created_at", DateTime, server_default=func.now()),
+    Column("sent_at", DateTime, nullable=True),
+    Column("last_error", Text, nullable=True),
+    Index("ix_outbox_due", "status", "available_at"),
+)
+
+OUTBOX_TABLES = [outbox]
@@ -0,0 +1,81 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.metrics import (
+    RequestStats, current_request,
+    http_requests, http_request_duration, http_requests_in_flight,
+    http_request_db_queries, http_request_db_duration
+)
+
+def _matching_route(scope: Scope):
+    """Ruta que atendería la petición si hubiera llegado al router.
+
+    Las respuestas que da un middleware interior (los 429 del límite de peticiones)
+    no pasan por el router y no dejan `route` en el scope.
+    """
+    router = getattr(scope.get("app"), "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+def _route_path(scope: Scope) -> str:
+    """Plantilla de la ruta (`/api/v1/appointments/{appointment_id}`) para no crear una serie por id"""
+    route = scope.get("route") or _matching_route(scope)
+    return getattr(route, "path", None) or "unmatched"
+
+def server_timing(stats: RequestStats, elapsed: float) -> str:
+    """Cabecera Server-Timing con el reparto del tiempo de la petición"""
+    parts = [
+        f"app;dur={elapsed * 1000:.1f}",
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_queries} queries"',
+    ]
+    if stats.hash_time:
+        parts.append(f"bcrypt;dur={stats.hash_time * 1000:.1f}")
+    return ", ".join(parts)
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide latencia, estado y consultas SQL de cada petición.
+
+    Las consultas y el tiempo de bcrypt se acumulan en `current_request` desde los
+    eventos de SQLAlchemy y el pool de hashing, y se devuelven en `Server-Timing`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(stats, time.perf_counter() - started))
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            current_request.reset(token)
+
+            route = _route_path(scope)
+            http_requests.inc(method=scope["method"], route=route, status=status_code)
+            http_request_duration.observe(elapsed, method=scope["method"], route=route)
+            http_request_db_queries.observe(stats.db_queries, route=route)
+            http_request_db_duration.observe(stats.db_time, route=route)
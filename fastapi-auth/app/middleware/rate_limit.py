@@ -0,0 +1,93 @@
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.auth.auth import ALGORITHM, SECRET_KEY
+from app.services.metrics import rate_limit_requests
+from app.services.rate_limit import GCRALimiter, RouteLimits
+
+# `sub` y caducidad de los tokens válidos ya vistos: un cliente repite el mismo token en
+# muchas peticiones, así que la firma se comprueba una vez por token y no en cada petición.
+# Al llenarse se descarta el más antiguo
+MAX_CACHED_TOKENS = 50000
+_subjects: Dict[str, Tuple[str, float]] = {}
+
+def _token_subject(token: str) -> Optional[str]:
+    """`sub` del JWT si la firma es válida y no ha caducado; si no, None.
+
+    Sin verificar la firma, un token inventado con un `sub` distinto en cada petición
+    tendría siempre un cubo nuevo y se saltaría el límite por IP. Los tokens no válidos
+    no se guardan, para que no puedan llenar la caché.
+    """
+    cached = _subjects.get(token)
+    if cached is not None:
+        subject, expires_at = cached
+        if expires_at > time.time():
+            return subject
+        del _subjects[token]
+        return None
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    subject = claims.get("sub")
+    if not isinstance(subject, str):
+        return None
+    if len(_subjects) >= MAX_CACHED_TOKENS:
+        del _subjects[next(iter(_subjects))]
+    _subjects[token] = (subject, float(claims.get("exp", math.inf)))
+    return subject
+
+def client_key(scope: Scope) -> str:
+    """Usuario del token Bearer si es válido; si no, la IP del cliente"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                subject = _token_subject(token)
+                if subject is not None:
+                    return f"user:{subject}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+class RateLimitMiddleware:
+    """Middleware ASGI que aplica los límites por ruta con un limitador GCRA en memoria.
+
+    Responde 429 con Retry-After sin llegar a la aplicación, así que un cliente que
+    abusa no ocupa el pool de conexiones ni el de bcrypt.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: GCRALimiter, limits: RouteLimits):
+        self.app = app
+        self.limiter = limiter
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.limits.match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.limiter.hit((rule.name, client_key(scope)), rule.limit, rule.period)
+        if wait:
+            rate_limit_requests.inc(rule=rule.name, result="limited")
+            response = JSONResponse(
+                {"detail": "Demasiadas peticiones. Inténtalo más tarde"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+            await response(scope, receive, send)
+            return
+
+        rate_limit_requests.inc(rule=rule.name, result="allowed")
+        await self.app(scope, receive, send)
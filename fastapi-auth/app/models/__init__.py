@@ -1,3 +1,10 @@
 # Paquete de modelos
 from app.models.user import User
-from app.models.appointment import Appointment
\ No newline at end of file
+from app.models.appointment import Appointment
+from app.models.appointment_stat import AppointmentStat
+from app.models.schedule import Barber, WorkingHours, TimeOff, Service, AppointmentSlot
+from app.models.day_occupancy import DayOccupancy
+from app.models.idempotency_key import IdempotencyKey
+from app.models.appointment_history import AppointmentHistory
+from app.models.job_lock import JobLock
+from app.models.outbox_message import OutboxMessage
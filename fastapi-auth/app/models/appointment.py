@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.sqltypes import DateTime
@@ -7,12 +7,20 @@ from app.database.database import Base
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Búsqueda por fecha/hora; los solapes los impide la tabla appointment_slots
+        Index("ix_appointments_day", "date", "time"),
+        # Citas de un usuario en orden cronológico (my-appointments, próximas y pasadas)
+        Index("ix_appointments_user_day", "user_id", "date", "time"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
+    barber_id = Column(Integer, ForeignKey("barbers.id"), nullable=True)
     date = Column(Date, nullable=False)
     time = Column(Time, nullable=False)
     service_type = Column(String, nullable=False)
+    duration_minutes = Column(Integer, nullable=False, default=30)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Date, Time, Text, Index
+from sqlalchemy.sql.sqltypes import DateTime
+
+from app.database.database import Base
+
+class AppointmentHistory(Base):
+    """Citas pasadas que la tarea de archivado ha sacado de appointments.
+
+    Mismas columnas que appointments (con el mismo id) más la fecha de archivado. Así la
+    tabla que leen la disponibilidad y los listados solo contiene las citas recientes.
+    """
+    __tablename__ = "appointments_history"
+    __table_args__ = (
+        Index("ix_appointments_history_user_day", "user_id", "date", "time"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=True)
+    barber_id = Column(Integer, nullable=True)
+    date = Column(Date, nullable=False, index=True)
+    time = Column(Time, nullable=False)
+    service_type = Column(String, nullable=False)
+    duration_minutes = Column(Integer, nullable=False)
+    notes = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), nullable=False)
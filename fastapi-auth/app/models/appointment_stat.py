@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Date, UniqueConstraint
+
+from app.database.database import Base
+
+class AppointmentStat(Base):
+    """Contador agregado de citas por día, hora y servicio.
+
+    Se mantiene de forma incremental al crear y cancelar citas, de modo que las
+    estadísticas se leen en O(buckets) y no en O(citas).
+    """
+    __tablename__ = "appointment_stats"
+    __table_args__ = (
+        UniqueConstraint("date", "hour", "service_type", name="uq_appointment_stats_bucket"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, nullable=False, index=True)
+    weekday = Column(Integer, nullable=False)  # 0 = lunes ... 6 = domingo
+    hour = Column(Integer, nullable=False)
+    service_type = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Date
+
+from app.database.database import Base
+
+class DayOccupancy(Base):
+    """Ocupación precalculada de un día para los calendarios.
+
+    Se actualiza en la misma transacción que crea o cancela las citas del día (y al
+    cambiar la agenda), de modo que un mes se lee con una sola consulta por rango de
+    la clave primaria en lugar de recorrer las citas.
+    """
+    __tablename__ = "day_occupancy"
+
+    date = Column(Date, primary_key=True)
+    booked_slots = Column(Integer, nullable=False, default=0)  # Huecos ocupados sumando todos los barberos
+    capacity = Column(Integer, nullable=False, default=0)  # Huecos de trabajo sumando todos los barberos
+    bitmap = Column(String, nullable=False, default="")  # Un carácter por hueco del día: 1 = ningún barbero libre
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+
+from app.database.database import Base
+
+class IdempotencyKey(Base):
+    """Respuesta guardada de una petición con cabecera Idempotency-Key.
+
+    Un reintento con la misma clave (del mismo usuario) recibe la respuesta original
+    en lugar de volver a crear la cita. Las filas caducan en `expires_at`.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 del cuerpo de la petición
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)  # JSON tal y como se envió
+    expires_at = Column(DateTime, nullable=False, index=True)
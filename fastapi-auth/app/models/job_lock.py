@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime
+
+from app.database.database import Base
+
+class JobLock(Base):
+    """Estado compartido de cada tarea programada entre los workers.
+
+    Un worker solo ejecuta una tarea si consigue marcar su fila: la ejecución prevista
+    (`scheduled_for`) tiene que ser posterior a la última reclamada y el bloqueo anterior
+    tiene que haberse liberado o caducado (`locked_until`, por si el worker murió).
+    """
+    __tablename__ = "job_locks"
+
+    name = Column(String, primary_key=True)
+    locked_by = Column(String, nullable=True)  # host:pid del worker que la está ejecutando
+    locked_until = Column(DateTime, nullable=True)
+    scheduled_for = Column(DateTime, nullable=True)  # última ejecución prevista que se ha reclamado
+    finished_at = Column(DateTime, nullable=True)
+    status = Column(String, nullable=True)  # success / error de la última ejecución
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from app.database.database import Base
+
+class OutboxMessage(Base):
+    """Notificación pendiente de enviar (patrón outbox).
+
+    Se inserta en la misma transacción que la cita que la provoca, así que solo existe
+    si la reserva o la cancelación se ha confirmado; el envío lo hace después el
+    dispatcher, fuera de la petición. `available_at` es cuándo se puede enviar: la hora
+    del recordatorio, la del siguiente reintento o el fin del plazo de un envío en curso.
+    """
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # Mensajes pendientes por orden de envío (lo que lee el dispatcher en cada ronda)
+        Index("ix_outbox_due", "status", "available_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # appointment_created / appointment_reminder / appointment_cancelled
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    appointment_id = Column(Integer, nullable=True, index=True)  # sin FK: la cita cancelada ya no existe
+    payload = Column(Text, nullable=False)  # JSON con los datos de la cita
+    status = Column(String, nullable=False, default="pending")  # pending / sent / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
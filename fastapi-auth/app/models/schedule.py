@@ -0,0 +1,64 @@
+from sqlalchemy import Column, Integer, String, Boolean, Date, Time, ForeignKey, Index
+
+from app.database.database import Base
+
+class Barber(Base):
+    __tablename__ = "barbers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
+
+class WorkingHours(Base):
+    """Tramo de trabajo semanal de un barbero.
+
+    Puede haber varios tramos por día (9:00-14:00 y 16:00-20:00): el hueco
+    entre ellos es el descanso habitual.
+    """
+    __tablename__ = "working_hours"
+
+    id = Column(Integer, primary_key=True, index=True)
+    barber_id = Column(Integer, ForeignKey("barbers.id", ondelete="CASCADE"), nullable=False, index=True)
+    weekday = Column(Integer, nullable=False)  # 0 = lunes ... 6 = domingo
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+
+class TimeOff(Base):
+    """Festivo o pausa puntual.
+
+    Sin barbero afecta a toda la barbería; sin horas ocupa el día completo.
+    """
+    __tablename__ = "time_off"
+
+    id = Column(Integer, primary_key=True, index=True)
+    barber_id = Column(Integer, ForeignKey("barbers.id", ondelete="CASCADE"), nullable=True)
+    date = Column(Date, nullable=False, index=True)
+    start_time = Column(Time, nullable=True)
+    end_time = Column(Time, nullable=True)
+    reason = Column(String, nullable=True)
+
+class Service(Base):
+    """Duración de cada servicio (los que no están aquí duran un hueco)"""
+    __tablename__ = "services"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    duration_minutes = Column(Integer, nullable=False)
+
+class AppointmentSlot(Base):
+    """Huecos que ocupa cada cita en la agenda de su barbero.
+
+    La clave primaria (barber_id, date, slot) impide de forma atómica que dos citas
+    se solapen, aunque tengan duraciones distintas o se reserven a la vez.
+    """
+    __tablename__ = "appointment_slots"
+    __table_args__ = (
+        Index("ix_appointment_slots_appointment", "appointment_id"),
+        # Lecturas por rango de fechas (disponibilidad, ocupación del día)
+        Index("ix_appointment_slots_day", "date"),
+    )
+
+    barber_id = Column(Integer, ForeignKey("barbers.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    slot = Column(Integer, primary_key=True)  # Índice del hueco en el día (minutos // SLOT_MINUTES)
+    appointment_id = Column(Integer, ForeignKey("appointments.id", ondelete="CASCADE"), nullable=False)
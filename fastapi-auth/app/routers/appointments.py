@@ -1,107 +1,525 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime, time, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta
 
 from app.database.database import get_db
-from app.models import User, Appointment
-from app.schemas.appointments import AppointmentCreate, AppointmentResponse
-from app.auth.dependencies import get_current_user
+from app.models import Appointment, User
+from app.schemas.appointments import (
+    AppointmentCreate, AppointmentResponse, RangeAvailabilityResponse, MonthOccupancyResponse,
+    BulkAppointmentCreate, BulkAppointmentResponse, BulkAppointmentCancel, BulkCancelResponse
+)
+from app.auth.auth import create_stream_ticket
+from app.auth.dependencies import get_current_principal, get_stream_principal, Principal
+from app.config import settings
+from app.services.stats import record_appointment, record_appointments
+from app.services.availability import (
+    MAX_RANGE_DAYS,
+    booked_masks, cached_booked_masks, invalidate_day, build_slots, day_summary, date_range
+)
+from app.services.booking import reserve, reserve_many, release, mark_busy
+from app.services.occupancy import sync_occupancy, month_occupancy
+from app.services.scheduling import (
+    SLOT_MINUTES, get_schedule, schedule_cache, slot_index, slot_label, past_mask, bit_count
+)
+from app.services.etags import user_versions, day_versions, make_etag, conditional
+from app.services.events import (
+    broker, format_sse, publish_appointment_created, publish_appointment_cancelled
+)
+from app.services.export import export_response
+from app.services.serialization import list_response
+from app.services.outbox import enqueue_created, enqueue_cancelled, outbox_dispatcher
+from app.services.idempotency import IDEMPOTENCY_HEADER, check_key, request_hash, find_response, save_response
+from app.services.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER,
+    encode_cursor, decode_cursor, parse_fields
+)
 
 router = APIRouter(
     prefix="/api/v1/appointments",
     tags=["appointments"]
 )
 
-# Definimos el horario de atención (9:00 a 18:00)
-START_HOUR = 9
-END_HOUR = 18
-APPOINTMENT_DURATION = 30  # minutos
-
 # Endpoint para crear una nueva cita
 @router.post("/", response_model=AppointmentResponse, status_code=status.HTTP_201_CREATED)
-def create_appointment(
+async def create_appointment(
     appointment: AppointmentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
-    # Validar que la fecha y hora sean futuras
-    now = datetime.now()
-    appointment_datetime = datetime.combine(appointment.date, appointment.time)
+    # Un reintento con la misma Idempotency-Key recibe la respuesta original sin volver a reservar
+    key = check_key(idempotency_key)
+    if key:
+        fingerprint = request_hash(appointment.model_dump(mode="json"))
+        replay = await find_response(db, current_user.id, key, fingerprint)
+        if replay:
+            return replay
     
-    if appointment_datetime < now:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="La cita debe ser en una fecha y hora futura"
-        )
-    
-    # Validar que la hora esté dentro del horario de atención (9:00-18:00)
-    hour = appointment.time.hour
-    minute = appointment.time.minute
+    schedule = await get_schedule(db)
+    _check_barber(schedule, appointment.barber_id)
+    slots = schedule.service_slots(appointment.service_type)
     
-    if (hour < START_HOUR or hour >= END_HOUR or
-        (hour == END_HOUR - 1 and minute > 30) or
-        minute not in [0, 30]):  # Solo permitir reservas a la hora o a la media hora
+    # Validar que la fecha y hora sean futuras y que algún barbero trabaje en ese horario
+    error = schedule.slot_error(appointment.date, appointment.time, slots, datetime.now(), appointment.barber_id)
+    if error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Las citas solo pueden ser de {START_HOUR}:00 a {END_HOUR}:00, cada 30 minutos"
+            detail=error
         )
     
-    # Verificar si ya existe una cita en ese horario
-    existing_appointment = db.query(Appointment).filter(
-        Appointment.date == appointment.date,
-        Appointment.time == appointment.time
-    ).first()
+    # Barberos con el tramo libre según la caché; la clave primaria de appointment_slots
+    # hace la comprobación definitiva de forma atómica, incluso con peticiones concurrentes
+    start = slot_index(appointment.time)
+    busy = (await cached_booked_masks(db, appointment.date, appointment.date))[appointment.date]
+    values = {
+        "user_id": current_user.id,
+        "date": appointment.date,
+        "time": appointment.time,
+        "service_type": appointment.service_type,
+        "notes": appointment.notes
+    }
     
-    if existing_appointment:
+    db_appointment = None
+    for barber_id in schedule.candidates(appointment.date, start, slots, busy, datetime.now(), appointment.barber_id):
+        db_appointment = await reserve(db, values, barber_id, start, slots)
+        if db_appointment is not None:
+            break
+    
+    if db_appointment is None:
+        # El horario puede haberlo ocupado un reintento concurrente de esta misma petición
+        if key:
+            replay = await find_response(db, current_user.id, key, fingerprint)
+            if replay:
+                return replay
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Este horario ya está reservado"
         )
     
-    # Crear la nueva cita
-    db_appointment = Appointment(
-        user_id=current_user.id,
-        date=appointment.date,
-        time=appointment.time,
-        service_type=appointment.service_type,
-        notes=appointment.notes
-    )
+    await record_appointment(db, db_appointment.date, db_appointment.time, db_appointment.service_type, 1)
+    await sync_occupancy(db, schedule, [db_appointment.date])
+    # Confirmación y recordatorio: se envían después, fuera de la petición
+    await enqueue_created(db, [db_appointment])
+    
+    # La respuesta se guarda en la misma transacción que la cita; si un reintento
+    # concurrente con la misma clave se ha confirmado antes, se devuelve la suya
+    if key:
+        content = AppointmentResponse.model_validate(db_appointment).model_dump(mode="json")
+        replay = await save_response(db, current_user.id, key, fingerprint, status.HTTP_201_CREATED, content)
+        if replay:
+            return replay
     
-    db.add(db_appointment)
-    db.commit()
-    db.refresh(db_appointment)
+    await db.commit()
+    invalidate_day(db_appointment.date)
+    user_versions.bump(current_user.id)
+    publish_appointment_created(db_appointment, current_user.username)
+    outbox_dispatcher.wake()
     
     return db_appointment
 
-# Endpoint para obtener todas las citas del usuario actual
+# Endpoint para crear varias citas en una sola transacción (bloquear una tarde, importar reservas)
+@router.post("/bulk", response_model=BulkAppointmentResponse)
+async def create_appointments_bulk(
+    payload: BulkAppointmentCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    now = datetime.now()
+    schedule = await get_schedule(db)
+    results = {}
+    pending = []  # (posición en la petición, cita, huecos)
+    
+    # Validar todas las citas contra la agenda en una pasada
+    for index, item in enumerate(payload.appointments):
+        slots = schedule.service_slots(item.service_type)
+        error = schedule.slot_error(item.date, item.time, slots, now, item.barber_id)
+        if error:
+            results[index] = {"index": index, "date": item.date, "time": item.time, "status": "failed", "error": error}
+        else:
+            pending.append((index, item, slots))
+    
+    # Una sola consulta para los huecos ocupados de todos los días afectados; después se
+    # asigna barbero a cada cita sobre una copia local que incluye las ya asignadas
+    bookings, positions = [], []
+    if pending:
+        days = [item.date for _, item, _ in pending]
+        stored = await booked_masks(db, min(days), max(days))
+        busy = {day: dict(masks) for day, masks in stored.items()}
+        for index, item, slots in pending:
+            start = slot_index(item.time)
+            candidates = schedule.candidates(item.date, start, slots, busy.get(item.date, {}), now, item.barber_id)
+            if not candidates:
+                # Libre en la base de datos pero no en la copia local: lo ocupa otra cita de la petición
+                repeated = schedule.candidates(item.date, start, slots, stored.get(item.date, {}), now, item.barber_id)
+                error = "Horario repetido en la misma petición" if repeated else "Este horario ya está reservado"
+                results[index] = {"index": index, "date": item.date, "time": item.time, "status": "failed", "error": error}
+                continue
+            
+            mark_busy(busy, item.date, candidates[0], start, slots)
+            positions.append(index)
+            bookings.append({
+                "user_id": current_user.id,
+                "barber_id": candidates[0],
+                "date": item.date,
+                "time": item.time,
+                "service_type": item.service_type,
+                "notes": item.notes,
+                "start": start,
+                "slots": slots
+            })
+    
+    # Inserción en bloque; las citas que chocan con una reserva concurrente se descartan
+    created = await reserve_many(db, bookings)
+    for position, index in enumerate(positions):
+        booking = bookings[position]
+        row = created.get(position)
+        if row is None:
+            results[index] = {
+                "index": index, "date": booking["date"], "time": booking["time"],
+                "status": "failed", "error": "Este horario ya está reservado"
+            }
+        else:
+            results[index] = {"index": index, "date": row.date, "time": row.time, "status": "created", "id": row.id}
+    
+    inserted = list(created.values())
+    if inserted:
+        await record_appointments(db, [(row.date, row.time, row.service_type) for row in inserted], 1)
+        await sync_occupancy(db, schedule, [row.date for row in inserted])
+        await enqueue_created(db, inserted)
+        await db.commit()
+        for day in {row.date for row in inserted}:
+            invalidate_day(day)
+        user_versions.bump(current_user.id)
+        for row in inserted:
+            publish_appointment_created(row, current_user.username)
+        outbox_dispatcher.wake()
+    
+    ordered = [results[index] for index in sorted(results)]
+    return {
+        "created": len(inserted),
+        "failed": len(ordered) - len(inserted),
+        "results": ordered
+    }
+
+# Endpoint para obtener las citas del usuario actual, en orden cronológico y paginadas por cursor:
+# `scope=upcoming` las que aún no han empezado (de la más cercana a la más lejana), `scope=past`
+# las demás (de la más reciente hacia atrás) y sin `scope` todas. Cada página es un rango del
+# índice (user_id, date, time)
 @router.get("/my-appointments", response_model=List[AppointmentResponse])
-def get_my_appointments(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_my_appointments(
+    request: Request,
+    response: Response,
+    scope: Optional[str] = Query(None, pattern="^(upcoming|past)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
-    appointments = db.query(Appointment).filter(
-        Appointment.user_id == current_user.id
-    ).all()
+    # Corte entre próximas y pasadas: el inicio del siguiente hueco que aún no ha empezado (las
+    # citas empiezan siempre al inicio de un hueco). Es el mismo valor para el filtro y para el
+    # ETag, así el ETag cambia justo cuando una cita pasa de próxima a pasada
+    now = datetime.now()
+    midnight = datetime.combine(now.date(), time())
+    elapsed = (now - midnight) // timedelta(minutes=1) + (1 if now.second or now.microsecond else 0)
+    cutoff = midnight + timedelta(minutes=-(-elapsed // SLOT_MINUTES) * SLOT_MINUTES)
+    
+    # Si el cliente ya tiene la versión actual de sus citas, 304 sin tocar la base de datos
+    etag_parts = ["u", current_user.id, user_versions.get(current_user.id)]
+    if scope:
+        etag_parts.append(f"{cutoff:%Y%m%d%H%M}")
+    etag = make_etag(*etag_parts)
+    not_modified = conditional(request, response, etag, "private, no-cache")
+    if not_modified:
+        return not_modified
+    
+    # Solo las columnas de la respuesta, como tuplas (sin cargar objetos ORM)
+    fields = list(AppointmentResponse.model_fields)
+    query = select(*[getattr(Appointment, name) for name in fields]).where(Appointment.user_id == current_user.id)
+    
+    starts_at = tuple_(Appointment.date, Appointment.time)
+    if scope == "upcoming":
+        query = query.where(starts_at >= (cutoff.date(), cutoff.time()))
+    elif scope == "past":
+        query = query.where(starts_at < (cutoff.date(), cutoff.time()))
+    
+    # Las pasadas van de la más reciente hacia atrás
+    descending = scope == "past"
+    key = tuple_(Appointment.date, Appointment.time, Appointment.id)
+    if cursor:
+        last_key = _decode_appointment_cursor(cursor)
+        query = query.where(key < last_key if descending else key > last_key)
     
-    return appointments
+    order = [Appointment.date, Appointment.time, Appointment.id]
+    if descending:
+        order = [column.desc() for column in order]
+    
+    # Se pide una fila de más para saber si hay página siguiente
+    rows = (await db.execute(query.order_by(*order).limit(limit + 1))).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.date, last.time, last.id])
+    
+    return list_response(rows, fields, response)
+
+def _decode_appointment_cursor(cursor: str) -> tuple:
+    """Clave (date, time, id) de la última cita de la página anterior"""
+    last_date, last_time, last_id = decode_cursor(cursor, 3)
+    try:
+        return (date.fromisoformat(last_date), time.fromisoformat(last_time), int(last_id))
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
 
-# Endpoint ADMIN: obtener TODAS las citas de TODOS los usuarios
-@router.get("/admin/all-appointments", response_model=List[AppointmentResponse])
-def get_all_appointments(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+# Columnas que se pueden pedir con `fields=` en los listados de citas
+APPOINTMENT_FIELDS = [
+    "id", "user_id", "barber_id", "date", "time", "duration_minutes", "service_type", "notes", "created_at"
+]
+
+# Endpoint ADMIN: obtener las citas de TODOS los usuarios (paginado por cursor)
+@router.get("/admin/all-appointments", response_model=None)
+async def get_all_appointments(
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    service_type: Optional[str] = None,
+    user_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     # En producción, verificarías que el usuario es admin
     # Por ahora, cualquier usuario autenticado puede ver todas las citas
-    appointments = db.query(Appointment).all()
-    return appointments
+    selected = parse_fields(fields, APPOINTMENT_FIELDS)
+    
+    # Las columnas de la clave (date, time, id) siempre se leen para construir el cursor
+    columns = list(dict.fromkeys(selected + ["date", "time", "id"]))
+    query = select(*[getattr(Appointment, name) for name in columns])
+    
+    if date_from:
+        query = query.where(Appointment.date >= date_from)
+    if date_to:
+        query = query.where(Appointment.date <= date_to)
+    if service_type:
+        query = query.where(Appointment.service_type == service_type)
+    if user_id is not None:
+        query = query.where(Appointment.user_id == user_id)
+    
+    if cursor:
+        query = query.where(
+            tuple_(Appointment.date, Appointment.time, Appointment.id) > _decode_appointment_cursor(cursor)
+        )
+    
+    # Se pide una fila de más para saber si hay página siguiente
+    query = query.order_by(Appointment.date, Appointment.time, Appointment.id).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.date, last.time, last.id])
+    
+    # `selected` va primero en `columns`, así que cada fila empieza por los campos pedidos
+    return list_response(rows, selected, response)
+
+# Columnas de la exportación de citas (username sale del JOIN con users)
+EXPORT_APPOINTMENT_COLUMNS = ["id", "date", "time", "service_type", "notes", "user_id", "username", "created_at"]
+
+# Endpoint ADMIN: exportar las citas como CSV o NDJSON en streaming
+@router.get("/admin/export")
+async def export_appointments(
+    export_format: str = Query("csv", alias="format"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user: Principal = Depends(get_current_principal)
+):
+    # En producción, verificarías que el usuario es admin
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha 'date_to' debe ser posterior o igual a 'date_from'"
+        )
+    
+    query = select(
+        Appointment.id, Appointment.date, Appointment.time, Appointment.service_type,
+        Appointment.notes, Appointment.user_id, User.username, Appointment.created_at
+    ).outerjoin(User, User.id == Appointment.user_id)
+    
+    if date_from:
+        query = query.where(Appointment.date >= date_from)
+    if date_to:
+        query = query.where(Appointment.date <= date_to)
+    
+    query = query.order_by(Appointment.date, Appointment.time, Appointment.id)
+    return export_response(query, EXPORT_APPOINTMENT_COLUMNS, export_format, "citas")
+
+async def _event_stream(request: Request, subscription):
+    """Enviar los eventos del broker al cliente, con un comentario periódico para mantener la conexión.
+
+    Cuando el cliente se desconecta, StreamingResponse cancela el generador y el
+    `finally` libera la suscripción.
+    """
+    try:
+        # Un cliente que se reconecta (Last-Event-ID) ha podido perder eventos: que recargue
+        if request.headers.get("last-event-id"):
+            yield "event: resync\ndata: {\"reason\": \"reconnect\"}\n\n"
+        else:
+            yield ": connected\n\n"
+        
+        while True:
+            event = await subscription.get(settings.events_heartbeat)
+            if event is None:
+                yield ": ping\n\n"
+            else:
+                yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+# Endpoint ADMIN: ticket de corta duración para abrir el stream de eventos con EventSource
+@router.post("/admin/events/ticket")
+async def create_events_ticket(current_user: Principal = Depends(get_current_principal)):
+    # En producción, verificarías que el usuario es admin
+    return {"ticket": create_stream_ticket(current_user), "expires_in": settings.events_ticket_ttl}
+
+# Endpoint ADMIN: eventos en vivo (server-sent events) de citas creadas y canceladas
+@router.get("/admin/events")
+async def appointment_events(
+    request: Request,
+    current_user: Principal = Depends(get_stream_principal)
+):
+    # En producción, verificarías que el usuario es admin
+    subscription = broker.subscribe()
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas conexiones de eventos abiertas",
+            headers={"Retry-After": "5"}
+        )
+    
+    return StreamingResponse(
+        _event_stream(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _availability_etag(date_from: date, date_to: date, now: datetime) -> str:
+    """ETag de la disponibilidad de un rango de días.
+
+    Depende de las versiones de esos días y de la agenda y, si el rango incluye hoy,
+    de cuántos horarios han pasado ya (dejan de ofrecerse sin que cambie ninguna cita).
+    Los contadores solo crecen, así que su suma cambia con cualquier día del rango.
+    """
+    parts = ["a", sum(day_versions.get(day) for day in date_range(date_from, date_to)), schedule_cache.version]
+    if date_from <= now.date() <= date_to:
+        parts.append(bit_count(past_mask(now.date(), now)))
+    return make_etag(*parts)
+
+def _check_barber(schedule, barber_id: Optional[int]):
+    if barber_id is not None and barber_id not in schedule.weekly:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Barbero no encontrado"
+        )
+
+# Endpoint para obtener la disponibilidad de varios días con una sola consulta
+@router.get("/availability", response_model=RangeAvailabilityResponse)
+async def get_availability_range(
+    request: Request,
+    response: Response,
+    date_from: date = Query(..., alias="from"),  # Formato: YYYY-MM-DD
+    date_to: date = Query(..., alias="to"),
+    service_type: Optional[str] = None,  # Sin servicio, disponibilidad de un hueco
+    barber_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    now = datetime.now()
+    
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha 'to' debe ser posterior o igual a 'from'"
+        )
+    
+    if date_from < now.date():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha debe ser futura"
+        )
+    
+    if (date_to - date_from).days + 1 > MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango no puede superar {MAX_RANGE_DAYS} días"
+        )
+    
+    # 304 antes de leer la agenda o las citas si nada ha cambiado
+    etag = _availability_etag(date_from, date_to, now)
+    not_modified = conditional(request, response, etag, "public, no-cache")
+    if not_modified:
+        return not_modified
+    
+    schedule = await get_schedule(db)
+    _check_barber(schedule, barber_id)
+    slots = schedule.service_slots(service_type) if service_type else 1
+    window = range(*schedule.window())
+    
+    # Una sola consulta por rango para todos los horarios reservados
+    masks = await cached_booked_masks(db, date_from, date_to)
+    
+    return {
+        "from": date_from,
+        "to": date_to,
+        "slot_times": [slot_label(index) for index in window],
+        "days": [
+            day_summary(schedule, day, masks.get(day, {}), slots, now, window, barber_id)
+            for day in date_range(date_from, date_to)
+        ]
+    }
+
+# Endpoint para el calendario: ocupación de cada día de un mes con una sola consulta
+@router.get("/occupancy", response_model=MonthOccupancyResponse)
+async def get_month_occupancy(
+    month: str,  # Formato: YYYY-MM
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        first_day = datetime.strptime(month, "%Y-%m").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato de mes incorrecto. Use YYYY-MM"
+        )
+    
+    last_day = (first_day + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    schedule = await get_schedule(db)
+    first, last = schedule.window()
+    
+    return {
+        "month": month,
+        "slot_times": [slot_label(index) for index in range(first, last)],
+        "days": [
+            {**day, "bitmap": day["bitmap"][first:last]}
+            for day in await month_occupancy(db, schedule, first_day, last_day)
+        ]
+    }
 
 # Endpoint para obtener disponibilidad de horarios para una fecha específica
 @router.get("/availability/{date}")
-def get_availability(
+async def get_availability(
+    request: Request,
+    response: Response,
     date: str,  # Formato: YYYY-MM-DD
-    db: Session = Depends(get_db)
+    service_type: Optional[str] = None,
+    barber_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         # Convertir el string de fecha a objeto date
@@ -113,65 +531,40 @@ def get_availability(
         )
     
     # Validar que la fecha sea futura
-    if appointment_date < datetime.now().date():
+    now = datetime.now()
+    if appointment_date < now.date():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="La fecha debe ser futura"
         )
     
-    # Obtener todas las citas para ese día
-    booked_appointments = db.query(Appointment).filter(
-        Appointment.date == appointment_date
-    ).all()
+    # 304 antes de leer la agenda o las citas si nada ha cambiado
+    etag = _availability_etag(appointment_date, appointment_date, now)
+    not_modified = conditional(request, response, etag, "public, no-cache")
+    if not_modified:
+        return not_modified
     
-    # Crear un set con las horas ya reservadas
-    booked_times = {appointment.time for appointment in booked_appointments}
+    schedule = await get_schedule(db)
+    _check_barber(schedule, barber_id)
+    slots = schedule.service_slots(service_type) if service_type else 1
     
-    # Generar todos los horarios disponibles (cada 30 minutos, de 9:00 a 18:00)
-    available_slots = []
+    # Bitmaps con los huecos ya ocupados de cada barbero ese día
+    busy = (await cached_booked_masks(db, appointment_date, appointment_date))[appointment_date]
     
-    for hour in range(START_HOUR, END_HOUR):
-        for minute in [0, 30]:
-            # Si es 18:00, no incluimos ese horario (solo hasta 17:30)
-            if hour == END_HOUR - 1 and minute > 30:
-                continue
-            
-            slot_time = time(hour=hour, minute=minute)
-            
-            # Si la fecha es hoy, solo mostrar horarios futuros
-            if (appointment_date == datetime.now().date() and 
-                datetime.combine(appointment_date, slot_time) <= datetime.now()):
-                continue
-            
-            # Verificar si el horario no está ya reservado
-            if slot_time not in booked_times:
-                available_slots.append(
-                    {
-                        "time": slot_time.strftime("%H:%M"),
-                        "available": True
-                    }
-                )
-            else:
-                available_slots.append(
-                    {
-                        "time": slot_time.strftime("%H:%M"),
-                        "available": False
-                    }
-                )
+    # Horarios en los que algún barbero puede empezar el servicio; si la fecha es hoy, solo los futuros
+    available_slots = build_slots(schedule, appointment_date, busy, slots, now, barber_id)
     
     return {"date": date, "available_slots": available_slots}
 
 # Endpoint para cancelar una cita
 @router.delete("/{appointment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def cancel_appointment(
+async def cancel_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Buscar la cita
-    appointment = db.query(Appointment).filter(
-        Appointment.id == appointment_id
-    ).first()
+    appointment = await db.get(Appointment, appointment_id)
     
     # Verificar si la cita existe
     if not appointment:
@@ -195,8 +588,84 @@ def cancel_appointment(
             detail="No se puede cancelar una cita que ya ha pasado"
         )
     
-    # Cancelar la cita (eliminar de la base de datos)
-    db.delete(appointment)
-    db.commit()
+    # Cancelar la cita (liberar sus huecos y eliminarla de la base de datos)
+    await release(db, [appointment.id])
+    await db.delete(appointment)
+    await record_appointment(db, appointment.date, appointment.time, appointment.service_type, -1)
+    await sync_occupancy(db, await get_schedule(db), [appointment.date])
+    await enqueue_cancelled(db, [appointment])
+    await db.commit()
+    invalidate_day(appointment.date)
+    user_versions.bump(current_user.id)
+    publish_appointment_cancelled(appointment)
+    outbox_dispatcher.wake()
+    
+    return {"detail": "Cita cancelada correctamente"}
+
+# Endpoint para cancelar varias citas en una sola transacción
+@router.post("/bulk/cancel", response_model=BulkCancelResponse)
+async def cancel_appointments_bulk(
+    payload: BulkAppointmentCancel,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    ids = list(dict.fromkeys(payload.ids))
+    found = {
+        appointment.id: appointment
+        for appointment in await db.scalars(select(Appointment).where(Appointment.id.in_(ids)))
+    }
+    
+    now = datetime.now()
+    errors = {}
+    for appointment_id in ids:
+        appointment = found.get(appointment_id)
+        if appointment is None:
+            errors[appointment_id] = "Cita no encontrada"
+        elif appointment.user_id != current_user.id:
+            errors[appointment_id] = "No tienes permiso para cancelar esta cita"
+        elif datetime.combine(appointment.date, appointment.time) < now:
+            errors[appointment_id] = "No se puede cancelar una cita que ya ha pasado"
+    
+    # Un único DELETE; RETURNING indica qué filas se han borrado realmente
+    # (otra petición puede haber cancelado alguna mientras tanto)
+    deleted = []
+    to_delete = [appointment_id for appointment_id in ids if appointment_id not in errors]
+    if to_delete:
+        await release(db, to_delete)
+        deleted = (await db.execute(
+            delete(Appointment)
+            .where(Appointment.id.in_(to_delete))
+            .returning(
+                Appointment.id, Appointment.user_id, Appointment.barber_id, Appointment.date,
+                Appointment.time, Appointment.service_type
+            )
+            .execution_options(synchronize_session=False)
+        )).all()
+    
+    deleted_ids = {row.id for row in deleted}
+    for appointment_id in to_delete:
+        if appointment_id not in deleted_ids:
+            errors[appointment_id] = "Cita no encontrada"
+    
+    if deleted:
+        await record_appointments(db, [(row.date, row.time, row.service_type) for row in deleted], -1)
+        await sync_occupancy(db, await get_schedule(db), [row.date for row in deleted])
+        await enqueue_cancelled(db, deleted)
+        await db.commit()
+        for day in {row.date for row in deleted}:
+            invalidate_day(day)
+        user_versions.bump(current_user.id)
+        for row in deleted:
+            publish_appointment_cancelled(row)
+        outbox_dispatcher.wake()
     
-    return {"detail": "Cita cancelada correctamente"}
\ No newline at end of file
+    return {
+        "cancelled": len(deleted),
+        "failed": len(errors),
+        "results": [
+            {"id": appointment_id, "status": "failed", "error": errors[appointment_id]}
+            if appointment_id in errors else
+            {"id": appointment_id, "status": "cancelled"}
+            for appointment_id in ids
+        ]
+    }
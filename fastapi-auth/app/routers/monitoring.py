@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+from fastapi import APIRouter, Response, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import settings
+from app.database.database import async_engine
+from app.auth.dependencies import user_cache
+from app.services.availability import availability_cache
+from app.services.scheduling import schedule_cache
+from app.services.events import broker
+from app.services.rate_limit import rate_limiter
+from app.services.metrics import registry
+
+router = APIRouter(tags=["monitoring"])
+
+# Cachés del proceso que se exportan en /metrics
+CACHES = {
+    "availability": availability_cache,
+    "users": user_cache,
+    "schedule": schedule_cache,
+}
+
+def _cache_values(field: str):
+    return lambda: {(name,): cache.stats()[field] for name, cache in CACHES.items()}
+
+registry.callback_counter("cache_hits_total", "Aciertos de caché", _cache_values("hits"), ("cache",))
+registry.callback_counter("cache_misses_total", "Fallos de caché", _cache_values("misses"), ("cache",))
+registry.callback_gauge("cache_entries", "Entradas guardadas en la caché", _cache_values("size"), ("cache",))
+
+def _pool_values() -> dict:
+    pool = async_engine.pool
+    values = {}
+    for state in ("checkedout", "checkedin", "overflow"):
+        getter = getattr(pool, state, None)
+        if getter is not None:
+            # overflow es negativo mientras el pool no está lleno
+            values[(state,)] = max(getter(), 0)
+    return values
+
+registry.callback_gauge(
+    "db_pool_connections", "Conexiones del pool por estado", _pool_values, ("state",)
+)
+
+registry.callback_gauge(
+    "rate_limit_keys", "Clientes (usuario o IP y regla) vigilados por el limitador de peticiones",
+    lambda: {(): len(rate_limiter)}
+)
+
+registry.callback_gauge(
+    "events_subscribers", "Conexiones abiertas al stream de eventos",
+    lambda: {(): broker.stats()["subscribers"]}
+)
+registry.callback_counter(
+    "events_published_total", "Eventos publicados en el broker",
+    lambda: {(): broker.stats()["published"]}
+)
+registry.callback_counter(
+    "events_overflows_total", "Colas de suscriptores llenas (el cliente recibe un resync)",
+    lambda: {(): broker.stats()["overflows"]}
+)
+
+async def _ping_database():
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1 FROM users LIMIT 1"))
+
+# Métricas en el formato de texto de Prometheus
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/health")
+async def health_check(response: Response):
+    """Verificación de salud del servicio (incluye una consulta real a la base de datos)"""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(_ping_database(), timeout=settings.health_check_timeout)
+    except (SQLAlchemyError, OSError, asyncio.TimeoutError) as exc:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {
+            "status": "ERROR",
+            "message": "La base de datos no responde",
+            "database": {"status": "error", "error": type(exc).__name__}
+        }
+
+    return {
+        "status": "OK",
+        "message": "Servicio funcionando correctamente",
+        "database": {"status": "ok", "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+    }
@@ -0,0 +1,181 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+
+from app.database.database import get_db
+from app.models import Barber, WorkingHours, TimeOff, Service
+from app.schemas.schedule import (
+    BarberCreate, BarberUpdate, BarberResponse, ServiceUpdate, ServiceResponse,
+    TimeOffCreate, TimeOffResponse, ScheduleResponse
+)
+from app.auth.dependencies import get_current_principal, Principal
+from app.services.scheduling import SLOT_MINUTES, invalidate_schedule
+from app.services.occupancy import refresh_occupancy
+
+router = APIRouter(
+    prefix="/api/v1/schedule",
+    tags=["schedule"]
+)
+
+async def _barber_response(db: AsyncSession, barber: Barber) -> dict:
+    hours = await db.scalars(
+        select(WorkingHours)
+        .where(WorkingHours.barber_id == barber.id)
+        .order_by(WorkingHours.weekday, WorkingHours.start_time)
+    )
+    return {
+        "id": barber.id,
+        "name": barber.name,
+        "is_active": barber.is_active,
+        "hours": [
+            {"weekday": item.weekday, "start_time": item.start_time, "end_time": item.end_time}
+            for item in hours
+        ]
+    }
+
+async def _get_barber(db: AsyncSession, barber_id: int) -> Barber:
+    barber = await db.get(Barber, barber_id)
+    if barber is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Barbero no encontrado"
+        )
+    return barber
+
+async def _check_name(db: AsyncSession, name: str, barber_id: Optional[int] = None):
+    existing = await db.scalar(select(Barber.id).where(Barber.name == name))
+    if existing is not None and existing != barber_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ya existe un barbero con ese nombre"
+        )
+
+async def _commit_schedule(db: AsyncSession):
+    """Guardar un cambio de agenda junto con la capacidad recalculada de los días futuros"""
+    await refresh_occupancy(db)
+    await db.commit()
+    invalidate_schedule()
+
+def _set_hours(db: AsyncSession, barber_id: int, hours):
+    db.add_all([
+        WorkingHours(barber_id=barber_id, weekday=item.weekday, start_time=item.start_time, end_time=item.end_time)
+        for item in hours
+    ])
+
+# Configuración de la agenda: barberos con su horario semanal y duración de los servicios
+@router.get("", response_model=ScheduleResponse)
+async def get_schedule_config(db: AsyncSession = Depends(get_db)):
+    barbers = (await db.scalars(select(Barber).order_by(Barber.id))).all()
+    services = (await db.scalars(select(Service).order_by(Service.name))).all()
+    return {
+        "slot_minutes": SLOT_MINUTES,
+        "barbers": [await _barber_response(db, barber) for barber in barbers],
+        "services": services
+    }
+
+# Endpoint ADMIN: dar de alta un barbero
+@router.post("/barbers", response_model=BarberResponse, status_code=status.HTTP_201_CREATED)
+async def create_barber(
+    payload: BarberCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    # En producción, verificarías que el usuario es admin
+    await _check_name(db, payload.name)
+    barber = Barber(name=payload.name, is_active=True)
+    db.add(barber)
+    await db.flush()
+    _set_hours(db, barber.id, payload.hours)
+    await _commit_schedule(db)
+
+    return await _barber_response(db, barber)
+
+# Endpoint ADMIN: modificar un barbero (nombre, activo y horario semanal)
+@router.put("/barbers/{barber_id}", response_model=BarberResponse)
+async def update_barber(
+    barber_id: int,
+    payload: BarberUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    barber = await _get_barber(db, barber_id)
+
+    if payload.name is not None:
+        await _check_name(db, payload.name, barber_id)
+        barber.name = payload.name
+    if payload.is_active is not None:
+        barber.is_active = payload.is_active
+    if payload.hours is not None:
+        await db.execute(delete(WorkingHours).where(WorkingHours.barber_id == barber_id))
+        _set_hours(db, barber_id, payload.hours)
+
+    await _commit_schedule(db)
+
+    return await _barber_response(db, barber)
+
+# Endpoint ADMIN: fijar la duración de un servicio (lo crea si no existe)
+@router.put("/services/{name}", response_model=ServiceResponse)
+async def update_service(
+    name: str,
+    payload: ServiceUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    service = await db.scalar(select(Service).where(Service.name == name))
+    if service is None:
+        service = Service(name=name)
+        db.add(service)
+    service.duration_minutes = payload.duration_minutes
+
+    await _commit_schedule(db)
+
+    return service
+
+# Endpoint ADMIN: festivos y pausas puntuales
+@router.get("/time-off", response_model=List[TimeOffResponse])
+async def list_time_off(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    query = select(TimeOff)
+    if date_from:
+        query = query.where(TimeOff.date >= date_from)
+    if date_to:
+        query = query.where(TimeOff.date <= date_to)
+    return (await db.scalars(query.order_by(TimeOff.date, TimeOff.start_time))).all()
+
+@router.post("/time-off", response_model=TimeOffResponse, status_code=status.HTTP_201_CREATED)
+async def create_time_off(
+    payload: TimeOffCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    # Las citas ya reservadas en ese tramo se mantienen; solo se bloquean las nuevas
+    if payload.barber_id is not None:
+        await _get_barber(db, payload.barber_id)
+
+    time_off = TimeOff(**payload.model_dump())
+    db.add(time_off)
+    await _commit_schedule(db)
+
+    return time_off
+
+@router.delete("/time-off/{time_off_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_time_off(
+    time_off_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    time_off = await db.get(TimeOff, time_off_id)
+    if time_off is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Festivo o pausa no encontrado"
+        )
+
+    await db.delete(time_off)
+    await _commit_schedule(db)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
+
+from app.database.database import get_db
+from app.schemas.stats import StatsResponse
+from app.services.stats import get_stats
+from app.services.availability import availability_cache
+from app.auth.dependencies import get_current_principal, Principal
+
+router = APIRouter(
+    prefix="/api/v1/appointments/admin/stats",
+    tags=["stats"]
+)
+
+# Endpoint ADMIN: estadísticas agregadas (por servicio, hora, día de la semana y día)
+@router.get("", response_model=StatsResponse)
+async def get_appointment_stats(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    # En producción, verificarías que el usuario es admin
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from debe ser anterior o igual a date_to"
+        )
+    
+    return await get_stats(db, date_from, date_to)
+
+
+# Endpoint ADMIN: contadores de la caché de disponibilidad
+@router.get("/cache")
+async def get_cache_stats(current_user: Principal = Depends(get_current_principal)):
+    return {"availability": availability_cache.stats()}
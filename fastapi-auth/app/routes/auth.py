@@ -1,23 +1,38 @@
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from app.database.database import get_db
 from app.models.user import User
-from app.models.schemas import UserCreate, UserResponse, Token
-from app.auth.auth import verify_password, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from app.auth.dependencies import get_current_active_user
+from app.models.appointment import Appointment
+from app.models.schemas import UserCreate, UserResponse, Token, RefreshRequest
+from app.config import settings
+from app.auth.auth import (
+    verify_password_async, get_password_hash_async, create_token_pair,
+    decode_token, revoke_token, revoke_session, token_denylist
+)
+from app.auth.throttle import LoginThrottle
+from app.auth.dependencies import get_current_active_user, oauth2_scheme
+from app.services.export import export_response
+from app.services.serialization import list_response
+from app.services.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER,
+    encode_cursor, decode_cursor, parse_fields, parse_ids
+)
 
 router = APIRouter()
 
+# Límite de intentos fallidos de login por cuenta (se comprueba antes de ejecutar bcrypt)
+login_throttle = LoginThrottle(settings.login_max_failures, settings.login_failure_window)
+
 @router.post("/signup", response_model=UserResponse)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Registro de nuevo usuario"""
     # Verificar si el usuario ya existe
-    db_user = db.query(User).filter(
+    db_user = await db.scalar(select(User).where(
         (User.username == user.username) | (User.email == user.email)
-    ).first()
+    ))
     
     if db_user:
         raise HTTPException(
@@ -25,8 +40,8 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
             detail="Username or email already registered"
         )
     
-    # Crear nuevo usuario
-    hashed_password = get_password_hash(user.password)
+    # Crear nuevo usuario (bcrypt se ejecuta en el pool de procesos)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -34,41 +49,182 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """Login y generación de token"""
+    throttle_key = form_data.username.lower()
+    retry_after = login_throttle.retry_after(throttle_key)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos fallidos. Inténtalo más tarde",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
     # Permitir login con username o email
-    user = db.query(User).filter(
+    user = await db.scalar(select(User).where(
         (User.username == form_data.username) | (User.email == form_data.username)
-    ).first()
+    ))
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await verify_password_async(form_data.password, user.hashed_password)
+    
+    if not verified:
+        login_throttle.record_failure(throttle_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+    login_throttle.reset(throttle_key)
+    
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    
+    # Rehacer el hash si el coste de bcrypt ha cambiado desde que se guardó
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
+    # Token de acceso y refresh token de una sesión nueva
+    return create_token_pair(user)
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_access_token(payload: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Renovar el token de acceso con el refresh token, sin volver a ejecutar bcrypt.
+
+    El refresh token se rota: el usado queda revocado y se devuelve uno nuevo de la
+    misma sesión. Si llega uno ya usado (posible robo), se revoca la sesión entera.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token inválido o caducado",
+        headers={"WWW-Authenticate": "Bearer"},
     )
+    claims = decode_token(payload.refresh_token, credentials_exception, token_type="refresh", check_revoked=False)
+    if token_denylist.is_revoked(claims):
+        revoke_session(claims)
+        raise credentials_exception
+    # Se revoca antes de cualquier await: dos peticiones con el mismo token no pueden rotarlo las dos
+    revoke_token(claims)
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    user = await db.scalar(select(User).where(User.username == claims["sub"]))
+    if user is None or not user.is_active:
+        raise credentials_exception
+    
+    return create_token_pair(user, family=claims.get("fam"))
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: str = Depends(oauth2_scheme)):
+    """Cerrar la sesión: revoca el token de acceso y todos los refresh tokens de la sesión"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    revoke_session(decode_token(token, credentials_exception))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.get("/users/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(current_user: User = Depends(get_current_active_user)):
     """Obtener información del usuario actual"""
     return current_user
 
-@router.get("/admin/users", response_model=List[UserResponse])
-def get_all_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    """ADMIN: Obtener todos los usuarios registrados"""
+# Columnas que se pueden pedir con `fields=` en el listado de usuarios
+USER_FIELDS = ["id", "username", "email", "is_active", "created_at"]
+# Campo calculado (solo si se pide): número de citas del usuario, con un GROUP BY por página
+APPOINTMENT_COUNT_FIELD = "appointment_count"
+
+@router.get("/admin/users", response_model=None)
+async def get_all_users(
+    response: Response,
+    ids: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """ADMIN: Obtener los usuarios registrados (paginado por cursor sobre el id)"""
     # En producción, verificarías que el usuario es admin
-    users = db.query(User).all()
-    return users
\ No newline at end of file
+    selected = parse_fields(fields, USER_FIELDS + [APPOINTMENT_COUNT_FIELD]) if fields else list(USER_FIELDS)
+    columns = list(dict.fromkeys([name for name in selected if name != APPOINTMENT_COUNT_FIELD] + ["id"]))
+    query = select(*[getattr(User, name) for name in columns])
+    
+    user_ids = parse_ids(ids)
+    if user_ids is not None:
+        query = query.where(User.id.in_(user_ids))
+    
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor de paginación inválido"
+            )
+        query = query.where(User.id > last_id)
+    
+    # Se pide una fila de más para saber si hay página siguiente
+    rows = (await db.execute(query.order_by(User.id).limit(limit + 1))).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1].id])
+    
+    if APPOINTMENT_COUNT_FIELD in selected:
+        # Solo las citas de los usuarios de esta página, sobre el índice (user_id, date, time)
+        counts = dict((await db.execute(
+            select(Appointment.user_id, func.count())
+            .where(Appointment.user_id.in_([row.id for row in rows]))
+            .group_by(Appointment.user_id)
+        )).all())
+        return list_response([
+            tuple(counts.get(row.id, 0) if name == APPOINTMENT_COUNT_FIELD else getattr(row, name) for name in selected)
+            for row in rows
+        ], selected, response)
+    
+    # `selected` va primero en `columns`, así que cada fila empieza por los campos pedidos
+    return list_response(rows, selected, response)
+
+
+@router.get("/admin/users/export")
+async def export_users(
+    export_format: str = Query("csv", alias="format"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """ADMIN: Exportar los usuarios como CSV o NDJSON en streaming (sin el hash de la contraseña)"""
+    # En producción, verificarías que el usuario es admin
+    query = select(*[getattr(User, name) for name in USER_FIELDS]).order_by(User.id)
+    return export_response(query, USER_FIELDS, export_format, "usuarios")
+
+@router.post("/admin/users/{user_id}/deactivate", response_model=UserResponse)
+async def deactivate_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """ADMIN: Desactivar un usuario.
+
+    Al confirmar el cambio se revocan los tokens que ya tenía y se descarta de la caché
+    de usuarios (eventos de app/auth/dependencies.py): su token deja de valer en la
+    siguiente petición y ya no puede iniciar sesión ni renovar el token.
+    """
+    # En producción, verificarías que el usuario es admin
+    user = await db.get(User, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado"
+        )
+    
+    if user.is_active:
+        user.is_active = False
+        await db.commit()
+    return user
@@ -5,7 +5,7 @@ from app.auth.dependencies import get_current_active_user
 router = APIRouter()
 
 @router.get("/protected")
-def protected_route(current_user: User = Depends(get_current_active_user)):
+async def protected_route(current_user: User = Depends(get_current_active_user)):
     """Ruta protegida que requiere autenticación"""
     return {
         "message": f"¡Hola {current_user.username}! Esta es una ruta protegida.",
@@ -14,7 +14,7 @@ def protected_route(current_user: User = Depends(get_current_active_user)):
     }
 
 @router.get("/dashboard")
-def user_dashboard(current_user: User = Depends(get_current_active_user)):
+async def user_dashboard(current_user: User = Depends(get_current_active_user)):
     """Dashboard del usuario (requiere autenticación)"""
     return {
         "title": "Dashboard del Usuario",
@@ -1 +1,11 @@
-from .appointments import AppointmentCreate, AppointmentResponse, TimeSlot, AvailabilityResponse
\ No newline at end of file
+from .appointments import (
+    AppointmentCreate, AppointmentResponse, TimeSlot, AvailabilityResponse, DayAvailability, RangeAvailabilityResponse,
+    DayOccupancyItem, MonthOccupancyResponse,
+    BulkAppointmentCreate, BulkAppointmentResult, BulkAppointmentResponse,
+    BulkAppointmentCancel, BulkCancelResult, BulkCancelResponse
+)
+from .stats import StatBucket, DayStat, StatsResponse
+from .schedule import (
+    WorkingHoursItem, BarberCreate, BarberUpdate, BarberResponse, ServiceUpdate, ServiceResponse,
+    TimeOffCreate, TimeOffResponse, ScheduleResponse
+)
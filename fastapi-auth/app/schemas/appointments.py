@@ -1,6 +1,9 @@
 from datetime import date, time, datetime
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# Máximo de citas por operación masiva
+MAX_BULK_APPOINTMENTS = 200
 
 # Esquema para crear una cita
 class AppointmentCreate(BaseModel):
@@ -8,13 +11,46 @@ class AppointmentCreate(BaseModel):
     time: time
     service_type: str
     notes: Optional[str] = None
+    barber_id: Optional[int] = None  # Sin barbero, se asigna el primero libre
+
+# Esquemas de las operaciones masivas (crear y cancelar varias citas a la vez)
+class BulkAppointmentCreate(BaseModel):
+    appointments: List[AppointmentCreate] = Field(..., min_length=1, max_length=MAX_BULK_APPOINTMENTS)
+
+class BulkAppointmentResult(BaseModel):
+    index: int  # Posición de la cita en la petición
+    date: date
+    time: time
+    status: str  # "created" o "failed"
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkAppointmentResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkAppointmentResult]
+
+class BulkAppointmentCancel(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BULK_APPOINTMENTS)
+
+class BulkCancelResult(BaseModel):
+    id: int
+    status: str  # "cancelled" o "failed"
+    error: Optional[str] = None
+
+class BulkCancelResponse(BaseModel):
+    cancelled: int
+    failed: int
+    results: List[BulkCancelResult]
 
 # Esquema de respuesta para una cita
 class AppointmentResponse(BaseModel):
     id: int
     user_id: int
+    barber_id: Optional[int]
     date: date
     time: time
+    duration_minutes: int
     service_type: str
     notes: Optional[str]
     created_at: datetime
@@ -29,4 +65,32 @@ class TimeSlot(BaseModel):
 
 class AvailabilityResponse(BaseModel):
     date: str
-    available_slots: List[TimeSlot]
\ No newline at end of file
+    available_slots: List[TimeSlot]
+
+# Resumen de disponibilidad de un día dentro de un rango
+class DayAvailability(BaseModel):
+    date: date
+    bitmap: str  # Un carácter por horario de slot_times: "1" libre, "0" ocupado o pasado
+    available_count: int
+    fully_booked: bool
+
+class RangeAvailabilityResponse(BaseModel):
+    date_from: date = Field(alias="from")
+    date_to: date = Field(alias="to")
+    slot_times: List[str]
+    days: List[DayAvailability]
+
+    class Config:
+        populate_by_name = True
+
+# Ocupación de un día para el calendario (mapa de calor)
+class DayOccupancyItem(BaseModel):
+    date: date
+    booked_slots: int
+    capacity: int
+    bitmap: str  # Un carácter por horario de slot_times: "1" ningún barbero libre
+
+class MonthOccupancyResponse(BaseModel):
+    month: str
+    slot_times: List[str]
+    days: List[DayOccupancyItem]
\ No newline at end of file
@@ -0,0 +1,69 @@
+from datetime import date, time
+from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+
+# Tramo de trabajo semanal de un barbero
+class WorkingHoursItem(BaseModel):
+    weekday: int = Field(..., ge=0, le=6)  # 0 = lunes ... 6 = domingo
+    start_time: time
+    end_time: time
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time debe ser posterior a start_time")
+        return self
+
+class BarberCreate(BaseModel):
+    name: str = Field(..., min_length=1)
+    hours: List[WorkingHoursItem] = []
+
+# Campos opcionales: solo se modifican los que se envían (hours sustituye el horario completo)
+class BarberUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1)
+    is_active: Optional[bool] = None
+    hours: Optional[List[WorkingHoursItem]] = None
+
+class BarberResponse(BaseModel):
+    id: int
+    name: str
+    is_active: bool
+    hours: List[WorkingHoursItem]
+
+class ServiceUpdate(BaseModel):
+    duration_minutes: int = Field(..., gt=0, le=8 * 60)
+
+class ServiceResponse(BaseModel):
+    name: str
+    duration_minutes: int
+
+    class Config:
+        from_attributes = True
+
+# Festivo (sin horas) o pausa puntual; sin barbero afecta a toda la barbería
+class TimeOffCreate(BaseModel):
+    date: date
+    barber_id: Optional[int] = None
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    reason: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_times(self):
+        if (self.start_time is None) != (self.end_time is None):
+            raise ValueError("start_time y end_time se indican juntos")
+        if self.start_time is not None and self.end_time <= self.start_time:
+            raise ValueError("end_time debe ser posterior a start_time")
+        return self
+
+class TimeOffResponse(TimeOffCreate):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+# Configuración completa de la agenda
+class ScheduleResponse(BaseModel):
+    slot_minutes: int
+    barbers: List[BarberResponse]
+    services: List[ServiceResponse]
@@ -0,0 +1,25 @@
+from datetime import date
+from typing import Optional, List, Union
+from pydantic import BaseModel
+
+# Contador de un bucket (servicio, hora o día de la semana)
+class StatBucket(BaseModel):
+    key: Union[int, str]
+    count: int
+
+# Contador de citas de un día concreto
+class DayStat(BaseModel):
+    date: date
+    count: int
+
+# Esquema de respuesta de las estadísticas del panel de administración
+class StatsResponse(BaseModel):
+    date_from: Optional[date]
+    date_to: Optional[date]
+    total_appointments: int
+    today_appointments: int
+    total_users: int
+    by_service: List[StatBucket]
+    by_hour: List[StatBucket]
+    by_weekday: List[StatBucket]
+    by_day: List[DayStat]
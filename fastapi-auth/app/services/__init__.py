@@ -0,0 +1 @@
+# Paquete de servicios (lógica de negocio compartida entre routers)
\ No newline at end of file
@@ -0,0 +1,102 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import AppointmentSlot
+from app.services.cache import Cache, MemoryLRUBackend
+from app.services.etags import day_versions
+from app.services.scheduling import Schedule, bit_count, past_mask, slot_label
+
+# Máximo de días que se pueden pedir en una sola consulta de disponibilidad
+MAX_RANGE_DAYS = 62
+
+# Caché por fecha de los huecos ocupados de cada barbero (no depende de la hora actual)
+availability_cache = Cache(MemoryLRUBackend(
+    maxsize=settings.availability_cache_size,
+    ttl=settings.availability_cache_ttl
+))
+
+async def booked_masks(db: AsyncSession, date_from: date, date_to: date) -> Dict[date, Dict[int, int]]:
+    """Obtener con una sola consulta los huecos ocupados de un rango de días.
+
+    Devuelve, por día, un bitmap por barbero: el bit i está a 1 si el hueco i está ocupado.
+    """
+    masks = {}
+    rows = await db.execute(
+        select(AppointmentSlot.date, AppointmentSlot.barber_id, AppointmentSlot.slot).where(
+            AppointmentSlot.date >= date_from,
+            AppointmentSlot.date <= date_to
+        )
+    )
+
+    for slot_date, barber_id, slot in rows:
+        day = masks.setdefault(slot_date, {})
+        day[barber_id] = day.get(barber_id, 0) | (1 << slot)
+    return masks
+
+async def cached_booked_masks(db: AsyncSession, date_from: date, date_to: date) -> Dict[date, Dict[int, int]]:
+    """Como booked_masks, pero sirviendo desde la caché los días ya conocidos.
+
+    Los días que faltan se leen con una única consulta sobre el rango que los cubre.
+    """
+    days = list(date_range(date_from, date_to))
+    masks = availability_cache.get_many(days)
+    missing = [day for day in days if day not in masks]
+
+    if missing:
+        version = availability_cache.version
+        loaded = await booked_masks(db, missing[0], missing[-1])
+        for day in date_range(missing[0], missing[-1]):
+            busy = loaded.get(day, {})
+            availability_cache.set(day, busy, version=version)
+            masks.setdefault(day, busy)
+    return masks
+
+def invalidate_day(day: date):
+    """Descartar la entrada de caché de un día tras modificar sus citas (después del commit).
+
+    También sube la versión del día, con lo que cambia el ETag de su disponibilidad.
+    """
+    availability_cache.invalidate(day)
+    day_versions.bump(day)
+
+def free_mask(schedule: Schedule, day: date, busy: Dict[int, int], slots: int, now: datetime,
+              barber_id: Optional[int] = None) -> int:
+    """Huecos en los que algún barbero (o el indicado) puede empezar el servicio"""
+    free = 0
+    for starts in schedule.free_starts(day, busy, slots, now, barber_id).values():
+        free |= starts
+    return free
+
+def build_slots(schedule: Schedule, day: date, busy: Dict[int, int], slots: int, now: datetime,
+                barber_id: Optional[int] = None) -> List[dict]:
+    """Construir la lista de horarios del día con su disponibilidad.
+
+    Solo aparecen los horarios en los que trabaja algún barbero y que no han pasado.
+    """
+    free = free_mask(schedule, day, busy, slots, now, barber_id)
+    offered = schedule.open_starts(day, slots, barber_id) & ~past_mask(day, now)
+    return [
+        {"time": slot_label(index), "available": bool(free & (1 << index))}
+        for index in range(offered.bit_length())
+        if offered & (1 << index)
+    ]
+
+def day_summary(schedule: Schedule, day: date, busy: Dict[int, int], slots: int, now: datetime,
+                window: range, barber_id: Optional[int] = None) -> dict:
+    """Resumen compacto de un día: bitmap de horarios libres dentro de `window` y si está completo"""
+    free = free_mask(schedule, day, busy, slots, now, barber_id)
+    return {
+        "date": day,
+        "bitmap": "".join("1" if free & (1 << index) else "0" for index in window),
+        "available_count": bit_count(free),
+        "fully_booked": free == 0
+    }
+
+def date_range(date_from: date, date_to: date):
+    """Iterar los días de un rango, ambos incluidos"""
+    for offset in range((date_to - date_from).days + 1):
+        yield date_from + timedelta(days=offset)
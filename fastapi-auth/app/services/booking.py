@@ -0,0 +1,124 @@
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.database import CONFLICT_INSERTS, insert_ignoring_conflicts
+from app.models import Appointment, AppointmentSlot
+from app.services.scheduling import SLOT_MINUTES, slot_rows
+
+def _occupy_statement(dialect_name: str):
+    # ON CONFLICT DO NOTHING: un hueco ya ocupado no lanza excepción, simplemente no se devuelve
+    return insert_ignoring_conflicts(
+        dialect_name, AppointmentSlot, ["barber_id", "date", "slot"]
+    ).returning(AppointmentSlot.appointment_id)
+
+async def _occupy_each(db: AsyncSession, slot_groups: List[List[dict]]) -> List[int]:
+    """Ocupar los huecos reserva a reserva, cada una en un SAVEPOINT.
+
+    Para dialectos sin ON CONFLICT: un choque hace fallar el INSERT entero con
+    IntegrityError, así que se deshace solo esa reserva y las demás siguen.
+    """
+    occupied = []
+    statement = _occupy_statement(db.bind.dialect.name)
+    for slot_values in slot_groups:
+        try:
+            async with db.begin_nested():
+                occupied.extend((await db.scalars(statement.values(slot_values))).all())
+        except IntegrityError:
+            continue
+    return occupied
+
+async def reserve(db: AsyncSession, values: dict, barber_id: int, start: int, slots: int) -> Optional[Appointment]:
+    """Crear una cita y ocupar sus huecos en la agenda del barbero.
+
+    Si otra reserva ha ocupado alguno de los huecos, deshace la transacción y
+    devuelve None (el llamante puede probar con otro barbero). No hace commit.
+    """
+    appointment = await db.scalar(
+        insert(Appointment)
+        .values(**values, barber_id=barber_id, duration_minutes=slots * SLOT_MINUTES)
+        .returning(Appointment)
+    )
+    try:
+        taken = (await db.scalars(
+            _occupy_statement(db.bind.dialect.name).values(
+                slot_rows(barber_id, values["date"], start, slots, appointment.id)
+            )
+        )).all()
+    except IntegrityError:
+        # Dialectos sin ON CONFLICT: el hueco ocupado llega como excepción
+        taken = []
+
+    if len(taken) < slots:
+        await db.rollback()
+        return None
+    return appointment
+
+async def reserve_many(db: AsyncSession, bookings: List[dict]) -> Dict[int, dict]:
+    """Crear varias citas ya asignadas a un barbero con dos INSERT en bloque.
+
+    Cada reserva lleva los valores de la cita más `start` y `slots`. Devuelve las
+    filas creadas por posición en `bookings`; las que han chocado con una reserva
+    concurrente se eliminan de nuevo y no aparecen. No hace commit.
+    """
+    if not bookings:
+        return {}
+
+    rows = (await db.execute(
+        insert(Appointment).returning(
+            Appointment.id, Appointment.user_id, Appointment.barber_id, Appointment.date,
+            Appointment.time, Appointment.service_type, Appointment.notes,
+            sort_by_parameter_order=True
+        ),
+        [
+            {
+                **{key: value for key, value in booking.items() if key not in ("start", "slots")},
+                "duration_minutes": booking["slots"] * SLOT_MINUTES
+            }
+            for booking in bookings
+        ]
+    )).all()
+
+    slot_groups = [
+        slot_rows(row.barber_id, row.date, booking["start"], booking["slots"], row.id)
+        for booking, row in zip(bookings, rows)
+    ]
+    if db.bind.dialect.name in CONFLICT_INSERTS:
+        statement = _occupy_statement(db.bind.dialect.name)
+        occupied_ids = (await db.scalars(statement.values([slot for group in slot_groups for slot in group]))).all()
+    else:
+        occupied_ids = await _occupy_each(db, slot_groups)
+
+    occupied: Dict[int, int] = {}
+    for appointment_id in occupied_ids:
+        occupied[appointment_id] = occupied.get(appointment_id, 0) + 1
+
+    created, lost = {}, []
+    for index, (booking, row) in enumerate(zip(bookings, rows)):
+        if occupied.get(row.id, 0) == booking["slots"]:
+            created[index] = row
+        else:
+            lost.append(row.id)
+
+    if lost:
+        await release(db, lost)
+        await db.execute(
+            delete(Appointment).where(Appointment.id.in_(lost)).execution_options(synchronize_session=False)
+        )
+    return created
+
+async def release(db: AsyncSession, appointment_ids: List[int]):
+    """Liberar los huecos de unas citas (al cancelarlas). No hace commit."""
+    await db.execute(
+        delete(AppointmentSlot)
+        .where(AppointmentSlot.appointment_id.in_(appointment_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+def mark_busy(busy: Dict[date, Dict[int, int]], day: date, barber_id: int, start: int, slots: int):
+    """Marcar unos huecos como ocupados en una copia local de los bitmaps de un rango"""
+    day_masks = busy.setdefault(day, {})
+    day_masks[barber_id] = day_masks.get(barber_id, 0) | (((1 << slots) - 1) << start)
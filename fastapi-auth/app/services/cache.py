@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+class CacheBackend:
+    """Interfaz de almacenamiento de la caché.
+
+    Permite cambiar la implementación en memoria por un almacén compartido
+    (Redis, memcached, ...) cuando se despliegan varios workers.
+    `get` devuelve None si la clave no existe o ha caducado.
+    """
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any):
+        raise NotImplementedError
+
+    def delete(self, key: Hashable):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+class MemoryLRUBackend(CacheBackend):
+    """Caché en memoria del proceso con tamaño máximo, TTL y expulsión LRU"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class Cache:
+    """Fachada sobre un CacheBackend con contadores de aciertos y fallos.
+
+    Para no guardar valores obsoletos, `set` recibe el número de invalidaciones
+    leído antes de consultar la base de datos (`version`) y descarta el valor si
+    desde entonces se ha invalidado alguna entrada.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def configure(self, backend: CacheBackend):
+        """Sustituir el almacén (por ejemplo, por uno compartido entre workers)"""
+        self.backend = backend
+
+    @property
+    def version(self) -> int:
+        return self.invalidations
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Devolver solo las claves presentes en la caché"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key, value, version: Optional[int] = None):
+        if version is not None and version != self.invalidations:
+            return
+        self.backend.set(key, value)
+
+    def invalidate(self, key):
+        with self._lock:
+            self.invalidations += 1
+        self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += 1
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": getattr(self.backend, "evictions", 0)
+        }
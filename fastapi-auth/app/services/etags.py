@@ -0,0 +1,56 @@
+import secrets
+import threading
+import time
+from typing import Dict, Hashable, Optional
+
+from fastapi import Request, Response, status
+
+from app.config import settings
+
+# Identificador de este proceso: los contadores viven en memoria y vuelven a cero al
+# reiniciar, así que un ETag de un arranque (o de otro worker) nunca coincide con otro
+BOOT_NONCE = secrets.token_hex(4)
+
+class VersionCounters:
+    """Contador de versión por clave (fecha, usuario) que suben las rutas de escritura"""
+
+    def __init__(self):
+        self._versions: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, key: Hashable):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+# Citas de cada fecha (disponibilidad) y de cada usuario (my-appointments)
+day_versions = VersionCounters()
+user_versions = VersionCounters()
+
+def make_etag(*parts) -> str:
+    """ETag fuerte a partir de las versiones de las que depende la respuesta.
+
+    Incluye el intervalo de ETAG_TTL segundos en curso: los cambios hechos desde otro
+    worker no suben los contadores de este, y así tardan como mucho ETAG_TTL en verse.
+    """
+    bucket = int(time.time() // settings.etag_ttl)
+    return '"' + "-".join(str(part) for part in (BOOT_NONCE, bucket, *parts)) + '"'
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """True si el cliente ya tiene esta versión (comparación débil, como pide If-None-Match)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+def conditional(request: Request, response: Response, etag: str, cache_control: str) -> Optional[Response]:
+    """Fijar ETag y Cache-Control en la respuesta; devuelve un 304 si el cliente ya la tiene"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if if_none_match(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,121 @@
+import asyncio
+import itertools
+import json
+import threading
+from dataclasses import dataclass
+from typing import Optional, Set
+
+from app.config import settings
+
+@dataclass(frozen=True)
+class Event:
+    """Evento publicado en el broker (`data` ya serializable a JSON)"""
+    id: int
+    type: str
+    data: dict
+
+def format_sse(event: Event) -> str:
+    """Serializar un evento en el formato de server-sent events"""
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data, ensure_ascii=False)}\n\n"
+
+class Subscription:
+    """Cola acotada de un suscriptor.
+
+    Si el cliente no consume a tiempo y la cola se llena, se vacía y se deja un único
+    evento `resync`: el cliente vuelve a cargar los datos en lugar de recibir un
+    flujo incompleto, y el publicador nunca espera por un suscriptor lento.
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, event: Event) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(Event(event.id, "resync", {"reason": "overflow"}))
+            return False
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Siguiente evento, o None si no llega ninguno en `timeout` segundos"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class EventBroker:
+    """Pub/sub en memoria del proceso para las actualizaciones en vivo del panel.
+
+    Con varios workers cada proceso tiene su propio broker; para repartir los
+    eventos entre procesos habría que sustituirlo por uno compartido (Redis, ...).
+    """
+
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.published = 0
+        self.overflows = 0
+        self._subscribers: Set[Subscription] = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Optional[Subscription]:
+        """Nueva suscripción, o None si se ha alcanzado el máximo de suscriptores"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(self.queue_size)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event_type: str, data: dict) -> Event:
+        """Entregar un evento a todos los suscriptores sin bloquear al publicador"""
+        with self._lock:
+            event = Event(next(self._ids), event_type, data)
+            subscribers = list(self._subscribers)
+            self.published += 1
+
+        for subscription in subscribers:
+            if not subscription.offer(event):
+                self.overflows += 1
+        return event
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+        }
+
+broker = EventBroker(settings.events_queue_size, settings.events_max_subscribers)
+
+def _appointment_data(appointment_id, appointment_date, appointment_time, service_type, **extra) -> dict:
+    return {
+        "id": appointment_id,
+        "date": appointment_date.isoformat(),
+        "time": appointment_time.isoformat(),
+        "service_type": service_type,
+        **extra,
+    }
+
+def publish_appointment_created(appointment, username: str):
+    """Publicar una cita nueva (se llama después del commit)"""
+    broker.publish("appointment_created", _appointment_data(
+        appointment.id, appointment.date, appointment.time, appointment.service_type,
+        user_id=appointment.user_id, barber_id=appointment.barber_id, username=username, notes=appointment.notes
+    ))
+
+def publish_appointment_cancelled(appointment):
+    """Publicar una cita cancelada (se llama después del commit)"""
+    broker.publish("appointment_cancelled", _appointment_data(
+        appointment.id, appointment.date, appointment.time, appointment.service_type
+    ))
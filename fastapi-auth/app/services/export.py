@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from typing import AsyncIterator, List
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.config import settings
+from app.database.database import AsyncSessionLocal
+
+# Formatos de exportación y su tipo de contenido
+EXPORT_FORMATS = {
+    "csv": "text/csv",  # Starlette añade charset=utf-8
+    "ndjson": "application/x-ndjson",
+}
+
+def _value(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    return value
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([[("" if value is None else _value(value)) for value in row] for row in rows])
+    return buffer.getvalue()
+
+def _ndjson_chunk(columns: List[str], rows) -> str:
+    return "".join(
+        json.dumps({name: _value(value) for name, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+async def stream_rows(query: Select, columns: List[str], export_format: str) -> AsyncIterator[str]:
+    """Recorrer una consulta con un cursor del servidor y generar el fichero por bloques.
+
+    La sesión es propia del generador (vive lo que dura la descarga) y solo se
+    mantienen en memoria `export_batch_size` filas a la vez.
+    """
+    if export_format == "csv":
+        # La cabecera sale antes de ejecutar la consulta: el cliente recibe el primer byte enseguida
+        yield _csv_chunk([columns])
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=settings.export_batch_size))
+        async for rows in result.partitions():
+            if export_format == "csv":
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(columns, rows)
+
+def export_response(query: Select, columns: List[str], export_format: str, filename: str) -> StreamingResponse:
+    """Respuesta en streaming con el resultado de `query` como CSV o NDJSON"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato no soportado. Usa uno de: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    return StreamingResponse(
+        stream_rows(query, columns, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
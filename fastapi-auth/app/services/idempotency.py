@@ -0,0 +1,96 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database.database import AsyncSessionLocal, insert_ignoring_conflicts
+from app.models import IdempotencyKey
+from app.services.serialization import dumps
+
+# Cabecera de la petición y la que marca una respuesta repetida
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+def check_key(key: Optional[str]) -> Optional[str]:
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"La cabecera {IDEMPOTENCY_HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres"
+        )
+    return key
+
+def request_hash(payload: dict) -> str:
+    """Huella del cuerpo de la petición para detectar una clave reutilizada con otros datos"""
+    return hashlib.sha256(dumps(payload)).hexdigest()
+
+def _replay(stored: IdempotencyKey, fingerprint: str) -> Response:
+    if stored.request_hash != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"La {IDEMPOTENCY_HEADER} ya se usó con una petición distinta"
+        )
+    return Response(
+        content=stored.response_body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"}
+    )
+
+async def find_response(db: AsyncSession, user_id: int, key: str, fingerprint: str) -> Optional[Response]:
+    """Respuesta guardada para esta clave, o None si no hay (o ha caducado)"""
+    stored = await db.get(IdempotencyKey, (user_id, key))
+    if stored is None or stored.expires_at <= datetime.now():
+        return None
+    return _replay(stored, fingerprint)
+
+async def save_response(db: AsyncSession, user_id: int, key: str, fingerprint: str,
+                        status_code: int, content) -> Optional[Response]:
+    """Guardar la respuesta en la misma transacción que la operación (antes del commit).
+
+    Si otra petición con la misma clave se ha confirmado mientras tanto, deshace la
+    transacción actual y devuelve la respuesta de aquella; si no, devuelve None.
+    """
+    now = datetime.now()
+    # Una fila caducada con la misma clave se sustituye
+    await db.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at <= now
+        )
+    )
+    saved = await db.scalar(
+        insert_ignoring_conflicts(db.bind.dialect.name, IdempotencyKey, ["user_id", "key"])
+        .values(
+            user_id=user_id,
+            key=key,
+            request_hash=fingerprint,
+            status_code=status_code,
+            response_body=dumps(content).decode("utf-8"),
+            expires_at=now + timedelta(seconds=settings.idempotency_ttl)
+        )
+        .returning(IdempotencyKey.key)
+    )
+    if saved is not None:
+        return None
+
+    await db.rollback()
+    stored = await db.get(IdempotencyKey, (user_id, key))
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Hay otra petición en curso con la misma {IDEMPOTENCY_HEADER}"
+        )
+    return _replay(stored, fingerprint)
+
+async def delete_expired_keys() -> int:
+    """Borrar las claves caducadas; devuelve cuántas se han borrado"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now()))
+        await db.commit()
+        return result.rowcount
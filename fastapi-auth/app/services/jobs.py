@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, insert, literal, select
+
+from app.auth.auth import token_denylist
+from app.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models import Appointment, AppointmentHistory, AppointmentSlot, DayOccupancy
+from app.services.availability import cached_booked_masks
+from app.services.etags import user_versions
+from app.services.idempotency import delete_expired_keys
+from app.services.outbox import delete_old_messages
+from app.services.scheduler import Scheduler
+from app.services.scheduling import get_schedule
+
+logger = logging.getLogger(__name__)
+
+# Columnas que se copian de appointments a appointments_history
+HISTORY_COLUMNS = [
+    "id", "user_id", "barber_id", "date", "time", "service_type", "duration_minutes", "notes", "created_at"
+]
+
+async def archive_past_appointments() -> Optional[str]:
+    """Mover a appointments_history las citas de hace más de APPOINTMENT_ARCHIVE_AFTER_DAYS días.
+
+    Va por bloques, cada uno en su transacción: copia las citas, borra sus huecos y
+    las borra de appointments. También borra la ocupación guardada de esos días (los
+    días sin fila se calculan sin citas, y ya no se pueden reservar). Las estadísticas
+    no cambian: appointment_stats no se toca.
+    """
+    cutoff = date.today() - timedelta(days=settings.appointment_archive_after_days)
+    archived = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Appointment.id, Appointment.user_id)
+                .where(Appointment.date < cutoff)
+                .order_by(Appointment.date, Appointment.time)
+                .limit(settings.appointment_archive_batch_size)
+            )).all()
+            if not rows:
+                break
+            ids = [row.id for row in rows]
+            await db.execute(
+                insert(AppointmentHistory).from_select(
+                    [*HISTORY_COLUMNS, "archived_at"],
+                    select(*[getattr(Appointment, name) for name in HISTORY_COLUMNS], literal(datetime.now()))
+                    .where(Appointment.id.in_(ids))
+                )
+            )
+            await db.execute(delete(AppointmentSlot).where(AppointmentSlot.appointment_id.in_(ids)))
+            await db.execute(delete(Appointment).where(Appointment.id.in_(ids)))
+            await db.commit()
+
+        for user_id in {row.user_id for row in rows}:
+            user_versions.bump(user_id)
+        archived += len(rows)
+        if len(rows) < settings.appointment_archive_batch_size:
+            break
+        # Dejar pasar las peticiones entre bloque y bloque
+        await asyncio.sleep(0)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(DayOccupancy).where(DayOccupancy.date < cutoff))
+        await db.commit()
+    if archived:
+        return f"{archived} citas anteriores al {cutoff.isoformat()} archivadas"
+    return None
+
+async def prune_idempotency_keys() -> Optional[str]:
+    deleted = await delete_expired_keys()
+    return f"{deleted} claves de idempotencia caducadas borradas" if deleted else None
+
+async def prune_outbox() -> Optional[str]:
+    deleted = await delete_old_messages()
+    return f"{deleted} notificaciones antiguas borradas del outbox" if deleted else None
+
+async def prune_revoked_tokens() -> Optional[str]:
+    """Descartar de la lista de tokens revocados (de este proceso) los que ya han caducado"""
+    pruned = token_denylist.prune()
+    if not pruned:
+        return None
+    token_denylist.save()
+    return f"{pruned} tokens revocados caducados descartados"
+
+async def prewarm_availability() -> Optional[str]:
+    """Cargar en la caché de este proceso la agenda y la disponibilidad de los próximos días"""
+    today = date.today()
+    async with AsyncSessionLocal() as db:
+        await get_schedule(db)
+        days = await cached_booked_masks(db, today, today + timedelta(days=settings.availability_prewarm_days - 1))
+    return f"disponibilidad de {len(days)} días precargada"
+
+def register_jobs(scheduler: Scheduler):
+    """Tareas incluidas en la aplicación, con la programación de la configuración"""
+    # Sobre la base de datos: una sola ejecución entre todos los workers
+    scheduler.add_job("archive_appointments", settings.appointment_archive_schedule, archive_past_appointments)
+    scheduler.add_job("prune_idempotency_keys", settings.idempotency_gc_interval, prune_idempotency_keys)
+    scheduler.add_job("prune_outbox", settings.outbox_prune_schedule, prune_outbox)
+    # Sobre la memoria de cada proceso: cada worker ejecuta la suya
+    scheduler.add_job("prune_revoked_tokens", settings.token_prune_interval, prune_revoked_tokens, exclusive=False)
+    scheduler.add_job(
+        "prewarm_availability", settings.availability_prewarm_schedule, prewarm_availability,
+        exclusive=False, run_on_start=True
+    )
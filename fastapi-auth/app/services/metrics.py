@@ -0,0 +1,307 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+# Límites (segundos) de los histogramas de latencia
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Límites del histograma de consultas por petición
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Métrica con etiquetas que se exporta en el formato de texto de Prometheus"""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class CallbackGauge(Metric):
+    """Gauge cuyo valor se calcula al exportar (tamaño de cachés, conexiones del pool, ...)"""
+    kind = "gauge"
+
+    def __init__(self, name, help, callback: Callable[[], Dict[Tuple, float]], labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+
+    def samples(self):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.callback().items())
+        ]
+
+class CallbackCounter(CallbackGauge):
+    """Contador mantenido fuera del registro (por ejemplo, los aciertos de una caché)"""
+    kind = "counter"
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [contador por bucket..., suma, total]
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+class Registry:
+    """Conjunto de métricas del proceso"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"La métrica {metric.name} ya está registrada")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def callback_gauge(self, name, help, callback, labelnames=()) -> CallbackGauge:
+        return self.register(CallbackGauge(name, help, callback, labelnames))
+
+    def callback_counter(self, name, help, callback, labelnames=()) -> CallbackCounter:
+        return self.register(CallbackCounter(name, help, callback, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """Exportar todas las métricas en el formato de texto de Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Peticiones HTTP
+http_requests = registry.counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso"
+)
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "Consultas SQL ejecutadas por petición", ("route",), QUERY_COUNT_BUCKETS
+)
+http_request_db_duration = registry.histogram(
+    "http_request_db_duration_seconds", "Tiempo total en la base de datos por petición", ("route",)
+)
+
+# Base de datos
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Duración de cada consulta SQL", ("operation",)
+)
+db_errors = registry.counter(
+    "db_errors_total", "Errores de la base de datos (locked = SQLite bloqueada, integrity = restricción)", ("kind",)
+)
+
+# Hashing de contraseñas
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds",
+    "Duración de las operaciones de bcrypt, incluida la espera en la cola del pool",
+    ("operation",)
+)
+
+rate_limit_requests = registry.counter(
+    "rate_limit_requests_total",
+    "Peticiones que han pasado por el limitador, por regla y resultado (allowed/limited)",
+    ("rule", "result")
+)
+
+# Tareas programadas
+job_runs = registry.counter(
+    "scheduler_job_runs_total",
+    "Ejecuciones de las tareas programadas por resultado (success/error/skipped = la tiene otro worker)",
+    ("job", "result")
+)
+job_duration = registry.histogram(
+    "scheduler_job_duration_seconds", "Duración de las tareas programadas", ("job",),
+    (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+job_last_success = registry.gauge(
+    "scheduler_job_last_success_timestamp_seconds", "Última ejecución correcta de cada tarea (epoch)", ("job",)
+)
+
+# Notificaciones del outbox
+outbox_messages = registry.counter(
+    "outbox_messages_total",
+    "Mensajes del outbox procesados por tipo y resultado (sent/retry/failed)",
+    ("kind", "result")
+)
+outbox_send_duration = registry.histogram(
+    "outbox_send_duration_seconds", "Duración de cada envío de notificación", ("transport",)
+)
+outbox_due_lag = registry.gauge(
+    "outbox_due_lag_seconds", "Retraso del mensaje más antiguo del último lote reclamado respecto a su hora de envío"
+)
+
+@dataclass
+class RequestStats:
+    """Tiempos acumulados durante una petición (consultas SQL y bcrypt)"""
+    db_queries: int = 0
+    db_time: float = 0.0
+    hash_time: float = 0.0
+
+# Estadísticas de la petición en curso (las fija el middleware de métricas)
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+@contextmanager
+def track_password_hash(operation: str):
+    """Medir una operación de bcrypt en el histograma y en la petición en curso"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        password_hash_duration.observe(elapsed, operation=operation)
+        stats = current_request.get()
+        if stats is not None:
+            stats.hash_time += elapsed
+
+_SQL_OPERATIONS = {"select", "insert", "update", "delete", "pragma", "begin", "commit", "rollback"}
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return verb if verb in _SQL_OPERATIONS else "other"
+
+def instrument_engine(engine: Engine):
+    """Registrar los eventos de SQLAlchemy que miden cada consulta.
+
+    Con un motor asíncrono hay que pasar `async_engine.sync_engine`.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _finish_query(conn, statement)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            _finish_query(conn, exception_context.statement or "")
+        message = str(exception_context.original_exception).lower()
+        if isinstance(exception_context.sqlalchemy_exception, IntegrityError):
+            db_errors.inc(kind="integrity")
+        elif "locked" in message or "busy" in message:
+            db_errors.inc(kind="locked")
+        else:
+            db_errors.inc(kind="other")
+
+def _finish_query(conn, statement: str):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    db_query_duration.observe(elapsed, operation=_operation(statement))
+    stats = current_request.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_time += elapsed
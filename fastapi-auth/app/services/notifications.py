@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import smtplib
+import threading
+from dataclasses import asdict, dataclass
+from datetime import date
+from email.message import EmailMessage
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Asunto y texto de cada tipo de mensaje del outbox
+TEMPLATES = {
+    "appointment_created": (
+        "Cita confirmada",
+        "Hola {username}, tu cita de {service_type} está confirmada para el {day} a las {time}."
+    ),
+    "appointment_reminder": (
+        "Recordatorio de tu cita",
+        "Hola {username}, te recordamos tu cita de {service_type} el {day} a las {time}."
+    ),
+    "appointment_cancelled": (
+        "Cita cancelada",
+        "Hola {username}, tu cita de {service_type} del {day} a las {time} se ha cancelado."
+    ),
+}
+
+@dataclass
+class Notification:
+    """Mensaje ya listo para enviar"""
+    id: int
+    kind: str
+    recipient: str
+    subject: str
+    body: str
+
+def render(message_id: int, kind: str, email: str, username: str, payload: dict) -> Notification:
+    subject, body = TEMPLATES[kind]
+    day = date.fromisoformat(payload["date"]).strftime("%d/%m/%Y")
+    return Notification(
+        id=message_id,
+        kind=kind,
+        recipient=email,
+        subject=subject,
+        body=body.format(username=username, day=day, time=payload["time"][:5], service_type=payload["service_type"])
+    )
+
+class Transport:
+    """Forma de entregar las notificaciones. `send` lanza una excepción si falla (se reintenta)"""
+    name = "base"
+
+    async def send(self, notification: Notification):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class LogTransport(Transport):
+    """Solo escribe cada notificación en el log (desarrollo)"""
+    name = "log"
+
+    async def send(self, notification: Notification):
+        logger.info("Notificación %s para %s: %s", notification.kind, notification.recipient, notification.subject)
+
+class FileTransport(Transport):
+    """Añade cada notificación como una línea JSON a un fichero (pruebas, sustituto del SMTP)"""
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _write(self, line: str):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    async def send(self, notification: Notification):
+        # La escritura va en un hilo para no bloquear el event loop
+        line = json.dumps(asdict(notification), ensure_ascii=False) + "\n"
+        await asyncio.to_thread(self._write, line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class SMTPTransport(Transport):
+    """Envío por SMTP (smtplib en un hilo, una conexión por mensaje)"""
+    name = "smtp"
+
+    def __init__(self, host: str, port: int, sender: str, username: str = None, password: str = None,
+                 starttls: bool = False, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def _send(self, notification: Notification):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = notification.recipient
+        message["Subject"] = notification.subject
+        message.set_content(notification.body)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(message)
+
+    async def send(self, notification: Notification):
+        await asyncio.to_thread(self._send, notification)
+
+def build_transport(config: Settings) -> Transport:
+    """Transporte indicado en NOTIFICATION_TRANSPORT"""
+    name = config.notification_transport.lower()
+    if name == "log":
+        return LogTransport()
+    if name == "file":
+        return FileTransport(config.notification_file_path)
+    if name == "smtp":
+        return SMTPTransport(
+            config.smtp_host, config.smtp_port, config.smtp_sender, config.smtp_username,
+            config.smtp_password, config.smtp_starttls, config.outbox_send_timeout
+        )
+    raise ValueError(f"Transporte de notificaciones desconocido '{config.notification_transport}'. Use log, file o smtp")
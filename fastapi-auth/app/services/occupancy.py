@@ -0,0 +1,121 @@
+from datetime import date
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database.database import insert_ignoring_conflicts
+from app.models import AppointmentSlot, DayOccupancy
+from app.services.availability import booked_masks, date_range
+from app.services.scheduling import SLOTS_PER_DAY, Schedule, bit_count, load_schedule, load_schedule_sync
+
+def occupancy_row(schedule: Schedule, day: date, busy: Dict[int, int]) -> dict:
+    """Calcular la fila de day_occupancy de un día a partir de los huecos ocupados de cada barbero"""
+    open_masks = schedule.open_masks(day)
+    working = free = 0
+    for barber, mask in open_masks.items():
+        working |= mask
+        free |= mask & ~busy.get(barber, 0)
+    full = working & ~free
+
+    return {
+        "date": day,
+        "booked_slots": sum(bit_count(mask) for mask in busy.values()),
+        "capacity": sum(bit_count(mask) for mask in open_masks.values()),
+        "bitmap": "".join("1" if full & (1 << index) else "0" for index in range(SLOTS_PER_DAY))
+    }
+
+async def sync_occupancy(db: AsyncSession, schedule: Schedule, days: Iterable[date]):
+    """Recalcular la ocupación de los días indicados dentro de la transacción actual.
+
+    Se llama después de ocupar o liberar huecos y antes del commit. Las filas de esos
+    días se bloquean primero (FOR UPDATE en PostgreSQL; en SQLite la transacción ya
+    tiene el bloqueo de escritura), así que dos reservas concurrentes del mismo día
+    no pueden dejar un recuento desfasado. No hace commit.
+    """
+    days = sorted(set(days))
+    if not days:
+        return
+
+    await db.execute(
+        insert_ignoring_conflicts(db.bind.dialect.name, DayOccupancy, ["date"]),
+        [{"date": day, "booked_slots": 0, "capacity": 0, "bitmap": ""} for day in days]
+    )
+    await db.execute(select(DayOccupancy.date).where(DayOccupancy.date.in_(days)).with_for_update())
+
+    masks = await booked_masks(db, days[0], days[-1])
+    await db.execute(
+        update(DayOccupancy),
+        [occupancy_row(schedule, day, masks.get(day, {})) for day in days]
+    )
+
+async def refresh_occupancy(db: AsyncSession):
+    """Recalcular capacidad y bitmap de los días futuros ya guardados tras cambiar la agenda.
+
+    Usa la agenda tal y como queda en la transacción actual. No hace commit.
+    """
+    await db.flush()
+    schedule = await load_schedule(db)
+    days = (await db.scalars(select(DayOccupancy.date).where(DayOccupancy.date >= date.today()))).all()
+    await sync_occupancy(db, schedule, days)
+
+async def month_occupancy(db: AsyncSession, schedule: Schedule, date_from: date, date_to: date) -> List[dict]:
+    """Ocupación de cada día del rango con una sola lectura por rango de la clave primaria.
+
+    Los días sin fila no tienen citas: su capacidad sale de la agenda.
+    """
+    stored = {
+        row.date: row
+        for row in await db.scalars(
+            select(DayOccupancy).where(DayOccupancy.date >= date_from, DayOccupancy.date <= date_to)
+        )
+    }
+
+    days = []
+    for day in date_range(date_from, date_to):
+        row = stored.get(day)
+        if row is None:
+            days.append(occupancy_row(schedule, day, {}))
+        else:
+            days.append({
+                "date": day, "booked_slots": row.booked_slots, "capacity": row.capacity, "bitmap": row.bitmap
+            })
+    return days
+
+def rebuild_occupancy(db: Session, check: bool = False) -> List[date]:
+    """Recalcular day_occupancy desde appointment_slots.
+
+    Devuelve los días cuya fila guardada no coincidía con el cálculo. Con `check=True`
+    solo los informa; si no, reescribe la tabla completa.
+    """
+    # Las pausas se leen desde el primer día que hay que recalcular, no solo las recientes
+    first_days = [
+        db.scalar(select(func.min(AppointmentSlot.date))),
+        db.scalar(select(func.min(DayOccupancy.date)))
+    ]
+    schedule = load_schedule_sync(db, since=min(filter(None, first_days), default=None))
+
+    masks = {}
+    for slot_date, barber_id, slot in db.execute(
+        select(AppointmentSlot.date, AppointmentSlot.barber_id, AppointmentSlot.slot)
+        .execution_options(yield_per=5000)
+    ):
+        day = masks.setdefault(slot_date, {})
+        day[barber_id] = day.get(barber_id, 0) | (1 << slot)
+
+    stored = {
+        row.date: {"date": row.date, "booked_slots": row.booked_slots, "capacity": row.capacity, "bitmap": row.bitmap}
+        for row in db.scalars(select(DayOccupancy))
+    }
+    rows = [
+        occupancy_row(schedule, day, masks.get(day, {}))
+        for day in sorted(set(masks) | set(stored))
+    ]
+    mismatches = [row["date"] for row in rows if stored.get(row["date"]) != row]
+
+    if not check:
+        db.execute(delete(DayOccupancy))
+        db.bulk_insert_mappings(DayOccupancy, rows)
+        db.commit()
+    return mismatches
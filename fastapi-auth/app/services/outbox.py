@@ -0,0 +1,283 @@
+"""Outbox de notificaciones y dispatcher que las envía.
+
+Las rutas de citas solo insertan filas en la tabla outbox dentro de su transacción (una
+confirmación o cancelación inmediata y, al reservar, el recordatorio programado). El
+dispatcher de cada worker reclama lotes de mensajes ya disponibles con un UPDATE
+condicional que los aparta durante un plazo, los envía con un máximo de envíos
+simultáneos y marca el resultado: enviado, reintento con espera exponencial o fallido
+tras OUTBOX_MAX_ATTEMPTS intentos. Si un worker muere con un lote reclamado, el plazo
+caduca y otro lo vuelve a enviar, así que la entrega es "al menos una vez".
+"""
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models import OutboxMessage, User
+from app.services.metrics import outbox_due_lag, outbox_messages, outbox_send_duration
+from app.services.notifications import Transport, build_transport, render
+
+logger = logging.getLogger(__name__)
+
+def _payload(appointment) -> str:
+    return json.dumps({
+        "date": appointment.date.isoformat(),
+        "time": appointment.time.isoformat(),
+        "service_type": appointment.service_type,
+        "barber_id": appointment.barber_id,
+    })
+
+def _message(kind: str, appointment, available_at: datetime) -> dict:
+    return {
+        "kind": kind,
+        "user_id": appointment.user_id,
+        "appointment_id": appointment.id,
+        "payload": _payload(appointment),
+        "status": "pending",
+        "attempts": 0,
+        "available_at": available_at,
+    }
+
+async def enqueue_created(db: AsyncSession, appointments: Iterable):
+    """Confirmación y recordatorio de las citas creadas, en la transacción actual (sin commit).
+
+    El recordatorio sale NOTIFICATION_REMINDER_HOURS antes de la cita; si ese momento
+    ya ha pasado, basta con la confirmación. Con OUTBOX_ENABLED=false no se encola nada:
+    no habría dispatcher que enviara ni borrara esas filas.
+    """
+    if not settings.outbox_enabled:
+        return
+    now = datetime.now()
+    rows = []
+    for appointment in appointments:
+        rows.append(_message("appointment_created", appointment, now))
+        remind_at = datetime.combine(appointment.date, appointment.time) - timedelta(
+            hours=settings.notification_reminder_hours
+        )
+        if remind_at > now:
+            rows.append(_message("appointment_reminder", appointment, remind_at))
+    if rows:
+        await db.execute(insert(OutboxMessage.__table__), rows)
+
+async def enqueue_cancelled(db: AsyncSession, appointments: List):
+    """Aviso de cancelación y borrado de los recordatorios pendientes (sin commit)"""
+    if not appointments or not settings.outbox_enabled:
+        return
+    await db.execute(
+        delete(OutboxMessage)
+        .where(
+            OutboxMessage.appointment_id.in_([appointment.id for appointment in appointments]),
+            OutboxMessage.kind == "appointment_reminder",
+            OutboxMessage.status == "pending"
+        )
+        .execution_options(synchronize_session=False)
+    )
+    now = datetime.now()
+    await db.execute(insert(OutboxMessage.__table__), [
+        _message("appointment_cancelled", appointment, now) for appointment in appointments
+    ])
+
+def retry_delay(attempts: int) -> float:
+    """Espera antes del siguiente intento: exponencial, con tope y con algo de azar"""
+    delay = min(settings.outbox_retry_max, settings.outbox_retry_base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+async def delete_old_messages() -> int:
+    """Borrar los mensajes enviados o fallidos de hace más de OUTBOX_RETENTION_DAYS días"""
+    cutoff = datetime.now() - timedelta(days=settings.outbox_retention_days)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(OutboxMessage)
+            .where(OutboxMessage.status.in_(["sent", "failed"]), OutboxMessage.available_at < cutoff)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount
+
+class OutboxDispatcher:
+    """Envía los mensajes del outbox en segundo plano.
+
+    Cada ronda reclama hasta `batch_size` mensajes disponibles y los envía con un
+    máximo de `concurrency` a la vez. Si el lote venía lleno empieza otra ronda en
+    seguida; si no, espera `poll_interval` segundos o a que una petición avise de que
+    hay mensajes nuevos (`wake`).
+    """
+
+    def __init__(self, transport: Transport, batch_size: int = 100, concurrency: int = 20,
+                 poll_interval: float = 5.0, send_timeout: float = 30.0, max_attempts: int = 5):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.send_timeout = send_timeout
+        self.max_attempts = max_attempts
+        # Tiempo que un lote reclamado queda apartado: lo que tardaría enviado por tandas
+        self.lease = send_timeout * (math.ceil(batch_size / concurrency) + 1)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self):
+        """Avisar de que hay mensajes nuevos (desde las rutas, después del commit)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._loop(), name="outbox-dispatcher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._wakeup = None
+        self.transport.close()
+
+    async def _loop(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                sent = await self.dispatch_once()
+            except Exception:
+                logger.exception("Error al enviar las notificaciones del outbox")
+                sent = 0
+            if sent < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _claim(self, db: AsyncSession, now: datetime) -> list:
+        due = (await db.execute(
+            select(OutboxMessage.id, OutboxMessage.available_at)
+            .where(OutboxMessage.status == "pending", OutboxMessage.available_at <= now)
+            .order_by(OutboxMessage.available_at)
+            .limit(self.batch_size)
+        )).all()
+        # La lectura va en su propia transacción: con SQLite, una transacción de lectura que
+        # luego escribe falla si otra petición ha escrito entretanto
+        await db.commit()
+        if not due:
+            outbox_due_lag.set(0)
+            return []
+        outbox_due_lag.set((now - due[0].available_at).total_seconds())
+
+        # La condición se repite en el UPDATE: si otro worker ha reclamado alguno de
+        # estos mensajes entre la lectura y la escritura, ya no se cumple para él
+        claimed = (await db.execute(
+            update(OutboxMessage)
+            .where(
+                OutboxMessage.id.in_([row.id for row in due]),
+                OutboxMessage.status == "pending",
+                OutboxMessage.available_at <= now
+            )
+            .values(available_at=now + timedelta(seconds=self.lease), attempts=OutboxMessage.attempts + 1)
+            .returning(
+                OutboxMessage.id, OutboxMessage.kind, OutboxMessage.user_id,
+                OutboxMessage.payload, OutboxMessage.attempts
+            )
+            .execution_options(synchronize_session=False)
+        )).all()
+        await db.commit()
+        return claimed
+
+    async def _send(self, semaphore: asyncio.Semaphore, notification) -> Optional[str]:
+        """Enviar un mensaje; devuelve None si ha ido bien o el error"""
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.transport.send(notification), self.send_timeout)
+                return None
+            except Exception as exc:
+                return f"{type(exc).__name__}: {exc}"[:500]
+            finally:
+                outbox_send_duration.observe(time.perf_counter() - started, transport=self.transport.name)
+
+    async def dispatch_once(self) -> int:
+        """Reclamar y enviar un lote; devuelve cuántos mensajes se han reclamado"""
+        now = datetime.now()
+        async with AsyncSessionLocal() as db:
+            messages = await self._claim(db, now)
+            if not messages:
+                return 0
+            users = {
+                row.id: row
+                for row in await db.execute(
+                    select(User.id, User.email, User.username)
+                    .where(User.id.in_({message.user_id for message in messages}))
+                )
+            }
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        sends, errors, permanent = [], {}, set()
+        for message in messages:
+            user = users.get(message.user_id)
+            if user is None:
+                errors[message.id] = "El usuario ya no existe"
+                permanent.add(message.id)
+                continue
+            notification = render(message.id, message.kind, user.email, user.username, json.loads(message.payload))
+            sends.append((message, self._send(semaphore, notification)))
+        results = await asyncio.gather(*(send for _, send in sends))
+        errors.update({message.id: error for (message, _), error in zip(sends, results) if error})
+
+        await self._finish(messages, errors, permanent)
+        return len(messages)
+
+    async def _finish(self, messages: list, errors: dict, permanent: set):
+        """Guardar el resultado del lote; los errores de `permanent` no se reintentan"""
+        now = datetime.now()
+        sent = [message.id for message in messages if message.id not in errors]
+        retries = []
+        for message in messages:
+            error = errors.get(message.id)
+            if error is None:
+                outbox_messages.inc(kind=message.kind, result="sent")
+                continue
+            failed = message.attempts >= self.max_attempts or message.id in permanent
+            outbox_messages.inc(kind=message.kind, result="failed" if failed else "retry")
+            retries.append({
+                "message_id": message.id,
+                "new_status": "failed" if failed else "pending",
+                "next_at": now if failed else now + timedelta(seconds=retry_delay(message.attempts)),
+                "error": error,
+            })
+            if failed:
+                logger.warning("Notificación %d descartada tras %d intentos: %s", message.id, message.attempts, error)
+
+        table = OutboxMessage.__table__
+        async with AsyncSessionLocal() as db:
+            if sent:
+                await db.execute(
+                    update(table)
+                    .where(table.c.id.in_(sent))
+                    .values(status="sent", sent_at=now, available_at=now, last_error=None)
+                )
+            if retries:
+                await db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("message_id"))
+                    .values(status=bindparam("new_status"), available_at=bindparam("next_at"),
+                            last_error=bindparam("error")),
+                    retries
+                )
+            await db.commit()
+
+# Dispatcher de la aplicación (lo arranca y lo para el lifespan de main.py)
+outbox_dispatcher = OutboxDispatcher(
+    build_transport(settings),
+    batch_size=settings.outbox_batch_size,
+    concurrency=settings.outbox_concurrency,
+    poll_interval=settings.outbox_poll_interval,
+    send_timeout=settings.outbox_send_timeout,
+    max_attempts=settings.outbox_max_attempts
+)
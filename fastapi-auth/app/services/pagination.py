@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import date, time
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+
+# Tamaño de página por defecto y máximo para los listados
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Cabecera en la que se devuelve el cursor de la siguiente página
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _default(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable en cursor: {type(value)!r}")
+
+def encode_cursor(values: list) -> str:
+    """Codificar los valores de la clave de ordenación en un cursor opaco"""
+    raw = json.dumps(values, default=_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decodificar un cursor generado por encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+    return values
+
+def parse_fields(fields: Optional[str], allowed: List[str]) -> List[str]:
+    """Validar la proyección `fields=a,b,c` contra las columnas permitidas"""
+    if not fields:
+        return list(allowed)
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos no válidos: {', '.join(unknown)}. Permitidos: {', '.join(allowed)}"
+        )
+    return requested
+
+def parse_ids(ids: Optional[str]) -> Optional[List[int]]:
+    """Convertir una lista `1,2,3` en enteros"""
+    if not ids:
+        return None
+    try:
+        return [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La lista de ids debe contener solo números"
+        )
@@ -0,0 +1,122 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from app.config import settings
+
+# Unidades de periodo admitidas en los límites ("10/minute")
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+class GCRALimiter:
+    """Limitador GCRA (generic cell rate algorithm), equivalente a un token bucket.
+
+    Por cada clave solo guarda un número: el instante teórico de llegada (TAT) a partir
+    del cual el cubo vuelve a estar lleno. Las claves se guardan en orden de uso y,
+    como una clave cuyo TAT ya ha pasado equivale a una nueva, cada inserción descarta
+    las más antiguas que estén inactivas; además hay un máximo de claves.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._tat: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: Hashable, limit: int, period: float) -> float:
+        """Registrar una petición; devuelve 0 si se permite o los segundos que hay que esperar.
+
+        Permite ráfagas de hasta `limit` peticiones y después una cada `period / limit`.
+        """
+        now = time.monotonic()
+        interval = period / limit
+        with self._lock:
+            tat = self._tat.get(key)
+            new_tat = (now if tat is None or tat < now else tat) + interval
+            wait = new_tat - period - now
+            if wait > 0:
+                return wait
+            self._tat[key] = new_tat
+            if tat is None:
+                self._evict(now)
+            else:
+                self._tat.move_to_end(key)
+        return 0.0
+
+    def _evict(self, now: float):
+        tat = self._tat
+        while len(tat) > self.max_keys:
+            tat.popitem(last=False)
+        # Como mucho dos claves inactivas por inserción: coste constante y memoria acotada
+        for _ in range(2):
+            oldest = next(iter(tat))
+            if tat[oldest] > now:
+                break
+            del tat[oldest]
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def clear(self):
+        with self._lock:
+            self._tat.clear()
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str  # la ruta tal y como está en la configuración ("POST /api/v1/token")
+    limit: int
+    period: float
+
+def parse_limit(value: str) -> Tuple[int, float]:
+    """Convertir "10/minute" en (10, 60.0)"""
+    count, _, unit = value.partition("/")
+    try:
+        limit = int(count)
+        period = PERIODS[unit.strip().lower()]
+    except (KeyError, ValueError):
+        raise ValueError(f"Límite incorrecto '{value}'. Use N/second, N/minute, N/hour o N/day")
+    if limit <= 0:
+        raise ValueError(f"Límite incorrecto '{value}': el número de peticiones debe ser positivo")
+    return limit, float(period)
+
+class RouteLimits:
+    """Límites por ruta de la configuración, con búsqueda por método y path.
+
+    Las claves son "MÉTODO /ruta" (la ruta puede llevar parámetros, "/availability/{date}")
+    o "*" para el resto de peticiones. Las rutas sin parámetros se buscan en un
+    diccionario; las demás, con una expresión regular cada una.
+    """
+
+    def __init__(self, limits: Dict[str, str]):
+        self.default: Optional[RateLimitRule] = None
+        self._static: Dict[Tuple[str, str], RateLimitRule] = {}
+        self._patterns: List[Tuple[str, "re.Pattern", RateLimitRule]] = []
+
+        for name, value in limits.items():
+            limit, period = parse_limit(value)
+            rule = RateLimitRule(name, limit, period)
+            if name == "*":
+                self.default = rule
+                continue
+            method, _, path = name.partition(" ")
+            if not path.startswith("/"):
+                raise ValueError(f"Ruta de límite incorrecta '{name}'. Use 'MÉTODO /ruta' o '*'")
+            method = method.upper()
+            if "{" in path:
+                pattern = re.compile("^" + re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(path)) + "$")
+                self._patterns.append((method, pattern, rule))
+            else:
+                self._static[(method, path)] = rule
+
+    def match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        rule = self._static.get((method, path))
+        if rule is not None:
+            return rule
+        for rule_method, pattern, rule in self._patterns:
+            if rule_method == method and pattern.match(path):
+                return rule
+        return self.default
+
+# Limitador del proceso (con varios workers, cada uno tiene el suyo)
+rate_limiter = GCRALimiter(settings.rate_limit_max_keys)
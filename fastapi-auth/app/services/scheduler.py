@@ -0,0 +1,245 @@
+"""Tareas programadas dentro del proceso de la API.
+
+Cada tarea tiene un disparador (cada N segundos o una expresión cron) y corre en su
+propia tarea de asyncio. Las tareas que trabajan sobre la base de datos son exclusivas:
+antes de cada ejecución el worker reclama la fila de la tarea en job_locks, así que con
+varios workers (o varias réplicas con la misma base de datos) solo una la ejecuta. Las
+que trabajan sobre memoria del proceso (cachés, lista de tokens revocados) no lo son,
+porque cada worker tiene la suya.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from sqlalchemy import or_, update
+
+from app.database.database import AsyncSessionLocal, insert_ignoring_conflicts
+from app.models import JobLock
+from app.services.metrics import job_duration, job_last_success, job_runs
+
+logger = logging.getLogger(__name__)
+
+# Identificador de este worker en job_locks.locked_by
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+class IntervalTrigger:
+    """Cada `seconds` segundos, alineado con el reloj (múltiplos desde epoch).
+
+    La alineación hace que todos los workers calculen la misma ejecución prevista, que
+    es lo que permite reclamarla una sola vez.
+    """
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("El intervalo de una tarea debe ser positivo")
+        self.seconds = seconds
+
+    def next_run(self, after: datetime) -> datetime:
+        timestamp = after.timestamp()
+        return datetime.fromtimestamp((timestamp // self.seconds + 1) * self.seconds)
+
+    def __repr__(self):
+        return f"cada {self.seconds:g}s"
+
+# Campos de una expresión cron: (nombre, mínimo, máximo)
+CRON_FIELDS = (("minuto", 0, 59), ("hora", 0, 23), ("día", 1, 31), ("mes", 1, 12), ("día de la semana", 0, 7))
+
+def _parse_cron_field(value: str, name: str, low: int, high: int) -> Set[int]:
+    values = set()
+    for part in value.split(","):
+        expression, _, step = part.partition("/")
+        try:
+            step = int(step) if step else 1
+            if expression == "*":
+                start, end = low, high
+            elif "-" in expression:
+                start, end = (int(bound) for bound in expression.split("-", 1))
+            else:
+                start = int(expression)
+                end = high if step > 1 else start
+        except ValueError:
+            raise ValueError(f"Campo de {name} incorrecto en la expresión cron: '{value}'")
+        if not low <= start <= end <= high or step <= 0:
+            raise ValueError(f"Campo de {name} fuera de rango en la expresión cron: '{value}' ({low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronTrigger:
+    """Expresión cron de cinco campos: minuto hora día mes día-de-la-semana.
+
+    Admite *, listas (1,15), rangos (1-5) y pasos (*/10); el día de la semana va de
+    0 (domingo) a 6, y 7 también es domingo. Como en cron, si se restringen tanto el
+    día del mes como el de la semana basta con que se cumpla uno. Hora local.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"La expresión cron '{expression}' debe tener 5 campos (minuto hora día mes día-semana)")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(value, *spec) for value, spec in zip(fields, CRON_FIELDS)
+        )
+        # Días de la semana de Python: 0 = lunes ... 6 = domingo
+        self.weekdays = {(weekday - 1) % 7 for weekday in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day: datetime) -> bool:
+        in_days = day.day in self.days
+        in_weekdays = day.weekday() in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_run(self, after: datetime) -> datetime:
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Como mucho unos años de búsqueda (29 de febrero en lunes, por ejemplo)
+        limit = moment + timedelta(days=366 * 8)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"La expresión cron '{self.expression}' no se cumple nunca")
+
+    def __repr__(self):
+        return f"cron '{self.expression}'"
+
+Trigger = Union[IntervalTrigger, CronTrigger]
+
+def parse_trigger(value) -> Trigger:
+    """Un número (segundos) o una expresión cron, como vienen de la configuración"""
+    if isinstance(value, (int, float)):
+        return IntervalTrigger(value)
+    value = str(value).strip()
+    try:
+        return IntervalTrigger(float(value))
+    except ValueError:
+        return CronTrigger(value)
+
+@dataclass
+class Job:
+    name: str
+    trigger: Trigger
+    func: Callable[[], Awaitable]
+    exclusive: bool = True  # una sola ejecución entre todos los workers (bloqueo en job_locks)
+    timeout: float = 600.0  # segundos; también es lo que dura el bloqueo
+    run_on_start: bool = False  # ejecutar también al arrancar (solo tareas no exclusivas)
+
+async def claim(name: str, scheduled_for: datetime, lease: float) -> bool:
+    """Reclamar la ejecución prevista `scheduled_for` de una tarea para este worker.
+
+    Un UPDATE condicional sobre la fila de la tarea: solo uno de los workers que lo
+    intentan a la vez cambia la fila (los demás ven ya la ejecución reclamada).
+    """
+    now = datetime.now()
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            insert_ignoring_conflicts(db.bind.dialect.name, JobLock, ["name"]).values(name=name)
+        )
+        result = await db.execute(
+            update(JobLock)
+            .where(
+                JobLock.name == name,
+                or_(JobLock.scheduled_for.is_(None), JobLock.scheduled_for < scheduled_for),
+                or_(JobLock.locked_until.is_(None), JobLock.locked_until <= now)
+            )
+            .values(locked_by=WORKER_ID, locked_until=now + timedelta(seconds=lease), scheduled_for=scheduled_for)
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+async def release(name: str, status: str):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(JobLock)
+            .where(JobLock.name == name, JobLock.locked_by == WORKER_ID)
+            .values(locked_until=None, finished_at=datetime.now(), status=status)
+        )
+        await db.commit()
+
+class Scheduler:
+    """Planificador de tareas asíncronas del proceso"""
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, trigger, func: Callable[[], Awaitable], **options) -> Job:
+        if name in self.jobs:
+            raise ValueError(f"La tarea {name} ya está registrada")
+        if not isinstance(trigger, (IntervalTrigger, CronTrigger)):
+            trigger = parse_trigger(trigger)
+        job = Job(name, trigger, func, **options)
+        self.jobs[name] = job
+        return job
+
+    def start(self):
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"job:{job.name}"))
+            logger.info("Tarea %s programada (%r)", job.name, job.trigger)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _loop(self, job: Job):
+        if job.run_on_start and not job.exclusive:
+            await self.run(job)
+        while True:
+            scheduled_for = job.trigger.next_run(datetime.now())
+            await asyncio.sleep(max(0.0, (scheduled_for - datetime.now()).total_seconds()))
+            await self.run(job, scheduled_for)
+
+    async def run(self, job: Job, scheduled_for: Optional[datetime] = None) -> str:
+        """Ejecutar una tarea una vez; devuelve success, error o skipped (otro worker la tiene)"""
+        scheduled_for = scheduled_for or datetime.now()
+        try:
+            if job.exclusive and not await claim(job.name, scheduled_for, job.timeout):
+                job_runs.inc(job=job.name, result="skipped")
+                return "skipped"
+        except Exception:
+            logger.exception("No se ha podido reclamar la tarea %s", job.name)
+            job_runs.inc(job=job.name, result="error")
+            return "error"
+
+        started = time.perf_counter()
+        result = "success"
+        try:
+            outcome = await asyncio.wait_for(job.func(), timeout=job.timeout)
+            if outcome:
+                logger.info("Tarea %s: %s", job.name, outcome)
+        except asyncio.CancelledError:
+            result = "error"
+            raise
+        except Exception:
+            result = "error"
+            logger.exception("Error en la tarea %s", job.name)
+        finally:
+            job_duration.observe(time.perf_counter() - started, job=job.name)
+            job_runs.inc(job=job.name, result=result)
+            if result == "success":
+                job_last_success.set(time.time(), job=job.name)
+            if job.exclusive:
+                try:
+                    await asyncio.shield(release(job.name, result))
+                except Exception:
+                    logger.exception("No se ha podido liberar la tarea %s", job.name)
+        return result
+
+# Planificador de la aplicación (lo arranca y lo para el lifespan de main.py)
+scheduler = Scheduler()
@@ -0,0 +1,217 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Barber, WorkingHours, TimeOff, Service
+from app.services.cache import Cache, MemoryLRUBackend
+
+# Rejilla de la agenda: el día se divide en huecos de SLOT_MINUTES minutos y cada agenda
+# (horario de un barbero, citas, pausas) es un entero en el que el bit i representa el hueco i
+SLOT_MINUTES = settings.slot_minutes
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+def slot_index(value: time) -> Optional[int]:
+    """Hueco en el que empieza `value`, o None si no cae justo al inicio de un hueco"""
+    minutes = _minutes(value)
+    if value.second or value.microsecond or minutes % SLOT_MINUTES:
+        return None
+    return minutes // SLOT_MINUTES
+
+def slot_time(index: int) -> time:
+    minutes = index * SLOT_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+def slot_label(index: int) -> str:
+    return slot_time(index).strftime("%H:%M")
+
+def clock_label(index: int) -> str:
+    """Hora de un límite de hueco en formato corto (9:00, 24:00)"""
+    minutes = index * SLOT_MINUTES
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+def interval_mask(start: int, end: int) -> int:
+    """Bitmap de los huecos [start, end)"""
+    if end <= start:
+        return 0
+    return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+def hours_mask(start: time, end: time) -> int:
+    """Huecos completos dentro de un tramo de trabajo"""
+    return interval_mask(-(-_minutes(start) // SLOT_MINUTES), _minutes(end) // SLOT_MINUTES)
+
+def blocked_mask(start: Optional[time], end: Optional[time]) -> int:
+    """Huecos que toca una pausa (todo el día si no tiene horas)"""
+    if start is None or end is None:
+        return interval_mask(0, SLOTS_PER_DAY)
+    return interval_mask(_minutes(start) // SLOT_MINUTES, -(-_minutes(end) // SLOT_MINUTES))
+
+def run_starts(free: int, length: int) -> int:
+    """Huecos en los que empiezan `length` huecos libres seguidos.
+
+    Cada paso combina el bitmap consigo mismo desplazado, así que el coste es
+    O(log length) operaciones sobre enteros y no depende del número de citas.
+    """
+    starts, span = free, 1
+    while span < length:
+        step = min(span, length - span)
+        starts &= starts >> step
+        span += step
+    return starts
+
+def past_mask(day: date, now: datetime) -> int:
+    """Huecos que ya han empezado (solo afecta al día de hoy)"""
+    if day > now.date():
+        return 0
+    if day < now.date():
+        return interval_mask(0, SLOTS_PER_DAY)
+
+    elapsed = (now - datetime.combine(day, time())).total_seconds() / 60
+    return interval_mask(0, min(int(elapsed // SLOT_MINUTES) + 1, SLOTS_PER_DAY))
+
+def bit_count(mask: int) -> int:
+    return bin(mask).count("1")
+
+@dataclass
+class Schedule:
+    """Agenda configurada: horario semanal por barbero, duraciones y pausas puntuales"""
+    weekly: Dict[int, Tuple[int, ...]] = field(default_factory=dict)  # barbero -> bitmap por día de la semana
+    durations: Dict[str, int] = field(default_factory=dict)  # servicio -> huecos
+    closures: Dict[date, int] = field(default_factory=dict)  # pausas de toda la barbería
+    time_off: Dict[Tuple[int, date], int] = field(default_factory=dict)  # pausas de un barbero
+
+    def service_slots(self, service_type: str) -> int:
+        """Huecos que ocupa un servicio (uno si no tiene duración configurada)"""
+        return self.durations.get(service_type, 1)
+
+    def open_masks(self, day: date, barber_id: Optional[int] = None) -> Dict[int, int]:
+        """Huecos en los que trabaja cada barbero ese día, descontando festivos y pausas"""
+        closed = self.closures.get(day, 0)
+        barbers = [barber_id] if barber_id is not None else self.weekly
+        return {
+            barber: self.weekly[barber][day.weekday()] & ~closed & ~self.time_off.get((barber, day), 0)
+            for barber in barbers if barber in self.weekly
+        }
+
+    def window(self) -> Tuple[int, int]:
+        """Primer y último hueco (sin incluir) en los que trabaja algún barbero durante la semana"""
+        union = 0
+        for masks in self.weekly.values():
+            for mask in masks:
+                union |= mask
+        if not union:
+            return 0, 0
+        return (union & -union).bit_length() - 1, union.bit_length()
+
+    def free_starts(self, day: date, busy: Dict[int, int], slots: int, now: datetime,
+                    barber_id: Optional[int] = None) -> Dict[int, int]:
+        """Para cada barbero, los huecos en los que puede empezar un servicio de `slots` huecos"""
+        past = past_mask(day, now)
+        return {
+            barber: run_starts(mask & ~busy.get(barber, 0), slots) & ~past
+            for barber, mask in self.open_masks(day, barber_id).items()
+        }
+
+    def open_starts(self, day: date, slots: int, barber_id: Optional[int] = None) -> int:
+        """Huecos en los que algún barbero podría empezar el servicio si no tuviera citas"""
+        starts = 0
+        for mask in self.open_masks(day, barber_id).values():
+            starts |= run_starts(mask, slots)
+        return starts
+
+    def candidates(self, day: date, start: int, slots: int, busy: Dict[int, int], now: datetime,
+                   barber_id: Optional[int] = None) -> List[int]:
+        """Barberos libres para empezar en `start`, primero los que tienen menos citas ese día"""
+        bit = 1 << start
+        free = self.free_starts(day, busy, slots, now, barber_id)
+        return sorted(
+            (barber for barber, starts in free.items() if starts & bit),
+            key=lambda barber: (bit_count(busy.get(barber, 0)), barber)
+        )
+
+    def slot_error(self, day: date, start_time: time, slots: int, now: datetime,
+                   barber_id: Optional[int] = None) -> Optional[str]:
+        """Validar una cita contra la agenda (sin mirar las reservas); devuelve el motivo o None"""
+        if datetime.combine(day, start_time) < now:
+            return "La cita debe ser en una fecha y hora futura"
+
+        first, last = self.window()
+        start = slot_index(start_time)
+        if start is None or not first <= start < last:
+            return (
+                f"Las citas solo pueden ser de {clock_label(first)} a {clock_label(last)}, "
+                f"cada {SLOT_MINUTES} minutos"
+            )
+
+        if not self.open_starts(day, slots, barber_id) & (1 << start):
+            if barber_id is not None:
+                return "El barbero no trabaja en ese horario"
+            return "No hay ningún barbero disponible en ese horario"
+        return None
+
+def _schedule_queries(since: date):
+    return (
+        select(Barber.id).where(Barber.is_active.is_(True)),
+        select(WorkingHours.barber_id, WorkingHours.weekday, WorkingHours.start_time, WorkingHours.end_time),
+        select(Service.name, Service.duration_minutes),
+        select(TimeOff.barber_id, TimeOff.date, TimeOff.start_time, TimeOff.end_time).where(TimeOff.date >= since),
+    )
+
+def build_schedule(barbers, hours, services, time_off) -> Schedule:
+    """Construir la agenda a partir de las filas de barberos, horarios, servicios y pausas"""
+    schedule = Schedule()
+
+    weekly = {barber: [0] * 7 for barber, in barbers}
+    for barber, weekday, start, end in hours:
+        if barber in weekly:
+            weekly[barber][weekday] |= hours_mask(start, end)
+    schedule.weekly = {barber: tuple(masks) for barber, masks in weekly.items()}
+
+    for name, minutes in services:
+        schedule.durations[name] = max(1, -(-minutes // SLOT_MINUTES))
+
+    for barber, day, start, end in time_off:
+        if barber is None:
+            schedule.closures[day] = schedule.closures.get(day, 0) | blocked_mask(start, end)
+        else:
+            schedule.time_off[(barber, day)] = schedule.time_off.get((barber, day), 0) | blocked_mask(start, end)
+    return schedule
+
+async def load_schedule(db: AsyncSession, since: Optional[date] = None) -> Schedule:
+    """Leer la agenda de la base de datos (pausas desde `since`, por defecto desde ayer)"""
+    since = since or date.today() - timedelta(days=1)
+    return build_schedule(*[(await db.execute(query)).all() for query in _schedule_queries(since)])
+
+def load_schedule_sync(db: Session, since: Optional[date] = None) -> Schedule:
+    """Como load_schedule, para los scripts y migraciones que usan una sesión síncrona"""
+    since = since or date.today() - timedelta(days=1)
+    return build_schedule(*[db.execute(query).all() for query in _schedule_queries(since)])
+
+# La agenda cambia muy poco: se guarda en memoria y se recarga al modificarla o al caducar
+# (el TTL hace que los cambios hechos desde otro worker lleguen a este)
+schedule_cache = Cache(MemoryLRUBackend(maxsize=1, ttl=settings.schedule_cache_ttl))
+
+async def get_schedule(db: AsyncSession) -> Schedule:
+    schedule = schedule_cache.get("schedule")
+    if schedule is None:
+        version = schedule_cache.version
+        schedule = await load_schedule(db)
+        schedule_cache.set("schedule", schedule, version=version)
+    return schedule
+
+def invalidate_schedule():
+    schedule_cache.invalidate("schedule")
+
+def slot_rows(barber_id: int, day: date, start: int, slots: int, appointment_id: int) -> List[dict]:
+    """Filas de appointment_slots que ocupa una cita"""
+    return [
+        {"barber_id": barber_id, "date": day, "slot": slot, "appointment_id": appointment_id}
+        for slot in range(start, start + slots)
+    ]
@@ -0,0 +1,47 @@
+import json
+from datetime import date, datetime, time
+from typing import List
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el módulo json de la biblioteca estándar
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value)!r}")
+
+def dumps(content) -> bytes:
+    """Serializar a JSON en bytes, con fechas y horas en ISO 8601 como hace Pydantic"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con orjson si está instalado.
+
+    Acepta fechas y horas sin pasar antes por jsonable_encoder.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def list_response(rows, fields: List[str], response: Response):
+    """Respuesta de un listado a partir de filas de columnas (tuplas) en el orden de `fields`.
+
+    Con FAST_JSON las filas se codifican directamente a bytes JSON, sin crear un modelo
+    Pydantic por fila; si no, se devuelven diccionarios que valida el response_model.
+    Las cabeceras ya fijadas en `response` (cursor de paginación) se conservan.
+    """
+    items = [dict(zip(fields, row)) for row in rows]
+    if not settings.fast_json:
+        return items
+
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return FastJSONResponse(items, headers=headers)
@@ -0,0 +1,122 @@
+from datetime import date, time
+from typing import Optional
+
+from sqlalchemy import func, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database.database import insert_adding_on_conflict
+from app.models import Appointment, AppointmentHistory, AppointmentStat, User
+
+async def record_appointment(db: AsyncSession, appointment_date: date, appointment_time: time,
+                             service_type: str, delta: int):
+    """Sumar (o restar) una cita al bucket agregado correspondiente.
+
+    Al sumar se usa un solo INSERT ... ON CONFLICT DO UPDATE, así dos reservas que crean
+    a la vez el mismo bucket no chocan con uq_appointment_stats_bucket.
+    No hace commit: se ejecuta dentro de la misma transacción que la cita.
+    """
+    if delta > 0:
+        upsert = insert_adding_on_conflict(
+            db.bind.dialect.name, AppointmentStat, ["date", "hour", "service_type"], "count"
+        )
+        if upsert is not None:
+            await db.execute(upsert.values(
+                date=appointment_date,
+                weekday=appointment_date.weekday(),
+                hour=appointment_time.hour,
+                service_type=service_type,
+                count=delta
+            ))
+            return
+
+    result = await db.execute(
+        update(AppointmentStat)
+        .where(
+            AppointmentStat.date == appointment_date,
+            AppointmentStat.hour == appointment_time.hour,
+            AppointmentStat.service_type == service_type
+        )
+        .values(count=AppointmentStat.count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+    if not result.rowcount and delta > 0:
+        db.add(AppointmentStat(
+            date=appointment_date,
+            weekday=appointment_date.weekday(),
+            hour=appointment_time.hour,
+            service_type=service_type,
+            count=delta
+        ))
+
+async def record_appointments(db: AsyncSession, appointments, delta: int):
+    """Como record_appointment para varias citas (date, time, service_type), con una sentencia por bucket"""
+    buckets = {}
+    for appointment_date, appointment_time, service_type in appointments:
+        key = (appointment_date, appointment_time.hour, service_type)
+        buckets[key] = buckets.get(key, 0) + delta
+    
+    for (appointment_date, hour, service_type), bucket_delta in buckets.items():
+        await record_appointment(db, appointment_date, time(hour=hour), service_type, bucket_delta)
+
+def rebuild_stats(db: Session) -> int:
+    """Reconstruir la tabla agregada desde cero a partir de las citas existentes (también las archivadas)"""
+    db.query(AppointmentStat).delete(synchronize_session=False)
+
+    buckets = {}
+    appointments = union_all(
+        select(Appointment.date, Appointment.time, Appointment.service_type),
+        select(AppointmentHistory.date, AppointmentHistory.time, AppointmentHistory.service_type)
+    )
+    for appointment_date, appointment_time, service_type in db.execute(
+        appointments.execution_options(yield_per=1000)
+    ):
+        key = (appointment_date, appointment_time.hour, service_type)
+        buckets[key] = buckets.get(key, 0) + 1
+
+    db.bulk_insert_mappings(AppointmentStat, [
+        {
+            "date": appointment_date,
+            "weekday": appointment_date.weekday(),
+            "hour": hour,
+            "service_type": service_type,
+            "count": count
+        }
+        for (appointment_date, hour, service_type), count in buckets.items()
+    ])
+    db.commit()
+    return len(buckets)
+
+async def _grouped(db: AsyncSession, column, date_from: Optional[date], date_to: Optional[date]):
+    """Sumar los contadores agrupando por la columna indicada"""
+    query = select(column, func.sum(AppointmentStat.count))
+    if date_from:
+        query = query.where(AppointmentStat.date >= date_from)
+    if date_to:
+        query = query.where(AppointmentStat.date <= date_to)
+    query = query.group_by(column).having(func.sum(AppointmentStat.count) > 0).order_by(column)
+    return (await db.execute(query)).all()
+
+async def get_stats(db: AsyncSession, date_from: Optional[date] = None, date_to: Optional[date] = None) -> dict:
+    """Calcular las estadísticas del panel con GROUP BY sobre la tabla agregada"""
+    by_service = await _grouped(db, AppointmentStat.service_type, date_from, date_to)
+    by_hour = await _grouped(db, AppointmentStat.hour, date_from, date_to)
+    by_weekday = await _grouped(db, AppointmentStat.weekday, date_from, date_to)
+    by_day = await _grouped(db, AppointmentStat.date, date_from, date_to)
+
+    today_appointments = await db.scalar(
+        select(func.sum(AppointmentStat.count)).where(AppointmentStat.date == date.today())
+    )
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "total_appointments": sum(count for _, count in by_service),
+        "today_appointments": today_appointments or 0,
+        "total_users": await db.scalar(select(func.count(User.id))),
+        "by_service": [{"key": key, "count": count} for key, count in by_service],
+        "by_hour": [{"key": key, "count": count} for key, count in by_hour],
+        "by_weekday": [{"key": key, "count": count} for key, count in by_weekday],
+        "by_day": [{"date": key, "count": count} for key, count in by_day]
+    }
@@ -0,0 +1,346 @@
+"""Benchmark de carga de la API de reservas.
+
+Ejecuta la aplicación de `main.py` en el mismo proceso (httpx + ASGI) contra una base de datos
+SQLite temporal, siembra N usuarios y M citas y lanza varios escenarios:
+
+- availability: consultas de disponibilidad por día y por rango
+- booking_race: muchos usuarios reservando el mismo horario a la vez
+- login_burst: ráfaga de logins concurrentes
+- admin_listing: listado completo de citas recorriendo todas las páginas, más /users/me
+
+Para cada endpoint muestra peticiones/s y latencias p50/p95/p99, y guarda el resultado en JSON
+para compararlo entre commits:
+
+    python -m benchmarks.api_load --users 200 --appointments 2000 --output resultados.json
+    python -m benchmarks.api_load --compare resultados.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BENCH_PASSWORD = "bench-password"
+SCENARIOS = ("availability", "booking_race", "login_burst", "admin_listing")
+
+class Recorder:
+    """Acumula las latencias de cada endpoint"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.elapsed = {}
+
+    async def call(self, label: str, request, expected=(200,)):
+        started = time.perf_counter()
+        response = await request
+        self.samples.setdefault(label, []).append(time.perf_counter() - started)
+        if response.status_code not in expected:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return response
+
+    def track(self, label: str, elapsed: float):
+        """Sumar el tiempo de reloj que ha tardado una tanda de peticiones de `label`"""
+        self.elapsed[label] = self.elapsed.get(label, 0.0) + elapsed
+
+    def summary(self) -> dict:
+        result = {}
+        for label, latencies in self.samples.items():
+            cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            elapsed = self.elapsed.get(label) or sum(latencies)
+            result[label] = {
+                "requests": len(latencies),
+                "errors": self.errors.get(label, 0),
+                "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+                "p50_ms": round(cuts[49] * 1000, 2),
+                "p95_ms": round(cuts[94] * 1000, 2),
+                "p99_ms": round(cuts[98] * 1000, 2),
+            }
+        return result
+
+async def run_concurrently(recorder: Recorder, label: str, concurrency: int, calls):
+    """Ejecutar las peticiones con un máximo de `concurrency` en vuelo"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(call):
+        async with semaphore:
+            return await call
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(limited(call) for call in calls))
+    recorder.track(label, time.perf_counter() - started)
+    return responses
+
+def seed(users: int, appointments: int, first_day: date) -> int:
+    """Crear usuarios y citas directamente en la base de datos (sin pasar por la API).
+
+    Todas las cuentas comparten contraseña, así que bcrypt solo se ejecuta una vez.
+    Devuelve el número de días ocupados por las citas.
+    """
+    from sqlalchemy import insert
+
+    from app.auth.auth import get_password_hash
+    from app.database.database import SessionLocal
+    from app.database.migrations import DEFAULT_HOURS
+    from app.models import Appointment, AppointmentSlot, Barber, User
+    from app.services.scheduling import slot_index, slot_rows, slot_time
+    from app.services.occupancy import rebuild_occupancy
+    from app.services.stats import rebuild_stats
+
+    # Una cita por hueco en la agenda del barbero por defecto (la que crean las migraciones)
+    slot_times = [slot_time(index) for index in range(slot_index(DEFAULT_HOURS[0]), slot_index(DEFAULT_HOURS[1]))]
+
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(User, [
+            {
+                "username": f"bench{index}",
+                "email": f"bench{index}@example.com",
+                "hashed_password": hashed_password,
+                "is_active": True,
+            }
+            for index in range(users)
+        ])
+        barber_id = db.query(Barber.id).order_by(Barber.id).first()[0]
+        rows = [
+            {
+                "user_id": index % users + 1,
+                "barber_id": barber_id,
+                "date": first_day + timedelta(days=index // len(slot_times)),
+                "time": slot_times[index % len(slot_times)],
+                "service_type": ("Corte", "Barba", "Corte + Barba")[index % 3],
+            }
+            for index in range(appointments)
+        ]
+        if rows:
+            ids = db.scalars(
+                insert(Appointment).returning(Appointment.id, sort_by_parameter_order=True), rows
+            ).all()
+            db.bulk_insert_mappings(AppointmentSlot, [
+                slot
+                for row, appointment_id in zip(rows, ids)
+                for slot in slot_rows(barber_id, row["date"], slot_index(row["time"]), 1, appointment_id)
+            ])
+        db.commit()
+        rebuild_stats(db)
+        rebuild_occupancy(db)
+    finally:
+        db.close()
+    return max(1, -(-appointments // len(slot_times)))
+
+async def login(client, username: str) -> dict:
+    response = await client.post("/api/v1/token", data={"username": username, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def scenario_availability(client, recorder: Recorder, args, first_day: date, days: int):
+    """Clientes consultando la disponibilidad de días sueltos y de un mes"""
+    await run_concurrently(recorder, "GET /availability/{date}", args.concurrency, [
+        recorder.call(
+            "GET /availability/{date}",
+            client.get(f"/api/v1/appointments/availability/{first_day + timedelta(days=index % (days + 7))}")
+        )
+        for index in range(args.requests)
+    ])
+
+    await run_concurrently(recorder, "GET /availability?from&to", args.concurrency, [
+        recorder.call(
+            "GET /availability?from&to",
+            client.get("/api/v1/appointments/availability", params={
+                "from": str(first_day + timedelta(days=index % days)),
+                "to": str(first_day + timedelta(days=index % days + 30)),
+            })
+        )
+        for index in range(args.requests // 4 or 1)
+    ])
+
+async def scenario_booking_race(client, recorder: Recorder, args, first_day: date, days: int, headers: list):
+    """Varios usuarios intentan reservar el mismo horario a la vez: solo uno debe conseguirlo"""
+    label = "POST /appointments"
+    winners = 0
+    for race in range(args.races):
+        race_day = str(first_day + timedelta(days=days + 1 + race))
+        responses = await run_concurrently(recorder, label, args.concurrency, [
+            recorder.call(
+                label,
+                client.post("/api/v1/appointments/", headers=user_headers, json={
+                    "date": race_day, "time": "10:00", "service_type": "Corte"
+                }),
+                expected=(201, 400)
+            )
+            for user_headers in headers
+        ])
+        winners += sum(1 for response in responses if response.status_code == 201)
+    return {"races": args.races, "winners": winners}
+
+async def scenario_login_burst(client, recorder: Recorder, args):
+    """Ráfaga de logins correctos de usuarios distintos"""
+    label = "POST /token"
+    await run_concurrently(recorder, label, args.concurrency, [
+        recorder.call(label, client.post("/api/v1/token", data={
+            "username": f"bench{index % args.users}", "password": BENCH_PASSWORD
+        }))
+        for index in range(args.logins)
+    ])
+
+async def scenario_admin_listing(client, recorder: Recorder, args, headers: dict):
+    """Un administrador recorre el listado completo de citas y consulta su perfil"""
+    label = "GET /admin/all-appointments"
+    pages = 0
+    for _ in range(args.listings):
+        cursor = None
+        started = time.perf_counter()
+        while True:
+            params = {"limit": 500}
+            if cursor:
+                params["cursor"] = cursor
+            response = await recorder.call(label, client.get(
+                "/api/v1/appointments/admin/all-appointments", params=params, headers=headers
+            ))
+            pages += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        recorder.track(label, time.perf_counter() - started)
+
+    await run_concurrently(recorder, "GET /users/me", args.concurrency, [
+        recorder.call("GET /users/me", client.get("/api/v1/users/me", headers=headers))
+        for _ in range(args.requests)
+    ])
+    return {"pages": pages}
+
+async def run_benchmark(args) -> dict:
+    import httpx
+
+    import main
+    from app.config import settings
+    from app.database.database import engine
+    from app.database.migrations import migrate
+
+    migrate(engine)
+    first_day = date.today() + timedelta(days=1)
+    seed_started = time.perf_counter()
+    days = seed(args.users, args.appointments, first_day)
+    seed_elapsed = time.perf_counter() - seed_started
+
+    recorder = Recorder()
+    details = {}
+    transport = httpx.ASGITransport(app=main.app)
+    # ASGITransport no envía los eventos de lifespan: se arranca y se para la aplicación
+    # aquí, como haría uvicorn (tareas, notificaciones, pool de bcrypt y conexiones)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            racers = min(args.racers, args.users)
+            headers = [await login(client, f"bench{index}") for index in range(racers)]
+
+            if "availability" in args.scenarios:
+                await scenario_availability(client, recorder, args, first_day, days)
+            if "booking_race" in args.scenarios:
+                details["booking_race"] = await scenario_booking_race(
+                    client, recorder, args, first_day, days, headers
+                )
+            if "login_burst" in args.scenarios:
+                await scenario_login_burst(client, recorder, args)
+            if "admin_listing" in args.scenarios:
+                details["admin_listing"] = await scenario_admin_listing(client, recorder, args, headers[0])
+
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {
+            "users": args.users,
+            "appointments": args.appointments,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "racers": racers,
+            "races": args.races,
+            "logins": args.logins,
+            "listings": args.listings,
+            "bcrypt_rounds": settings.bcrypt_rounds,
+            "password_hash_workers": settings.password_hash_workers,
+        },
+        "seed_seconds": round(seed_elapsed, 2),
+        "details": details,
+        "endpoints": recorder.summary(),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(result: dict, baseline: dict = None):
+    print(f"\nCommit {result['commit']} · {result['params']['users']} usuarios, "
+          f"{result['params']['appointments']} citas (siembra {result['seed_seconds']} s)\n")
+    header = f"{'endpoint':<32}{'peticiones':>11}{'errores':>9}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'Δ p95':>10}"
+    print(header)
+
+    previous = (baseline or {}).get("endpoints", {})
+    for label, stats in result["endpoints"].items():
+        line = (f"{label:<32}{stats['requests']:>11}{stats['errors']:>9}{stats['rps']:>10}"
+                f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+        if baseline:
+            before = previous.get(label)
+            if before and before["p95_ms"]:
+                line += f"{(stats['p95_ms'] / before['p95_ms'] - 1) * 100:>+9.0f}%"
+            else:
+                line += f"{'-':>10}"
+        print(line)
+
+    for name, detail in result["details"].items():
+        print(f"{name}: {detail}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la API de reservas")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--appointments", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=400, help="peticiones por endpoint de lectura")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--racers", type=int, default=20, help="usuarios compitiendo por cada horario")
+    parser.add_argument("--races", type=int, default=5)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--listings", type=int, default=3)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"escenarios separados por comas ({', '.join(SCENARIOS)})")
+    parser.add_argument("--output", help="fichero JSON donde guardar el resultado")
+    parser.add_argument("--compare", help="resultado JSON anterior con el que comparar el p95")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(unknown))}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La configuración se lee al importar la aplicación: la base de datos temporal
+        # tiene que estar en el entorno antes de importar `main`
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        # Todas las peticiones salen del mismo cliente: el límite de peticiones las frenaría
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+        result = asyncio.run(run_benchmark(args))
+
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(result, handle, indent=2)
+        print(f"\nResultado guardado en {args.output}")
+
+if __name__ == "__main__":
+    main()
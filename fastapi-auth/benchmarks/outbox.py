@@ -0,0 +1,156 @@
+"""Benchmark del outbox de notificaciones.
+
+Sobre una base de datos SQLite temporal mide:
+
+- lo que añade a una reserva encolar la confirmación y el recordatorio (dos filas en la
+  misma transacción), que es todo lo que hace la petición;
+- cuántas notificaciones por minuto envía el dispatcher vaciando un outbox con N
+  mensajes, con un transporte que simula la latencia de un servidor SMTP y opcionalmente
+  un porcentaje de fallos (que se reintentan).
+
+Uso:
+    python -m benchmarks.outbox [--messages 20000] [--latency 0.02] [--failure-rate 0.01]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from types import SimpleNamespace
+
+class SimulatedTransport:
+    """Transporte que tarda `latency` segundos y falla con probabilidad `failure_rate`"""
+    name = "simulated"
+
+    def __init__(self, latency: float, failure_rate: float):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.delivered = 0
+
+    async def send(self, notification):
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise ConnectionError("fallo simulado")
+        self.delivered += 1
+
+    def close(self):
+        pass
+
+def seed(users: int, messages: int):
+    from sqlalchemy import insert
+
+    from app.database.database import SessionLocal
+    from app.models import OutboxMessage, User
+
+    now = datetime.now()
+    payload = '{"date": "2030-01-15", "time": "10:00:00", "service_type": "Corte de pelo", "barber_id": 1}'
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [
+            {"username": f"bench{index}", "email": f"bench{index}@example.com", "hashed_password": "x", "is_active": True}
+            for index in range(users)
+        ])
+        db.execute(insert(OutboxMessage), [
+            {
+                "kind": ("appointment_created", "appointment_reminder", "appointment_cancelled")[index % 3],
+                "user_id": index % users + 1,
+                "appointment_id": index,
+                "payload": payload,
+                "status": "pending",
+                "attempts": 0,
+                "available_at": now,
+            }
+            for index in range(messages)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+async def measure_enqueue(count: int) -> tuple:
+    """Microsegundos por reserva que cuesta encolar sus notificaciones (sin el commit),
+    junto a los de una consulta trivial para compararlos"""
+    from sqlalchemy import text
+
+    from app.database.database import AsyncSessionLocal
+    from app.services.outbox import enqueue_created
+
+    day = date.today() + timedelta(days=30)
+    appointments = [
+        SimpleNamespace(id=index, user_id=1, barber_id=1, date=day, time=dt_time(10, 0), service_type="Corte de pelo")
+        for index in range(count)
+    ]
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        for _ in range(count):
+            await db.execute(text("SELECT 1"))
+        baseline = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for appointment in appointments:
+            await enqueue_created(db, [appointment])
+        elapsed = time.perf_counter() - started
+        await db.rollback()
+    return elapsed / count * 1e6, baseline / count * 1e6
+
+async def run(args) -> dict:
+    from app.database.database import async_engine, engine
+    from app.database.migrations import migrate
+    from app.services.outbox import OutboxDispatcher
+
+    migrate(engine)
+    seed(args.users, args.messages)
+    enqueue_us, query_us = await measure_enqueue(2000)
+
+    transport = SimulatedTransport(args.latency, args.failure_rate)
+    dispatcher = OutboxDispatcher(
+        transport, batch_size=args.batch_size, concurrency=args.concurrency, max_attempts=args.max_attempts
+    )
+    started = time.perf_counter()
+    rounds = 0
+    while transport.delivered < args.messages and time.perf_counter() - started < args.timeout:
+        if not await dispatcher.dispatch_once():
+            # Solo quedan reintentos con espera: se espera a que venzan
+            await asyncio.sleep(0.05)
+        rounds += 1
+    elapsed = time.perf_counter() - started
+    await async_engine.dispose()
+    return {
+        "enqueue_us": enqueue_us, "query_us": query_us,
+        "elapsed": elapsed, "rounds": rounds, "delivered": transport.delivered
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02, help="segundos por envío")
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--max-attempts", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=300, help="segundos como máximo")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La configuración se lee al importar la aplicación: la base de datos temporal y la
+        # espera de los reintentos tienen que estar en el entorno antes
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        os.environ.setdefault("OUTBOX_RETRY_BASE", "0.1")
+        result = asyncio.run(run(args))
+
+    print(f"{args.messages} mensajes, {args.latency * 1000:g} ms por envío, {args.failure_rate:.0%} de fallos, "
+          f"lotes de {args.batch_size} con {args.concurrency} envíos simultáneos")
+    print(f"{'encolar (confirmación + recordatorio)':<40} {result['enqueue_us']:>10.1f} µs/reserva")
+    print(f"{'consulta trivial (SELECT 1)':<40} {result['query_us']:>10.1f} µs")
+    print(f"{'entregados':<40} {result['delivered']:>10}")
+    print(f"{'rondas del dispatcher':<40} {result['rounds']:>10}")
+    print(f"{'tiempo':<40} {result['elapsed']:>10.2f} s")
+    print(f"{'ritmo de envío':<40} {result['delivered'] / result['elapsed'] * 60:>10.0f} mensajes/min")
+    if result["delivered"] < args.messages:
+        raise SystemExit(f"Solo se han entregado {result['delivered']} de {args.messages} mensajes")
+
+if __name__ == "__main__":
+    main()
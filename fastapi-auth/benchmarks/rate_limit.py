@@ -0,0 +1,115 @@
+"""Micro-benchmark del limitador de peticiones.
+
+Mide el coste de app/services/rate_limit.py y app/middleware/rate_limit.py por
+petición: la comprobación GCRA con una clave y con muchas claves distintas (incluida
+la expulsión de las inactivas), la búsqueda de la regla de la ruta y la identificación
+del cliente (con la firma del token comprobada), y el middleware completo frente a la
+misma aplicación ASGI sin él.
+También comprueba que el limitador deja pasar la ráfaga configurada y ni una más.
+
+No necesita base de datos ni servidor. Uso:
+    python -m benchmarks.rate_limit [--requests 200000] [--keys 50000]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+
+from jose import jwt
+
+from app.auth.auth import ALGORITHM, SECRET_KEY
+from app.config import settings
+from app.middleware.rate_limit import RateLimitMiddleware, client_key
+from app.services.rate_limit import GCRALimiter, RouteLimits
+
+def signed_token(subject: str) -> str:
+    return jwt.encode({"sub": subject, "exp": time.time() + 3600}, SECRET_KEY, algorithm=ALGORITHM)
+
+def forged_token(subject: str) -> str:
+    """Token con un `sub` cualquiera y sin firma válida (cae en el cubo de la IP)"""
+    payload = base64.urlsafe_b64encode(json.dumps({"sub": subject}).encode()).rstrip(b"=").decode()
+    return f"eyJhbGciOiJIUzI1NiJ9.{payload}.firma"
+
+def make_scope(path: str, ip: str, token: str = None) -> dict:
+    headers = [(b"host", b"localhost"), (b"accept", b"application/json"), (b"user-agent", b"benchmark")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": "GET", "path": path, "headers": headers, "client": (ip, 50000)}
+
+async def plain_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+async def send(message):
+    pass
+
+def report(label: str, elapsed: float, count: int):
+    print(f"{label:<44} {elapsed / count * 1e6:>8.2f} µs/petición")
+
+def measure(function, count: int) -> float:
+    started = time.perf_counter()
+    function(count)
+    return time.perf_counter() - started
+
+def check_burst():
+    limiter = GCRALimiter()
+    allowed = sum(1 for _ in range(15) if not limiter.hit("cliente", 10, 60))
+    if allowed != 10:
+        raise SystemExit(f"El limitador ha dejado pasar {allowed} peticiones de una ráfaga de 10")
+
+async def run_middleware(app, scopes: list, count: int) -> float:
+    started = time.perf_counter()
+    for index in range(count):
+        await app(scopes[index % len(scopes)], receive, send)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--keys", type=int, default=50000, help="clientes distintos")
+    args = parser.parse_args()
+    count = args.requests
+
+    check_burst()
+    # Límites altos para medir el camino de las peticiones permitidas
+    limits = RouteLimits({**settings.rate_limits, "*": "1000000/second"})
+    print(f"{count} peticiones, {args.keys} clientes distintos")
+
+    limiter = GCRALimiter()
+    report("GCRA, un solo cliente", measure(lambda n: [limiter.hit("cliente", 10**9, 1) for _ in range(n)], count), count)
+
+    limiter = GCRALimiter(max_keys=args.keys // 2)
+    keys = [f"ip:10.0.{index // 256}.{index % 256}" for index in range(args.keys)]
+    report(
+        f"GCRA, {args.keys} clientes (máx. {args.keys // 2} claves)",
+        measure(lambda n: [limiter.hit(keys[index % len(keys)], 10**9, 1) for index in range(n)], count), count
+    )
+
+    paths = ["/api/v1/appointments/availability/2030-01-15", "/api/v1/appointments/my-appointments", "/api/v1/token"]
+    report("regla de la ruta", measure(lambda n: [limits.match("GET", paths[index % 3]) for index in range(n)], count), count)
+
+    anonymous = make_scope(paths[0], "10.0.0.1")
+    authenticated = make_scope(paths[1], "10.0.0.1", signed_token("cliente"))
+    forged = make_scope(paths[1], "10.0.0.1", forged_token("cliente"))
+    report("cliente por IP", measure(lambda n: [client_key(anonymous) for _ in range(n)], count), count)
+    report("cliente por usuario (token)", measure(lambda n: [client_key(authenticated) for _ in range(n)], count), count)
+    report("token con firma falsa (por IP)", measure(lambda n: [client_key(forged) for _ in range(n)], count), count)
+
+    scopes = [
+        make_scope(paths[index % 3], f"10.0.{index // 256 % 256}.{index % 256}", signed_token(f"u{index}") if index % 2 else None)
+        for index in range(args.keys)
+    ]
+    loop = asyncio.new_event_loop()
+    wrapped = RateLimitMiddleware(plain_app, limiter=GCRALimiter(), limits=limits)
+    without = loop.run_until_complete(run_middleware(plain_app, scopes, count))
+    with_limit = loop.run_until_complete(run_middleware(wrapped, scopes, count))
+    report("aplicación ASGI sin limitador", without, count)
+    report("aplicación ASGI con limitador", with_limit, count)
+    print(f"{'coste del middleware':<44} {(with_limit - without) / count * 1e6:>8.2f} µs/petición")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark del motor de agenda con calendarios muy ocupados.
+
+Construye una agenda con varios barberos (dos tramos diarios, pausas y festivos),
+la llena hasta la ocupación indicada con citas de duraciones distintas y mide cuánto
+cuesta responder "huecos libres para el servicio S el día D entre todos los barberos"
+con los bitmaps de app/services/scheduling.py frente a recorrer hueco a hueco un
+conjunto de huecos ocupados (lo que haría una comprobación fila a fila). También
+comprueba que ambos métodos dan el mismo resultado.
+
+No necesita base de datos. Uso:
+    python -m benchmarks.scheduling [--barbers 12] [--days 365] [--fill 0.85]
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+from app.services.availability import free_mask
+from app.services.scheduling import Schedule, hours_mask, blocked_mask, run_starts, SLOT_MINUTES
+
+# Duraciones (en huecos) de los servicios que se consultan
+SERVICE_SLOTS = (1, 2, 3, 4)
+
+def build_schedule(barbers: int, days: int, first_day: date, rng: random.Random) -> Schedule:
+    schedule = Schedule()
+    for barber in range(1, barbers + 1):
+        opening = dt_time(9 + barber % 2, 0)
+        closing = dt_time(20 + barber % 2, 0)
+        weekly = [hours_mask(opening, dt_time(14, 0)) | hours_mask(dt_time(16, 0), closing)] * 7
+        weekly[6] = 0  # Domingo cerrado
+        schedule.weekly[barber] = tuple(weekly)
+
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        if rng.random() < 0.02:
+            schedule.closures[day] = blocked_mask(None, None)
+        for barber in schedule.weekly:
+            if rng.random() < 0.05:
+                start = rng.randrange(9, 19)
+                schedule.time_off[(barber, day)] = blocked_mask(dt_time(start), dt_time(start + 1))
+    return schedule
+
+def fill(schedule: Schedule, days: int, first_day: date, ratio: float, rng: random.Random, now: datetime) -> dict:
+    """Reservar citas al azar hasta ocupar `ratio` de los huecos de trabajo"""
+    busy = {}
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        masks = {}
+        for barber, open_mask in schedule.open_masks(day).items():
+            target = int(bin(open_mask).count("1") * ratio)
+            taken = 0
+            for _ in range(200):
+                if taken >= target:
+                    break
+                slots = rng.choice(SERVICE_SLOTS)
+                starts = run_starts(open_mask & ~masks.get(barber, 0), slots)
+                if not starts:
+                    continue
+                candidates = [index for index in range(starts.bit_length()) if starts & (1 << index)]
+                start = rng.choice(candidates)
+                masks[barber] = masks.get(barber, 0) | (((1 << slots) - 1) << start)
+                taken += slots
+        busy[day] = masks
+    return busy
+
+def naive_free(schedule: Schedule, day: date, busy_sets: dict, slots: int) -> int:
+    """Misma respuesta comprobando cada hueco de cada barbero por separado"""
+    free = 0
+    for barber, open_mask in schedule.open_masks(day).items():
+        occupied = busy_sets.get(barber, set())
+        for start in range(open_mask.bit_length()):
+            if all(open_mask & (1 << slot) and slot not in occupied for slot in range(start, start + slots)):
+                free |= 1 << start
+    return free
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--barbers", type=int, default=12)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--fill", type=float, default=0.85, help="Ocupación de los huecos de trabajo (0-1)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    first_day = date(2030, 1, 1)
+    now = datetime(2029, 12, 31, 12, 0)
+    schedule = build_schedule(args.barbers, args.days, first_day, rng)
+    busy = fill(schedule, args.days, first_day, args.fill, rng, now)
+    days = [first_day + timedelta(days=offset) for offset in range(args.days)]
+    queries = len(days) * len(SERVICE_SLOTS)
+
+    print(f"{args.barbers} barberos, {args.days} días, ocupación {args.fill:.0%}, huecos de {SLOT_MINUTES} min")
+
+    started = time.perf_counter()
+    fast = [free_mask(schedule, day, busy[day], slots, now) for day in days for slots in SERVICE_SLOTS]
+    bitmap_elapsed = time.perf_counter() - started
+
+    busy_sets = {
+        day: {barber: {slot for slot in range(mask.bit_length()) if mask & (1 << slot)} for barber, mask in masks.items()}
+        for day, masks in busy.items()
+    }
+    started = time.perf_counter()
+    slow = [naive_free(schedule, day, busy_sets[day], slots) for day in days for slots in SERVICE_SLOTS]
+    naive_elapsed = time.perf_counter() - started
+
+    if fast != slow:
+        raise SystemExit("Los dos métodos no coinciden")
+
+    for label, elapsed in (("bitmaps", bitmap_elapsed), ("hueco a hueco", naive_elapsed)):
+        print(f"{label:<14} {queries / elapsed:>10.0f} consultas/s  {elapsed / queries * 1e6:>8.1f} µs/consulta")
+    print(f"Aceleración: x{naive_elapsed / bitmap_elapsed:.1f}")
+
+    started = time.perf_counter()
+    for day in days:
+        for slots in SERVICE_SLOTS:
+            for start in range(18, 40):
+                schedule.candidates(day, start, slots, busy[day], now)
+    elapsed = time.perf_counter() - started
+    print(f"Asignación de barbero: {elapsed / (len(days) * len(SERVICE_SLOTS) * 22) * 1e6:.1f} µs/reserva")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Micro-benchmark de la serialización de los listados grandes.
+
+Compara, para N citas, el camino de antes (objetos ORM validados uno a uno con
+AppointmentResponse y codificados por FastAPI) con el rápido de
+app/services/serialization.py (tuplas de columnas codificadas directamente a bytes
+JSON), con orjson y con el módulo json de la biblioteca estándar. Comprueba que
+los tres producen el mismo JSON.
+
+No necesita base de datos. Uso:
+    python -m benchmarks.serialization [--rows 10000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import Appointment
+from app.schemas.appointments import AppointmentResponse
+from app.services import serialization
+
+FIELDS = list(AppointmentResponse.model_fields)
+
+def make_rows(count: int) -> list:
+    first_day = date(2030, 1, 1)
+    created_at = datetime(2029, 12, 1, 10, 30)
+    return [
+        (
+            index + 1, index % 500 + 1, index % 4 + 1, first_day + timedelta(days=index // 18),
+            dt_time(9 + index % 18 // 2, 30 * (index % 2)), 30, ("Corte de pelo", "Afeitado", "Tinte")[index % 3],
+            "Cliente habitual" if index % 5 == 0 else None, created_at
+        )
+        for index in range(count)
+    ]
+
+async def orm_path(objects: list, field) -> bytes:
+    """Lo que hacía FastAPI con response_model=List[AppointmentResponse] y objetos ORM"""
+    content = await serialize_response(field=field, response_content=objects, is_coroutine=True)
+    return JSONResponse(content).body
+
+def fast_path(rows: list) -> bytes:
+    return serialization.dumps([dict(zip(FIELDS, row)) for row in rows])
+
+def measure(label: str, function, rows: int, repeat: int):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {rows / best:>12.0f} filas/s  {best * 1000:>9.1f} ms")
+    return body, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    objects = [Appointment(**dict(zip(FIELDS, row))) for row in rows]
+    field = create_response_field(name="response", type_=List[AppointmentResponse])
+    loop = asyncio.new_event_loop()
+
+    print(f"{args.rows} citas, mejor de {args.repeat} repeticiones")
+    before, before_time = measure(
+        "ORM + AppointmentResponse", lambda: loop.run_until_complete(orm_path(objects, field)), args.rows, args.repeat
+    )
+    results = [before]
+
+    # Con orjson (si está instalado) y con el json de la biblioteca estándar
+    installed = serialization.orjson
+    for label, module in (("tuplas + orjson", installed), ("tuplas + json", None)):
+        if label.endswith("orjson") and module is None:
+            print(f"{label:<28} (orjson no está instalado)")
+            continue
+        serialization.orjson = module
+        body, elapsed = measure(label, lambda: fast_path(rows), args.rows, args.repeat)
+        results.append(body)
+        print(f"{'':<28} x{before_time / elapsed:.1f} respecto a antes")
+    serialization.orjson = installed
+
+    if any(json.loads(body) != json.loads(before) for body in results):
+        raise SystemExit("Los caminos de serialización no producen el mismo JSON")
+
+if __name__ == "__main__":
+    main()
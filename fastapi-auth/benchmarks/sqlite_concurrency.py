@@ -0,0 +1,124 @@
+"""Benchmark de concurrencia sobre SQLite: configuración por defecto frente a la de producción.
+
+Lanza varios hilos lectores (consultas de disponibilidad por fecha) y un hilo escritor
+(inserciones de citas con commit) durante unos segundos y muestra lecturas/s, escrituras/s,
+el p95 de latencia de lectura y los errores "database is locked".
+
+Uso:
+    python -m benchmarks.sqlite_concurrency [--seconds 5] [--readers 8]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, time as dt_time, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.database.database import create_db_engine
+
+SCHEMA = """
+CREATE TABLE appointments (
+    id INTEGER PRIMARY KEY,
+    date DATE NOT NULL,
+    time TIME NOT NULL,
+    service_type VARCHAR NOT NULL
+)
+"""
+
+def _prepare(engine, days: int):
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA))
+        conn.execute(text("CREATE INDEX ix_appointments_date ON appointments (date)"))
+        conn.execute(
+            text("INSERT INTO appointments (date, time, service_type) VALUES (:date, :time, 'corte')"),
+            [
+                {"date": str(date(2030, 1, 1) + timedelta(days=day)), "time": str(dt_time(9 + slot % 9))}
+                for day in range(days)
+                for slot in range(9)
+            ]
+        )
+
+def run(tuned: bool, seconds: float, readers: int, days: int = 365) -> dict:
+    """Ejecutar una ronda del benchmark y devolver sus métricas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", tuned=tuned)
+        _prepare(engine, days)
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        latencies, counters = [], {"reads": 0, "writes": 0, "locked": 0}
+
+        def reader(seed: int):
+            day = seed
+            while not stop.is_set():
+                day = (day + 7) % days
+                started = time.perf_counter()
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(
+                            text("SELECT time FROM appointments WHERE date = :date"),
+                            {"date": str(date(2030, 1, 1) + timedelta(days=day))}
+                        ).all()
+                except OperationalError:
+                    with lock:
+                        counters["locked"] += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    counters["reads"] += 1
+                    latencies.append(elapsed)
+
+        def writer():
+            sequence = 0
+            while not stop.is_set():
+                sequence += 1
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(
+                            text("INSERT INTO appointments (date, time, service_type) "
+                                 "VALUES (:date, '17:30:00', 'barba')"),
+                            {"date": str(date(2031, 1, 1) + timedelta(days=sequence))}
+                        )
+                except OperationalError:
+                    with lock:
+                        counters["locked"] += 1
+                    continue
+                with lock:
+                    counters["writes"] += 1
+
+        threads = [threading.Thread(target=reader, args=(index,)) for index in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else 0.0
+    return {
+        "reads_per_s": counters["reads"] / seconds,
+        "writes_per_s": counters["writes"] / seconds,
+        "read_p95_ms": p95,
+        "locked_errors": counters["locked"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'configuración':<14}{'lecturas/s':>12}{'escrituras/s':>14}{'p95 lectura':>14}{'bloqueos':>10}")
+    for label, tuned in (("por defecto", False), ("producción", True)):
+        result = run(tuned, args.seconds, args.readers)
+        print(f"{label:<14}{result['reads_per_s']:>12.0f}{result['writes_per_s']:>14.0f}"
+              f"{result['read_p95_ms']:>11.2f} ms{result['locked_errors']:>10}")
+
+if __name__ == "__main__":
+    main()
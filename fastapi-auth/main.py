@@ -1,20 +1,65 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database.database import engine, Base
+from app.database.database import engine, async_engine
+from app.database.migrations import check_schema
+from app.auth.auth import shutdown_hash_pool
 from app.routes import auth, protected
-from app.routers import appointments
-from app.models import user, appointment  # Importar modelos para crear las tablas
+from app.routers import appointments, stats, monitoring, schedule as schedule_router
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.services.metrics import instrument_engine
+from app.services.serialization import FastJSONResponse
+from app.services.jobs import register_jobs
+from app.services.outbox import outbox_dispatcher
+from app.services.rate_limit import RouteLimits, rate_limiter
+from app.services.scheduler import scheduler
+from app.config import settings
+
+# Medir cada consulta SQL de la API (número y duración por petición)
+instrument_engine(async_engine.sync_engine)
+
+# Tareas programadas: archivado de citas, limpieza y precarga de la disponibilidad
+if settings.scheduler_enabled:
+    register_jobs(scheduler)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y parada de la aplicación.
 
-# Crear las tablas en la base de datos
-Base.metadata.create_all(bind=engine)
+    Al arrancar comprueba la versión del esquema (las tablas las crean y actualizan las
+    migraciones, python manage.py migrate), las tareas programadas y el envío de
+    notificaciones; al parar los detiene y cierra el pool de bcrypt y las conexiones de
+    la base de datos.
+    """
+    check_schema(engine)
+    scheduler.start()
+    if settings.outbox_enabled:
+        outbox_dispatcher.start()
+    try:
+        yield
+    finally:
+        await outbox_dispatcher.stop()
+        await scheduler.stop()
+        shutdown_hash_pool()
+        await async_engine.dispose()
 
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="FastAPI Auth System",
     description="Sistema de autenticación con FastAPI, SQLite y JWT",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse if settings.fast_json else JSONResponse,
+    lifespan=lifespan
 )
 
+# Límite de peticiones por usuario o IP. Se añade antes que CORS para quedar por dentro:
+# los 429 llevan las cabeceras CORS y los cuentan las métricas
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, limits=RouteLimits(settings.rate_limits))
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,12 +67,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "ETag", "Retry-After"],  # Cursor de paginación, tiempos de la petición, versión y espera tras un 429
 )
 
+# Latencia, códigos de estado y consultas SQL por ruta (se exportan en /metrics)
+app.add_middleware(MetricsMiddleware)
+
 # Incluir las rutas
 app.include_router(auth.router, prefix="/api/v1", tags=["Authentication"])
 app.include_router(protected.router, prefix="/api/v1", tags=["Protected"])
 app.include_router(appointments.router)
+app.include_router(stats.router)
+app.include_router(schedule_router.router)
+app.include_router(monitoring.router)
 
 @app.get("/")
 def read_root():
@@ -42,11 +94,9 @@ def read_root():
             "user_info": "/api/v1/users/me",
             "protected": "/api/v1/protected",
             "dashboard": "/api/v1/dashboard",
-            "appointments": "/api/v1/appointments"
+            "appointments": "/api/v1/appointments",
+            "schedule": "/api/v1/schedule",
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
-
-@app.get("/health")
-def health_check():
-    """Verificación de salud del servicio"""
-    return {"status": "OK", "message": "Servicio funcionando correctamente"}
\ No newline at end of file
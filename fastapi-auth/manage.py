@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Tareas de administración de la base de datos de Gallego's Barbers.
+
+Uso:
+    python manage.py migrate [--to N]     # aplicar las migraciones pendientes
+    python manage.py status               # versión del esquema y migraciones pendientes
+    python manage.py create-admin         # crear el usuario del panel de administración
+    python manage.py users                # listar los usuarios registrados
+    python manage.py deactivate-user NAME # desactivar un usuario y revocar sus tokens
+    python manage.py rebuild [--check]    # recalcular estadísticas y ocupación por día
+    python manage.py sample-appointment   # crear una cita de prueba para hoy
+"""
+
+import argparse
+import os
+import sys
+from datetime import date, time
+
+# Agregar el directorio del proyecto al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine, SessionLocal
+from app.database.migrations import LATEST_VERSION, MIGRATIONS, check_schema, current_version, migrate
+
+def cmd_migrate(args):
+    applied = migrate(engine, target=args.to)
+    for migration in applied:
+        print(f"✅ {migration.version:>3}  {migration.description}")
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if not applied:
+        print(f"La base de datos ya estaba en la versión {version}")
+    else:
+        print(f"✨ Esquema en la versión {version}")
+
+def cmd_status(args):
+    with engine.connect() as conn:
+        version = current_version(conn)
+    print(f"Versión del esquema: {version} (última: {LATEST_VERSION})")
+    for migration in MIGRATIONS:
+        mark = "✅" if migration.version <= version else "⏳"
+        print(f"  {mark} {migration.version:>3}  {migration.description}")
+
+def cmd_create_admin(args):
+    from app.auth.auth import get_password_hash
+    from app.models import User
+
+    db = SessionLocal()
+    try:
+        existing_user = db.query(User).filter(
+            (User.username == args.username) | (User.email == args.email)
+        ).first()
+        if existing_user:
+            print(f"⚠️  El usuario '{args.username}' o email '{args.email}' ya existe")
+            print(f"   Puedes usar: Email: {existing_user.email}")
+            return
+
+        db.add(User(
+            username=args.username,
+            email=args.email,
+            hashed_password=get_password_hash(args.password),
+            is_active=True
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    print("✅ Usuario administrador creado exitosamente")
+    print(f"   Username:   {args.username}")
+    print(f"   Email:      {args.email}")
+    print(f"   Contraseña: {args.password}")
+
+def cmd_users(args):
+    from app.models import User
+
+    db = SessionLocal()
+    try:
+        users = db.query(User).order_by(User.id).all()
+    finally:
+        db.close()
+
+    print("\n=== USUARIOS REGISTRADOS ===\n")
+    if not users:
+        print("No hay usuarios registrados")
+    for user in users:
+        print(f"ID: {user.id}")
+        print(f"Username: {user.username}")
+        print(f"Email: {user.email}")
+        print(f"Registrado: {user.created_at}")
+        print("-" * 40)
+
+def cmd_deactivate_user(args):
+    # Registra los eventos que revocan sus tokens al confirmar el cambio
+    import app.auth.dependencies  # noqa: F401
+    from app.models import User
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.username).first()
+        if user is None:
+            print(f"❌ No existe el usuario '{args.username}'")
+            sys.exit(1)
+        if not user.is_active:
+            print(f"⚠️  El usuario '{args.username}' ya estaba desactivado")
+            return
+        user_id = user.id
+        user.is_active = False
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"✅ Usuario '{args.username}' desactivado: ya no puede iniciar sesión ni renovar el token")
+    # La lista de tokens revocados es memoria de cada proceso: la API no ve la de este
+    print("   Sus tokens de acceso dejan de valer cuando la API vuelve a leer el usuario (USER_CACHE_TTL)")
+    print("   o, con JWT_USER_CLAIMS, cuando caducan. Para que sea inmediato, usa")
+    print(f"   POST /api/v1/admin/users/{user_id}/deactivate")
+
+def cmd_rebuild(args):
+    from app.models import DayOccupancy
+    from app.services.occupancy import rebuild_occupancy
+    from app.services.stats import rebuild_stats
+
+    db = SessionLocal()
+    try:
+        if not args.check:
+            buckets = rebuild_stats(db)
+            print(f"✅ Estadísticas recalculadas ({buckets} buckets)")
+        mismatches = rebuild_occupancy(db, check=args.check)
+        days = db.query(DayOccupancy).count()
+    finally:
+        db.close()
+
+    if not args.check:
+        print(f"✅ day_occupancy recalculada ({days} días, {len(mismatches)} corregidos)")
+        return
+    if mismatches:
+        print(f"❌ {len(mismatches)} días no coinciden con las citas:")
+        for day in mismatches[:20]:
+            print(f"   - {day.isoformat()}")
+        sys.exit(1)
+    print(f"✅ day_occupancy coincide con las citas ({days} días)")
+
+def cmd_sample_appointment(args):
+    from app.models import Appointment, AppointmentSlot, Barber, User
+    from app.services.occupancy import rebuild_occupancy
+    from app.services.scheduling import slot_index, slot_rows
+    from app.services.stats import rebuild_stats
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username.ilike(f"%{args.username}%")).first()
+        if not user:
+            print(f"❌ No se encontró un usuario con nombre '{args.username}'")
+            print("\n📋 Usuarios disponibles:")
+            for u in db.query(User).all():
+                print(f"  - ID: {u.id}, Username: {u.username}, Email: {u.email}")
+            return
+        print(f"✅ Usuario encontrado: {user.username} (ID: {user.id})")
+
+        # Cita de hoy a las 10:30 con el primer barbero; si ya está ocupada, a las 14:00
+        today = date.today()
+        barber = db.query(Barber).order_by(Barber.id).first()
+        appointment_time = time(10, 30)
+        if db.query(AppointmentSlot).filter_by(
+            barber_id=barber.id, date=today, slot=slot_index(appointment_time)
+        ).first():
+            print(f"⚠️  Ya existe una cita para hoy a las {appointment_time}")
+            print("   Usando horario alternativo: 14:00")
+            appointment_time = time(14, 0)
+
+        appointment = Appointment(
+            user_id=user.id,
+            barber_id=barber.id,
+            date=today,
+            time=appointment_time,
+            duration_minutes=30,
+            service_type="Corte de pelo",
+            notes="Cita de prueba creada desde script"
+        )
+        db.add(appointment)
+        db.flush()
+        db.add_all([
+            AppointmentSlot(**slot)
+            for slot in slot_rows(barber.id, today, slot_index(appointment_time), 1, appointment.id)
+        ])
+        db.commit()
+
+        # Recalcular las estadísticas agregadas y la ocupación del día para incluir la nueva cita
+        rebuild_stats(db)
+        rebuild_occupancy(db)
+
+        print("\n🎉 ¡Cita creada exitosamente!")
+        print(f"   📅 Fecha: {today}")
+        print(f"   🕐 Hora: {appointment_time}")
+        print(f"   👤 Cliente: {user.username}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Tareas de administración de la base de datos")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Aplicar las migraciones pendientes")
+    migrate_parser.add_argument("--to", type=int, help="Parar en esta versión (por defecto, la última)")
+    migrate_parser.set_defaults(handler=cmd_migrate, needs_schema=False)
+
+    status_parser = commands.add_parser("status", help="Versión del esquema y migraciones pendientes")
+    status_parser.set_defaults(handler=cmd_status, needs_schema=False)
+
+    admin_parser = commands.add_parser("create-admin", help="Crear el usuario del panel de administración")
+    admin_parser.add_argument("--username", default="admin_panel")
+    admin_parser.add_argument("--email", default="admin@barberia.com")
+    admin_parser.add_argument("--password", default="admin123")
+    admin_parser.set_defaults(handler=cmd_create_admin, needs_schema=True)
+
+    users_parser = commands.add_parser("users", help="Listar los usuarios registrados")
+    users_parser.set_defaults(handler=cmd_users, needs_schema=True)
+
+    deactivate_parser = commands.add_parser("deactivate-user", help="Desactivar un usuario y revocar sus tokens")
+    deactivate_parser.add_argument("username")
+    deactivate_parser.set_defaults(handler=cmd_deactivate_user, needs_schema=True)
+
+    rebuild_parser = commands.add_parser("rebuild", help="Recalcular estadísticas y ocupación por día")
+    rebuild_parser.add_argument("--check", action="store_true",
+                                help="Solo comprobar la ocupación; sale con código 1 si hay diferencias")
+    rebuild_parser.set_defaults(handler=cmd_rebuild, needs_schema=True)
+
+    sample_parser = commands.add_parser("sample-appointment", help="Crear una cita de prueba para hoy")
+    sample_parser.add_argument("--username", default="Pau", help="Parte del nombre del cliente")
+    sample_parser.set_defaults(handler=cmd_sample_appointment, needs_schema=True)
+
+    args = parser.parse_args()
+    if args.needs_schema:
+        try:
+            check_schema(engine)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Configuración común de las pruebas de la API: base de datos SQLite temporal y cliente.
+
+Las variables de entorno se fijan antes de importar la aplicación, que lee la
+configuración y crea los motores de la base de datos al importarse.
+"""
+import asyncio
+import os
+import tempfile
+from datetime import date, timedelta
+
+_database_dir = tempfile.mkdtemp(prefix="barberia-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'app.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["NOTIFICATION_TRANSPORT"] = "log"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+# Tablas con datos de las pruebas; la agenda por defecto (migración 4) se conserva
+DATA_TABLES = [
+    "appointment_slots", "idempotency_keys", "outbox", "appointments", "appointments_history",
+    "appointment_stats", "day_occupancy", "job_locks", "users"
+]
+
+@pytest.fixture(scope="session")
+def database():
+    """Base de datos temporal migrada a la última versión"""
+    from app.database.database import engine
+    from app.database.migrations import migrate
+
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def clean_database(database):
+    """La base de datos temporal; al acabar la prueba se borran sus datos y las cachés"""
+    from app.auth.dependencies import user_cache
+    from app.database.database import async_engine
+    from app.services.availability import availability_cache
+    from app.services.scheduling import schedule_cache
+
+    yield database
+
+    with database.begin() as connection:
+        for table in DATA_TABLES:
+            connection.execute(text(f"DELETE FROM {table}"))
+    for cache in (user_cache, availability_cache, schedule_cache):
+        cache.clear()
+    # Las conexiones asíncronas quedan ligadas al bucle de cada petición
+    asyncio.run(async_engine.dispose())
+
+@pytest.fixture
+def client(clean_database):
+    """Cliente de la API sin lifespan (sin tareas programadas ni envío de notificaciones)"""
+    import main
+    return TestClient(main.app)
+
+@pytest.fixture
+def run(clean_database):
+    """Ejecutar una corrutina (servicios que abren sus propias sesiones) y cerrar sus conexiones"""
+    from app.database.database import async_engine
+
+    def run_coroutine(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return run_coroutine
+
+@pytest.fixture
+def signup(client):
+    """Registrar un usuario y devolver las cabeceras con su token de acceso"""
+    def create(username: str = "cliente", password: str = "secreto") -> dict:
+        response = client.post("/api/v1/signup", json={
+            "username": username, "email": f"{username}@example.com", "password": password
+        })
+        assert response.status_code == 200, response.text
+        token = client.post("/api/v1/token", data={"username": username, "password": password}).json()
+        return {"Authorization": f"Bearer {token['access_token']}"}
+    return create
+
+@pytest.fixture
+def next_week() -> date:
+    """Un día futuro en el que abre la agenda por defecto (todos los días de 9:00 a 18:00)"""
+    return date.today() + timedelta(days=7)
@@ -0,0 +1,49 @@
+"""Pruebas de la desactivación de usuarios: sus tokens dejan de valer"""
+import pytest
+from sqlalchemy import text
+
+from app.auth.dependencies import user_cache
+from app.config import settings
+
+MY_APPOINTMENTS = "/api/v1/appointments/my-appointments"
+
+def _user_id(client, headers) -> int:
+    return client.get("/api/v1/users/me", headers=headers).json()["id"]
+
+@pytest.mark.parametrize("user_claims", [False, True])
+def test_deactivated_user_token_is_rejected(client, signup, monkeypatch, user_claims):
+    monkeypatch.setattr(settings, "jwt_user_claims", user_claims)
+    admin, headers = signup("admin"), signup(f"cliente{int(user_claims)}")
+    user_id = _user_id(client, headers)
+    assert client.get(MY_APPOINTMENTS, headers=headers).status_code == 200
+
+    response = client.post(f"/api/v1/admin/users/{user_id}/deactivate", headers=admin)
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+
+    # El token de acceso que ya tenía deja de valer en la siguiente petición
+    assert client.get(MY_APPOINTMENTS, headers=headers).status_code == 401
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+
+def test_deactivated_user_cannot_log_in(client, signup):
+    admin = signup("admin")
+    user_id = _user_id(client, signup("luis"))
+    client.post(f"/api/v1/admin/users/{user_id}/deactivate", headers=admin)
+
+    response = client.post("/api/v1/token", data={"username": "luis", "password": "secreto"})
+    assert response.status_code == 400
+
+def test_user_deactivated_elsewhere_is_rejected(client, signup, database):
+    headers = signup("marta")
+    assert client.get(MY_APPOINTMENTS, headers=headers).status_code == 200
+
+    # Desactivado desde otro proceso: la revocación de este no se entera, pero al
+    # caducar la caché de usuarios se vuelve a leer is_active
+    with database.begin() as connection:
+        connection.execute(text("UPDATE users SET is_active = 0 WHERE username = 'marta'"))
+    user_cache.clear()
+    assert client.get(MY_APPOINTMENTS, headers=headers).status_code == 401
+
+def test_deactivate_unknown_user(client, signup):
+    response = client.post("/api/v1/admin/users/999/deactivate", headers=signup("admin"))
+    assert response.status_code == 404
@@ -0,0 +1,65 @@
+"""Pruebas de las reservas con Idempotency-Key (app/services/idempotency.py)"""
+import asyncio
+
+import httpx
+
+import main
+from app.services.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER
+
+def _book(client, headers, day, key, hour="10:00", service="Corte de pelo"):
+    return client.post(
+        "/api/v1/appointments/",
+        json={"date": day.isoformat(), "time": hour, "service_type": service},
+        headers={**headers, IDEMPOTENCY_HEADER: key}
+    )
+
+def test_same_key_and_body_replays_the_response(client, signup, next_week):
+    headers = signup()
+    first = _book(client, headers, next_week, "reserva-1")
+    assert first.status_code == 201
+    assert REPLAYED_HEADER not in first.headers
+
+    again = _book(client, headers, next_week, "reserva-1")
+    assert again.status_code == 201
+    assert again.headers[REPLAYED_HEADER] == "true"
+    assert again.json() == first.json()
+
+    appointments = client.get("/api/v1/appointments/my-appointments", headers=headers).json()
+    assert [appointment["id"] for appointment in appointments] == [first.json()["id"]]
+
+def test_same_key_with_another_body_is_rejected(client, signup, next_week):
+    headers = signup()
+    assert _book(client, headers, next_week, "reserva-1").status_code == 201
+
+    response = _book(client, headers, next_week, "reserva-1", hour="11:00")
+    assert response.status_code == 422
+    assert response.json()["detail"] == "La Idempotency-Key ya se usó con una petición distinta"
+
+def test_keys_are_per_user(client, signup, next_week):
+    ana, luis = signup("ana"), signup("luis")
+    assert _book(client, ana, next_week, "reserva-1").status_code == 201
+
+    # La misma clave de otro usuario es una petición nueva (y el horario ya está ocupado)
+    response = _book(client, luis, next_week, "reserva-1")
+    assert response.status_code == 400
+    assert REPLAYED_HEADER not in response.headers
+
+def test_invalid_key(client, signup, next_week):
+    response = _book(client, signup(), next_week, "x" * 256)
+    assert response.status_code == 400
+
+def test_concurrent_first_use_books_once(client, signup, next_week):
+    headers = {**signup(), IDEMPOTENCY_HEADER: "reserva-1"}
+    body = {"date": next_week.isoformat(), "time": "10:00", "service_type": "Corte de pelo"}
+
+    async def send_twice():
+        async with httpx.AsyncClient(app=main.app, base_url="http://testserver") as api:
+            return await asyncio.gather(*[
+                api.post("/api/v1/appointments/", json=body, headers=headers) for _ in range(2)
+            ])
+
+    first, second = asyncio.run(send_twice())
+    # Las dos reciben la misma cita; una de ellas es la respuesta repetida de la otra
+    assert first.status_code == second.status_code == 201
+    assert first.json()["id"] == second.json()["id"]
+    assert sorted(response.headers.get(REPLAYED_HEADER, "") for response in (first, second)) == ["", "true"]
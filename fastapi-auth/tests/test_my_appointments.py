@@ -0,0 +1,100 @@
+"""Pruebas de GET /appointments/my-appointments: próximas y pasadas, cursor y ETag"""
+from datetime import datetime, time
+
+import pytest
+
+from app.routers import appointments
+
+URL = "/api/v1/appointments/my-appointments"
+HOURS = ["09:00", "10:00", "10:30", "11:00", "12:30", "14:00", "16:00", "17:30"]
+
+@pytest.fixture
+def booked(client, signup, next_week):
+    """Un cliente con una cita a cada hora de HOURS y otro con una cita a las 13:00"""
+    headers = signup("ana")
+    for hour in HOURS:
+        response = client.post("/api/v1/appointments/", headers=headers, json={
+            "date": next_week.isoformat(), "time": hour, "service_type": "Corte de pelo"
+        })
+        assert response.status_code == 201, response.text
+    client.post("/api/v1/appointments/", headers=signup("luis"), json={
+        "date": next_week.isoformat(), "time": "13:00", "service_type": "Corte de pelo"
+    })
+    return headers
+
+@pytest.fixture
+def now_at(monkeypatch, next_week):
+    """Fijar la hora que ve el endpoint"""
+    class FrozenDatetime(datetime):
+        current = None
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current
+
+    monkeypatch.setattr(appointments, "datetime", FrozenDatetime)
+
+    def freeze(hour: int, minute: int, second: int = 0):
+        FrozenDatetime.current = FrozenDatetime.combine(next_week, time(hour, minute, second))
+    return freeze
+
+def _hours(response) -> list:
+    return [appointment["time"][:5] for appointment in response.json()]
+
+def _all_pages(client, headers, limit: int, **params) -> list:
+    pages, cursor = [], None
+    while True:
+        response = client.get(URL, headers=headers, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        assert len(response.json()) <= limit
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def test_upcoming_and_past_split_at_the_slot_start(client, booked, now_at):
+    # A las 10:30 en punto la cita de las 10:30 aún no ha empezado
+    now_at(10, 30)
+    assert _hours(client.get(URL, headers=booked, params={"scope": "upcoming"})) == HOURS[2:]
+    assert _hours(client.get(URL, headers=booked, params={"scope": "past"})) == ["10:00", "09:00"]
+
+    # Un segundo después ya es pasada
+    now_at(10, 30, 1)
+    assert _hours(client.get(URL, headers=booked, params={"scope": "upcoming"})) == HOURS[3:]
+    assert _hours(client.get(URL, headers=booked, params={"scope": "past"})) == ["10:30", "10:00", "09:00"]
+
+@pytest.mark.parametrize("scope", [None, "upcoming", "past"])
+def test_cursor_pages_have_no_duplicates_or_gaps(client, booked, now_at, scope):
+    now_at(12, 0)
+    params = {"scope": scope} if scope else {}
+    expected = client.get(URL, headers=booked, params=params).json()
+
+    pages = _all_pages(client, booked, 3, **params)
+    assert [appointment for page in pages for appointment in page] == expected
+    assert len(pages) == -(-len(expected) // 3)
+
+def test_invalid_cursor(client, booked):
+    assert client.get(URL, headers=booked, params={"cursor": "zzz"}).status_code == 400
+
+def test_not_modified_until_something_changes(client, booked, now_at, next_week):
+    now_at(10, 0)
+    first = client.get(URL, headers=booked, params={"scope": "upcoming"})
+    etag = first.headers["ETag"]
+
+    again = client.get(URL, headers={**booked, "If-None-Match": etag}, params={"scope": "upcoming"})
+    assert again.status_code == 304
+
+    # Cuando una cita pasa de próxima a pasada el ETag cambia
+    now_at(10, 0, 1)
+    moved = client.get(URL, headers={**booked, "If-None-Match": etag}, params={"scope": "upcoming"})
+    assert moved.status_code == 200
+    assert moved.headers["ETag"] != etag
+
+    # Y también al reservar otra cita
+    etag = moved.headers["ETag"]
+    client.post("/api/v1/appointments/", headers=booked, json={
+        "date": next_week.isoformat(), "time": "15:00", "service_type": "Corte de pelo"
+    })
+    changed = client.get(URL, headers={**booked, "If-None-Match": etag}, params={"scope": "upcoming"})
+    assert changed.status_code == 200
+    assert "15:00" in _hours(changed)
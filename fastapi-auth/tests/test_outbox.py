@@ -0,0 +1,113 @@
+"""Pruebas del outbox de notificaciones (app/services/outbox.py)"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.models import OutboxMessage
+from app.services import outbox
+from app.services.notifications import Transport
+from app.services.outbox import OutboxDispatcher, retry_delay
+
+class RecordingTransport(Transport):
+    """Guarda lo que envía; con `fail=True` falla siempre"""
+    name = "test"
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent = []
+
+    async def send(self, notification):
+        if self.fail:
+            raise ConnectionError("servidor caído")
+        self.sent.append(notification)
+
+def _book(client, headers, day, hour="10:00"):
+    response = client.post("/api/v1/appointments/", headers=headers, json={
+        "date": day.isoformat(), "time": hour, "service_type": "Corte de pelo"
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def _messages(database) -> list:
+    with database.connect() as connection:
+        return connection.execute(
+            select(OutboxMessage.kind, OutboxMessage.status, OutboxMessage.attempts,
+                   OutboxMessage.available_at, OutboxMessage.last_error)
+            .order_by(OutboxMessage.id)
+        ).all()
+
+def _make_due(database, kind: str):
+    """Adelantar los mensajes pendientes de un tipo para no esperar a su hora"""
+    with database.begin() as connection:
+        connection.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.status == "pending", OutboxMessage.kind == kind)
+            .values(available_at=datetime.now())
+        )
+
+@pytest.fixture
+def booked(client, signup, next_week, clean_database, monkeypatch):
+    """Una cita de la semana que viene: su confirmación ya disponible y el recordatorio para después"""
+    monkeypatch.setattr(settings, "outbox_enabled", True)
+    _book(client, signup(), next_week)
+    return clean_database
+
+def test_retry_delay_grows_exponentially_up_to_the_maximum(monkeypatch):
+    monkeypatch.setattr(settings, "outbox_retry_base", 30.0)
+    monkeypatch.setattr(settings, "outbox_retry_max", 3600.0)
+    monkeypatch.setattr(outbox.random, "uniform", lambda low, high: high)
+    assert [retry_delay(attempts) for attempts in range(1, 9)] == [30, 60, 120, 240, 480, 960, 1920, 3600]
+
+    # Con el azar, entre la mitad y el total
+    monkeypatch.undo()
+    monkeypatch.setattr(settings, "outbox_retry_base", 30.0)
+    delays = [retry_delay(3) for _ in range(200)]
+    assert all(60 <= delay <= 120 for delay in delays)
+    assert len(set(delays)) > 1
+
+def test_booking_enqueues_confirmation_and_reminder(booked):
+    assert [(row.kind, row.status) for row in _messages(booked)] == [
+        ("appointment_created", "pending"), ("appointment_reminder", "pending")
+    ]
+
+def test_disabled_outbox_enqueues_nothing(client, signup, next_week, clean_database, monkeypatch):
+    monkeypatch.setattr(settings, "outbox_enabled", False)
+    headers = signup()
+    appointment_id = _book(client, headers, next_week)
+    assert client.delete(f"/api/v1/appointments/{appointment_id}", headers=headers).status_code == 204
+    assert _messages(clean_database) == []
+
+def test_dispatch_sends_due_messages(booked, run):
+    transport = RecordingTransport()
+    dispatcher = OutboxDispatcher(transport, batch_size=10)
+    assert run(dispatcher.dispatch_once()) == 1
+
+    # El recordatorio no sale hasta su hora
+    assert [notification.kind for notification in transport.sent] == ["appointment_created"]
+    assert [(row.kind, row.status) for row in _messages(booked)] == [
+        ("appointment_created", "sent"), ("appointment_reminder", "pending")
+    ]
+    assert run(dispatcher.dispatch_once()) == 0
+
+def test_failed_sends_are_retried_then_given_up(booked, run):
+    dispatcher = OutboxDispatcher(RecordingTransport(fail=True), max_attempts=3)
+
+    for attempt in (1, 2):
+        started = datetime.now()
+        assert run(dispatcher.dispatch_once()) == 1
+        created = _messages(booked)[0]
+        assert (created.status, created.attempts) == ("pending", attempt)
+        assert created.last_error == "ConnectionError: servidor caído"
+        # Se reintenta más tarde, con espera exponencial
+        assert created.available_at >= started + timedelta(seconds=retry_delay(attempt) / 2 - 1)
+        assert run(dispatcher.dispatch_once()) == 0
+        _make_due(booked, "appointment_created")
+
+    # Al llegar a max_attempts se da por fallido y ya no se reclama
+    assert run(dispatcher.dispatch_once()) == 1
+    created, reminder = _messages(booked)
+    assert (created.status, created.attempts) == ("failed", 3)
+    assert (reminder.status, reminder.attempts) == ("pending", 0)
+    assert run(dispatcher.dispatch_once()) == 0
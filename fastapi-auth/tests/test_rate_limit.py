@@ -0,0 +1,116 @@
+"""Pruebas del límite de peticiones (app/services/rate_limit.py y app/middleware/rate_limit.py)"""
+from datetime import timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.auth.auth import ALGORITHM, create_access_token
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.services import rate_limit
+from app.services.metrics import http_requests
+from app.services.rate_limit import GCRALimiter, RouteLimits
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+def test_burst_then_one_per_interval(clock):
+    limiter = GCRALimiter()
+    assert [limiter.hit("ana", 3, 60) for _ in range(3)] == [0, 0, 0]
+    # Tras la ráfaga hay que esperar un intervalo (periodo / límite)
+    assert limiter.hit("ana", 3, 60) == pytest.approx(20)
+
+    clock.now += 19
+    assert limiter.hit("ana", 3, 60) == pytest.approx(1)
+    clock.now += 1
+    assert limiter.hit("ana", 3, 60) == 0
+    assert limiter.hit("ana", 3, 60) == pytest.approx(20)
+
+def test_full_bucket_after_a_period(clock):
+    limiter = GCRALimiter()
+    for _ in range(3):
+        limiter.hit("ana", 3, 60)
+    clock.now += 60
+    assert [limiter.hit("ana", 3, 60) for _ in range(3)] == [0, 0, 0]
+
+def test_inactive_keys_are_evicted(clock):
+    limiter = GCRALimiter(max_keys=2)
+    limiter.hit("ana", 1, 60)
+    limiter.hit("luis", 1, 60)
+    limiter.hit("marta", 1, 60)
+    assert len(limiter) == 2
+
+    clock.now += 60
+    limiter.hit("pepe", 1, 60)
+    assert len(limiter) == 1
+
+def test_route_limits_match():
+    limits = RouteLimits({"POST /token": "5/minute", "GET /days/{day}": "2/second", "*": "100/hour"})
+    assert limits.match("POST", "/token").limit == 5
+    assert limits.match("GET", "/days/2030-01-07").name == "GET /days/{day}"
+    assert limits.match("GET", "/token").name == "*"
+    with pytest.raises(ValueError):
+        RouteLimits({"POST /token": "5/week"})
+
+# --- Middleware ---
+
+@pytest.fixture
+def api(clock):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(RateLimitMiddleware, limiter=GCRALimiter(), limits=RouteLimits({"GET /items/{item_id}": "2/minute"}))
+    app.add_middleware(MetricsMiddleware)
+    return TestClient(app)
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+def test_429_with_retry_after(api, clock):
+    assert [api.get(f"/items/{item_id}").status_code for item_id in range(2)] == [200, 200]
+
+    limited_before = http_requests.value(method="GET", route="/items/{item_id}", status=429)
+    response = api.get("/items/3")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    # En las métricas cuenta con la plantilla de la ruta, no como "unmatched"
+    assert http_requests.value(method="GET", route="/items/{item_id}", status=429) == limited_before + 1
+
+    clock.now += 30
+    assert api.get("/items/4").status_code == 200
+
+def test_limit_is_per_user(api):
+    ana = _bearer(create_access_token({"sub": "ana"}, timedelta(minutes=5)))
+    luis = _bearer(create_access_token({"sub": "luis"}, timedelta(minutes=5)))
+    for _ in range(2):
+        api.get("/items/1", headers=ana)
+
+    assert api.get("/items/1", headers=ana).status_code == 429
+    # Otro usuario (y las peticiones sin token, por IP) tienen su propio cubo
+    assert api.get("/items/1", headers=luis).status_code == 200
+    assert api.get("/items/1").status_code == 200
+
+def test_forged_tokens_share_the_ip_limit(api):
+    # Sin una firma válida, cambiar el `sub` en cada petición no da un cubo nuevo
+    forged = [_bearer(jwt.encode({"sub": f"falso{index}"}, "otra-clave", algorithm=ALGORITHM)) for index in range(3)]
+    unsigned = _bearer(jwt.encode({"sub": "sin-firma"}, "", algorithm=ALGORITHM).rsplit(".", 1)[0] + ".")
+
+    assert api.get("/items/1", headers=forged[0]).status_code == 200
+    assert api.get("/items/1", headers=forged[1]).status_code == 200
+    assert api.get("/items/1", headers=forged[2]).status_code == 429
+    assert api.get("/items/1", headers=unsigned).status_code == 429
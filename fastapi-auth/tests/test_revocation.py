@@ -0,0 +1,43 @@
+"""Pruebas de la lista de tokens revocados (app/auth/revocation.py)"""
+import time
+
+from app.auth.revocation import TokenDenylist
+
+def test_revoke_user_covers_tokens_of_the_same_second():
+    denylist = TokenDenylist()
+    now = int(time.time())
+    denylist.revoke_user("ana", 3600)
+
+    assert denylist.is_revoked({"sub": "ana", "iat": now})
+    assert denylist.is_revoked({"sub": "ana", "iat": now - 60})
+    assert not denylist.is_revoked({"sub": "luis", "iat": now})
+
+def test_tokens_issued_after_revoking_a_user_are_valid():
+    denylist = TokenDenylist()
+    denylist.revoke_user("ana", 3600)
+
+    # Aunque el token nuevo salga en el mismo segundo que la revocación
+    issued_at = denylist.issued_at("ana")
+    assert not denylist.is_revoked({"sub": "ana", "iat": issued_at})
+    assert denylist.issued_at("luis") <= issued_at
+
+def test_revoked_tokens_and_families():
+    denylist = TokenDenylist()
+    expires_at = time.time() + 60
+    denylist.revoke("ab" * 16, expires_at)
+    denylist.revoke_family("cd" * 16, expires_at)
+
+    assert denylist.is_revoked({"sub": "ana", "jti": "ab" * 16})
+    assert denylist.is_revoked({"sub": "ana", "jti": "ef" * 16, "fam": "cd" * 16})
+    assert not denylist.is_revoked({"sub": "ana", "jti": "ef" * 16, "fam": "01" * 16})
+
+def test_saved_denylist_is_loaded_again(tmp_path):
+    path = str(tmp_path / "revoked.json")
+    denylist = TokenDenylist(path)
+    denylist.revoke("ab" * 16, time.time() + 60)
+    denylist.revoke_user("ana", 3600)
+
+    loaded = TokenDenylist(path)
+    assert loaded.is_revoked({"sub": "luis", "jti": "ab" * 16})
+    assert loaded.is_revoked({"sub": "ana", "iat": int(time.time()) - 1})
+    assert not loaded.is_revoked({"sub": "ana", "iat": loaded.issued_at("ana")})
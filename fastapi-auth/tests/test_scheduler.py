@@ -0,0 +1,135 @@
+"""Pruebas de las tareas programadas (app/services/scheduler.py y app/services/jobs.py)"""
+import asyncio
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.config import settings
+from app.models import Appointment, AppointmentHistory, AppointmentSlot, DayOccupancy, User
+from app.services.jobs import archive_past_appointments
+from app.services.scheduler import CronTrigger, IntervalTrigger, Scheduler, parse_trigger
+from app.services.scheduling import slot_index, slot_rows
+
+# --- Disparadores ---
+
+@pytest.mark.parametrize("expression, after, expected", [
+    ("30 3 * * *", datetime(2030, 1, 7, 3, 30), datetime(2030, 1, 8, 3, 30)),
+    ("30 3 * * *", datetime(2030, 1, 7, 3, 29, 59), datetime(2030, 1, 7, 3, 30)),
+    ("*/15 * * * *", datetime(2030, 1, 7, 10, 7), datetime(2030, 1, 7, 10, 15)),
+    ("0 9 * * 1-5", datetime(2030, 1, 11, 10, 0), datetime(2030, 1, 14, 9, 0)),
+    ("0 0 1,15 * *", datetime(2030, 1, 2), datetime(2030, 1, 15)),
+    ("0 4 * 3 *", datetime(2030, 4, 1), datetime(2031, 3, 1, 4, 0)),
+    # Domingo como 0 y como 7
+    ("0 12 * * 0", datetime(2030, 1, 7), datetime(2030, 1, 13, 12, 0)),
+    ("0 12 * * 7", datetime(2030, 1, 7), datetime(2030, 1, 13, 12, 0)),
+    # Con día del mes y de la semana basta con uno: el día 20 o el próximo lunes
+    ("0 0 20 * 1", datetime(2030, 1, 15), datetime(2030, 1, 20)),
+    ("0 0 20 * 1", datetime(2030, 1, 7, 1), datetime(2030, 1, 14)),
+])
+def test_cron_next_run(expression, after, expected):
+    assert CronTrigger(expression).next_run(after) == expected
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "0 0 0 * *", "*/0 * * * *", "a * * * *"])
+def test_invalid_cron(expression):
+    with pytest.raises(ValueError):
+        CronTrigger(expression)
+
+def test_cron_that_never_matches():
+    with pytest.raises(ValueError):
+        CronTrigger("0 0 31 2 *").next_run(datetime(2030, 1, 1))
+
+def test_interval_is_aligned_with_the_clock():
+    trigger = IntervalTrigger(3600)
+    after = datetime(2030, 1, 7, 10, 20, 5)
+    assert trigger.next_run(after).timestamp() % 3600 == 0
+    assert timedelta(0) < trigger.next_run(after) - after <= timedelta(hours=1)
+
+def test_parse_trigger():
+    assert isinstance(parse_trigger(3600), IntervalTrigger)
+    assert isinstance(parse_trigger("3600"), IntervalTrigger)
+    assert isinstance(parse_trigger("0 4 * * *"), CronTrigger)
+    with pytest.raises(ValueError):
+        Scheduler().add_job("tarea", 0, lambda: None)
+
+# --- Bloqueo en job_locks ---
+
+def test_exclusive_job_runs_once_per_scheduled_time(run):
+    calls = []
+
+    async def job():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+
+    first_worker, second_worker = Scheduler(), Scheduler()
+    jobs = [worker.add_job("exclusiva", 60, job) for worker in (first_worker, second_worker)]
+    scheduled_for = datetime(2030, 1, 7, 10, 0)
+
+    async def both():
+        return await asyncio.gather(
+            first_worker.run(jobs[0], scheduled_for), second_worker.run(jobs[1], scheduled_for)
+        )
+
+    assert sorted(run(both())) == ["skipped", "success"]
+    assert len(calls) == 1
+    # La misma ejecución tampoco se repite después; la siguiente sí se ejecuta
+    assert run(second_worker.run(jobs[1], scheduled_for)) == "skipped"
+    assert run(second_worker.run(jobs[1], scheduled_for + timedelta(minutes=1))) == "success"
+    assert len(calls) == 2
+
+def test_failed_job_releases_the_lock(run):
+    async def failing():
+        raise RuntimeError("fallo")
+
+    worker = Scheduler()
+    job = worker.add_job("con_error", 60, failing)
+    scheduled_for = datetime(2030, 1, 7, 10, 0)
+    assert run(worker.run(job, scheduled_for)) == "error"
+    assert run(worker.run(job, scheduled_for + timedelta(minutes=1))) == "error"
+
+def test_non_exclusive_jobs_always_run(run):
+    worker = Scheduler()
+
+    async def job():
+        return None
+
+    job = worker.add_job("local", 60, job, exclusive=False)
+    assert run(worker.run(job)) == run(worker.run(job)) == "success"
+
+# --- Archivado de citas ---
+
+def test_archive_past_appointments(run, clean_database, monkeypatch):
+    monkeypatch.setattr(settings, "appointment_archive_batch_size", 2)
+    old_day = date.today() - timedelta(days=settings.appointment_archive_after_days + 10)
+    recent_day = date.today() - timedelta(days=1)
+
+    with clean_database.begin() as connection:
+        connection.execute(insert(User).values(id=1, username="ana", email="ana@example.com", hashed_password="x"))
+        ids = {}
+        for day, hour in [(old_day, 10), (old_day, 11), (old_day, 12), (recent_day, 10)]:
+            appointment_id = connection.scalar(
+                insert(Appointment)
+                .values(user_id=1, barber_id=1, date=day, time=time(hour), service_type="Corte de pelo",
+                        duration_minutes=30)
+                .returning(Appointment.id)
+            )
+            connection.execute(insert(AppointmentSlot), slot_rows(1, day, slot_index(time(hour)), 1, appointment_id))
+            ids[(day, hour)] = appointment_id
+        connection.execute(insert(DayOccupancy), [
+            {"date": day, "booked_slots": 3, "capacity": 18, "bitmap": ""} for day in (old_day, recent_day)
+        ])
+
+    assert run(archive_past_appointments()).startswith("3 citas")
+
+    with clean_database.connect() as connection:
+        history = connection.execute(select(AppointmentHistory.id, AppointmentHistory.archived_at)).all()
+        remaining = connection.scalars(select(Appointment.id)).all()
+        slots = connection.scalars(select(AppointmentSlot.appointment_id)).all()
+        occupancy = connection.scalars(select(DayOccupancy.date)).all()
+
+    assert sorted(row.id for row in history) == sorted(ids[(old_day, hour)] for hour in (10, 11, 12))
+    assert all(row.archived_at is not None for row in history)
+    assert remaining == slots == [ids[(recent_day, 10)]]
+    assert occupancy == [recent_day]
+    # Sin nada que archivar, la siguiente ejecución no hace nada
+    assert run(archive_past_appointments()) is None
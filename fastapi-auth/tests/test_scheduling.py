@@ -0,0 +1,250 @@
+"""Pruebas del motor de agenda (app/services/scheduling.py) y del bloqueo de solapes en appointment_slots"""
+import asyncio
+import random
+from datetime import date, datetime, time
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database.database import Base
+from app.models import Appointment, AppointmentSlot, Barber, User
+from app.database import database
+from app.services.booking import reserve, reserve_many
+from app.services.scheduling import (
+    SLOT_MINUTES, SLOTS_PER_DAY, blocked_mask, build_schedule, hours_mask, interval_mask,
+    run_starts, slot_index, slot_rows
+)
+
+# Las horas de las pruebas están pensadas para la rejilla por defecto de 30 minutos
+pytestmark = pytest.mark.skipif(SLOT_MINUTES != 30, reason="las pruebas usan huecos de 30 minutos")
+
+MONDAY = date(2030, 1, 7)
+HOLIDAY = date(2030, 1, 14)
+BEFORE = datetime(2030, 1, 1, 8, 0)
+
+def slot(hour: int, minute: int = 0) -> int:
+    return slot_index(time(hour, minute))
+
+def slots_of(mask: int) -> list:
+    return [index for index in range(SLOTS_PER_DAY) if mask & (1 << index)]
+
+def starts_of(mask: int) -> list:
+    return [f"{index * SLOT_MINUTES // 60}:{index * SLOT_MINUTES % 60:02d}" for index in slots_of(mask)]
+
+@pytest.fixture
+def schedule():
+    # Barbero 1: lunes 9-14 y 16-20. Barbero 2: lunes 10-18, con una pausa de 12 a 13 el día MONDAY.
+    # El día HOLIDAY cierra toda la barbería.
+    return build_schedule(
+        barbers=[(1,), (2,)],
+        hours=[
+            (1, 0, time(9), time(14)),
+            (1, 0, time(16), time(20)),
+            (2, 0, time(10), time(18)),
+        ],
+        services=[("Corte", 30), ("Tinte", 90), ("Barba", 20)],
+        time_off=[
+            (None, HOLIDAY, None, None),
+            (2, MONDAY, time(12), time(13)),
+        ]
+    )
+
+# --- Bitmaps ---
+
+def test_run_starts_finds_runs_of_free_slots():
+    free = 0b0111011  # huecos 0, 1, 3, 4 y 5
+    assert slots_of(run_starts(free, 1)) == [0, 1, 3, 4, 5]
+    assert slots_of(run_starts(free, 2)) == [0, 3, 4]
+    assert slots_of(run_starts(free, 3)) == [3]
+    assert run_starts(free, 4) == 0
+
+def test_run_starts_matches_slot_by_slot_check():
+    rng = random.Random(7)
+    for _ in range(200):
+        free = rng.getrandbits(SLOTS_PER_DAY)
+        for length in range(1, 9):
+            expected = [
+                start for start in range(SLOTS_PER_DAY - length + 1)
+                if all(free & (1 << index) for index in range(start, start + length))
+            ]
+            assert slots_of(run_starts(free, length)) == expected
+
+def test_hours_mask_only_counts_whole_slots():
+    assert slots_of(hours_mask(time(9), time(10))) == [slot(9), slot(9, 30)]
+    # Un tramo que empieza o acaba a mitad de hueco no lo incluye
+    assert slots_of(hours_mask(time(9, 10), time(10, 20))) == [slot(9, 30)]
+    assert hours_mask(time(10), time(10)) == 0
+
+def test_blocked_mask_covers_every_touched_slot():
+    assert slots_of(blocked_mask(time(9, 10), time(9, 40))) == [slot(9), slot(9, 30)]
+    assert slots_of(blocked_mask(time(12), time(13))) == [slot(12), slot(12, 30)]
+    # Sin horas, el día completo
+    assert blocked_mask(None, None) == interval_mask(0, SLOTS_PER_DAY)
+
+# --- Schedule ---
+
+def test_service_slots_round_up(schedule):
+    assert schedule.service_slots("Corte") == 1
+    assert schedule.service_slots("Tinte") == 3
+    assert schedule.service_slots("Barba") == 1
+    assert schedule.service_slots("Desconocido") == 1
+
+def test_free_starts_respects_breaks_and_bookings(schedule):
+    busy = {1: 1 << slot(10)}
+    free = schedule.free_starts(MONDAY, busy, 3, BEFORE)
+
+    # Barbero 1: un Tinte (hora y media) no puede pisar la cita de las 10 ni el descanso de 14 a 16
+    assert starts_of(free[1]) == [
+        "10:30", "11:00", "11:30", "12:00", "12:30",
+        "16:00", "16:30", "17:00", "17:30", "18:00", "18:30"
+    ]
+    # Barbero 2: su pausa de 12 a 13 parte la jornada
+    assert starts_of(free[2]) == ["10:00", "10:30", "13:00", "13:30", "14:00", "14:30", "15:00", "15:30", "16:00", "16:30"]
+
+def test_free_starts_skips_slots_already_started(schedule):
+    free = schedule.free_starts(MONDAY, {}, 1, datetime.combine(MONDAY, time(17, 5)))
+    assert starts_of(free[1]) == ["17:30", "18:00", "18:30", "19:00", "19:30"]
+    assert starts_of(free[2]) == ["17:30"]
+
+def test_free_starts_for_one_barber(schedule):
+    free = schedule.free_starts(MONDAY, {}, 1, BEFORE, barber_id=2)
+    assert list(free) == [2]
+
+def test_free_starts_on_holiday(schedule):
+    free = schedule.free_starts(HOLIDAY, {}, 1, BEFORE)
+    assert free == {1: 0, 2: 0}
+
+def test_candidates_prefers_least_busy_barber(schedule):
+    start = slot(11)
+    assert schedule.candidates(MONDAY, start, 1, {}, BEFORE) == [1, 2]
+
+    busy = {1: 1 << slot(9) | 1 << slot(9, 30)}
+    assert schedule.candidates(MONDAY, start, 1, busy, BEFORE) == [2, 1]
+
+    # A las 12 el barbero 2 está en su pausa
+    assert schedule.candidates(MONDAY, slot(12), 1, busy, BEFORE) == [1]
+    # Un Tinte a las 9 solo cabe con el barbero 1, si no tiene citas
+    assert schedule.candidates(MONDAY, slot(9), 3, {}, BEFORE) == [1]
+    assert schedule.candidates(MONDAY, slot(9), 3, busy, BEFORE) == []
+
+def test_slot_error(schedule):
+    assert schedule.slot_error(MONDAY, time(11), 1, BEFORE) is None
+    assert schedule.slot_error(MONDAY, time(12), 1, BEFORE, barber_id=1) is None
+
+    assert schedule.slot_error(MONDAY, time(11), 1, datetime.combine(MONDAY, time(12))) == \
+        "La cita debe ser en una fecha y hora futura"
+    assert schedule.slot_error(MONDAY, time(11, 15), 1, BEFORE) == \
+        "Las citas solo pueden ser de 9:00 a 20:00, cada 30 minutos"
+    assert schedule.slot_error(MONDAY, time(20), 1, BEFORE) == \
+        "Las citas solo pueden ser de 9:00 a 20:00, cada 30 minutos"
+    assert schedule.slot_error(MONDAY, time(12), 1, BEFORE, barber_id=2) == \
+        "El barbero no trabaja en ese horario"
+    # Un Tinte a las 19:00 acabaría a las 20:30
+    assert schedule.slot_error(MONDAY, time(19), 3, BEFORE) == \
+        "No hay ningún barbero disponible en ese horario"
+    assert schedule.slot_error(HOLIDAY, time(11), 1, BEFORE) == \
+        "No hay ningún barbero disponible en ese horario"
+
+# --- Solapes en appointment_slots ---
+
+def _seed(connection):
+    connection.execute(insert(User).values(id=1, username="cliente", email="cliente@example.com", hashed_password="x"))
+    connection.execute(insert(Barber).values(id=1, name="Barbero"))
+
+def _appointment(connection, start: int, slots: int) -> int:
+    return connection.scalar(
+        insert(Appointment)
+        .values(user_id=1, barber_id=1, date=MONDAY, time=time(start * SLOT_MINUTES // 60, start * SLOT_MINUTES % 60),
+                service_type="Tinte", duration_minutes=slots * SLOT_MINUTES)
+        .returning(Appointment.id)
+    )
+
+def test_appointment_slots_primary_key_rejects_overlap():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        _seed(connection)
+        first = _appointment(connection, slot(10), 3)
+        connection.execute(insert(AppointmentSlot), slot_rows(1, MONDAY, slot(10), 3, first))
+
+    # Empieza a las 11:00, dentro del Tinte de 10:00 a 11:30
+    with pytest.raises(IntegrityError):
+        with engine.begin() as connection:
+            second = _appointment(connection, slot(11), 2)
+            connection.execute(insert(AppointmentSlot), slot_rows(1, MONDAY, slot(11), 2, second))
+
+    # Justo después no se solapa
+    with engine.begin() as connection:
+        third = _appointment(connection, slot(11, 30), 2)
+        connection.execute(insert(AppointmentSlot), slot_rows(1, MONDAY, slot(11, 30), 2, third))
+        assert len(connection.execute(select(AppointmentSlot)).all()) == 5
+    engine.dispose()
+
+def test_reserve_returns_none_on_overlap():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.run_sync(_seed)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        values = {"user_id": 1, "date": MONDAY, "service_type": "Tinte"}
+        async with sessions() as db:
+            first = await reserve(db, {**values, "time": time(10)}, 1, slot(10), 3)
+            await db.commit()
+        async with sessions() as db:
+            overlapping = await reserve(db, {**values, "time": time(9)}, 1, slot(9), 3)
+        async with sessions() as db:
+            after = await reserve(db, {**values, "time": time(11, 30)}, 1, slot(11, 30), 1)
+            await db.commit()
+        async with sessions() as db:
+            appointments = (await db.scalars(select(Appointment.id).order_by(Appointment.id))).all()
+        await engine.dispose()
+        return first, overlapping, after, appointments
+
+    first, overlapping, after, appointments = asyncio.run(run())
+    assert first is not None and first.duration_minutes == 90
+    # La cita que chocaba se ha deshecho junto con sus huecos
+    assert overlapping is None
+    assert after is not None
+    assert appointments == [first.id, after.id]
+
+def test_overlap_without_on_conflict(monkeypatch):
+    """En dialectos sin ON CONFLICT el choque llega como IntegrityError y cuenta como hueco ocupado"""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    monkeypatch.delitem(database.CONFLICT_INSERTS, "sqlite")
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.run_sync(_seed)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        values = {"user_id": 1, "date": MONDAY, "service_type": "Tinte"}
+        async with sessions() as db:
+            first = await reserve(db, {**values, "time": time(10)}, 1, slot(10), 3)
+            await db.commit()
+        async with sessions() as db:
+            overlapping = await reserve(db, {**values, "time": time(9)}, 1, slot(9), 3)
+        async with sessions() as db:
+            created = await reserve_many(db, [
+                {**values, "barber_id": 1, "time": time(11), "start": slot(11), "slots": 2},
+                {**values, "barber_id": 1, "time": time(12), "start": slot(12), "slots": 1},
+            ])
+            await db.commit()
+        async with sessions() as db:
+            appointments = (await db.scalars(select(Appointment.time).order_by(Appointment.time))).all()
+        await engine.dispose()
+        return first, overlapping, created, appointments
+
+    first, overlapping, created, appointments = asyncio.run(run())
+    assert first is not None
+    assert overlapping is None
+    # La de las 11:00 choca con el Tinte; la de las 12:00 se crea igualmente
+    assert list(created) == [1]
+    assert appointments == [time(10), time(12)]
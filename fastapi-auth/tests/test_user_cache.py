@@ -0,0 +1,42 @@
+"""Pruebas de la invalidación de la caché de usuarios (app/auth/dependencies.py)"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.auth.dependencies import user_cache
+from app.database.database import Base
+from app.models import User
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.add(User(username="ana", email="ana@example.com", hashed_password="x"))
+    db.commit()
+    return db
+
+def test_user_is_evicted_after_commit():
+    db = _session()
+    user = db.query(User).one()
+    user_cache.set("ana", "antiguo")
+
+    user.username = "ana2"
+    db.flush()
+    # Hasta el commit la fila confirmada sigue siendo la antigua
+    assert user_cache.get("ana") == "antiguo"
+
+    db.commit()
+    assert user_cache.get("ana") is None
+    db.close()
+
+def test_rollback_keeps_cached_user():
+    db = _session()
+    user = db.query(User).one()
+    user_cache.set("ana", "antiguo")
+
+    user.is_active = False
+    db.flush()
+    db.rollback()
+    assert user_cache.get("ana") == "antiguo"
+
+    user_cache.invalidate("ana")
+    db.close()